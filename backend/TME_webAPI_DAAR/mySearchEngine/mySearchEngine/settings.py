@@ -50,6 +50,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'mygutenberg.middleware.QueryCountMiddleware',
 ]
 
 ROOT_URLCONF = 'mySearchEngine.urls'
@@ -128,8 +129,73 @@ CORS_ALLOWED_ORIGINS = [
     "https://azerall.github.io",    
 ]
 
+CORS_EXPOSE_HEADERS = ['X-DB-Queries', 'ETag', 'Accept-Ranges', 'Content-Range', 'X-Total-Length', 'X-Content-Offset', 'X-Paragraphs']
+
 DEBUG = False
 
+# Moteur de recherche
+# Les recherches par préfixe sont servies par un instantané du Trie chargé en mémoire
+# (mygutenberg.trie_snapshot) ; à False, elles interrogent directement la table TrieNode.
+TRIE_SNAPSHOT_ENABLED = True
+# Délai minimal (en secondes) entre deux vérifications de la génération d'index publiée,
+# commune à l'instantané du Trie, au catalogue et au cache des résultats (mygutenberg.generation)
+INDEX_GENERATION_CHECK_INTERVAL = 5
+# Nombre de requêtes SQL d'une requête HTTP au-delà duquel QueryCountMiddleware journalise un
+# avertissement (en dessous : niveau DEBUG ; le total reste dans l'en-tête X-DB-Queries)
+DB_QUERY_LOG_THRESHOLD = 20
+# Taille maximale d'une page de résultats (?limit=) pour les recherches paginées
+SEARCH_MAX_PAGE_SIZE = 200
+# Cache LRU des résultats de recherche : nombre d'entrées (0 pour le désactiver)
+# et durée de vie en secondes (None : jusqu'à la prochaine génération d'index)
+SEARCH_RESULT_CACHE_SIZE = 512
+SEARCH_RESULT_CACHE_TTL = None
+# Automates des recherches par regex : construction à la volée (seuls les états atteints
+# pendant le parcours du Trie sont créés ; False : DFA minimal à table dense construit d'avance)
+# et nombre maximal d'états. Au-delà, la recherche passe au moteur de Glushkov, ou est refusée (400)
+# si le motif a plus de 63 positions
+REGEX_LAZY_DFA = True
+REGEX_MAX_DFA_STATES = 5000
+# Moteur des regex : 'dfa', 'glushkov' (NFA simulé en parallèle sur les bits, motifs de 63 positions
+# au plus) ou 'auto' (DFA pour les motifs courts, Glushkov au-delà de 12 positions).
+# Par défaut ('auto' et REGEX_LAZY_DFA) : Glushkov de 13 à 63 positions, LazyDFA sinon
+REGEX_ENGINE = 'auto'
+# Cache LRU des automates compilés (nombre de motifs) et motifs compilés à la première regex
+REGEX_CACHE_SIZE = 256
+REGEX_WARM_PATTERNS = ['.*ing', '.*tion', 'love.*', 'w.*ter', '.*alice']
+# Ingestion (populate_and_index_books) : catalogue Gutendex et modèle d'URL des textes,
+# téléchargements simultanés, requêtes par seconde et par hôte, nouvelles tentatives
+# (attente exponentielle de base GUTENBERG_FETCH_BACKOFF secondes) et délai d'attente
+GUTENDEX_URL = 'https://gutendex.com/books/'
+GUTENBERG_TEXT_URL = 'http://gutenberg.org/ebooks/{book_id}.txt.utf-8'
+GUTENBERG_FETCH_WORKERS = 8
+GUTENBERG_FETCH_RATE = 4
+GUTENBERG_FETCH_RETRIES = 3
+GUTENBERG_FETCH_BACKOFF = 0.5
+GUTENBERG_FETCH_TIMEOUT = 30
+# Stock local des textes des livres (un fichier gzip par livre), rempli à l'ingestion
+CORPUS_STORE_DIR = BASE_DIR / 'corpus'
+# Processus de découpage des textes à l'ingestion (None : un par processeur)
+TOKENIZE_WORKERS = None
+# Indexation incrémentale (populate_and_index_books --incremental) : dérive relative d'IDF
+# en deçà de laquelle les postings déjà écrits d'un mot ne sont pas recalculés
+INCREMENTAL_IDF_TOLERANCE = 0.01
+# Similarités de Jaccard : 'exact' (toutes les paires de livres) ou 'lsh' (seules les paires
+# candidates MinHash/LSH sont comparées), et nombre de fonctions de hachage des signatures
+JACCARD_METHOD = 'lsh'
+MINHASH_PERMUTATIONS = 256
+# Calcul exact de Jaccard (JACCARD_METHOD = 'exact') : 'bitset' (popcount par blocs, répartis
+# entre JACCARD_WORKERS processus, None : un par processeur) ou 'sets' (ensembles Python)
+JACCARD_EXACT_ENGINE = 'bitset'
+JACCARD_WORKERS = None
+# Processus entre lesquels les sources de l'intermédiarité (Brandes) sont réparties (None : un par processeur)
+CENTRALITY_WORKERS = None
+# Centralités : 'exact' ou 'approximate' (pivots tirés au hasard pour la proximité, plus courts
+# chemins tirés au hasard pour l'intermédiarité) ; nombre de tirages CENTRALITY_SAMPLES, ou
+# déduit de l'erreur visée CENTRALITY_EPSILON si None
+CENTRALITY_METHOD = 'exact'
+CENTRALITY_SAMPLES = None
+CENTRALITY_EPSILON = 0.05
+
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
@@ -1,17 +1,38 @@
-from typing import List, Set
+import threading
+from typing import Dict, List, NamedTuple, Optional, Set
 from collections import defaultdict, deque
 
+
+class RegexTooComplex(ValueError):
+    """Motif refusé parce qu'il dépasse une limite (longueur, imbrication, taille d'une classe, nombre d'états)."""
+
+
+class DFABudgetExceeded(RegexTooComplex):
+    """L'automate dépasse le nombre d'états autorisé."""
+
+    def __init__(self, max_states: int):
+        super().__init__(f"Expression régulière trop complexe : plus de {max_states} états dans l'automate")
+        self.max_states = max_states
+
+
 class RegExTree:
     CONCAT = 1000
+    PLUS = 1001
+    OPTION = 1002
+    CLASS = 1003
     ETOILE = ord('*')
     ALTERN = ord('|')
     DOT = ord('.')
 
-    def __init__(self, root: int, subtrees: List['RegExTree'] = None):
+    def __init__(self, root: int, subtrees: List['RegExTree'] = None, symbols: frozenset = frozenset(), negated: bool = False):
         self.root = root
         self.subtrees = subtrees or []
+        self.symbols = symbols  # CLASS : codes des caractères de la classe
+        self.negated = negated  # CLASS : [^...]
 
     def __str__(self):
+        if self.root == self.CLASS:
+            return f"[{'^' if self.negated else ''}{''.join(sorted(map(chr, self.symbols)))}]"
         if not self.subtrees:
             if self.root == self.CONCAT:
                 return '.'
@@ -22,89 +43,129 @@ class RegExTree:
             if self.root == self.DOT:
                 return '.'
             return chr(self.root)
-        root_str = {self.CONCAT: '.', self.ETOILE: '*', self.ALTERN: '|', self.DOT: '.'}.get(self.root, chr(self.root))
+        root_str = {self.CONCAT: '.', self.ETOILE: '*', self.ALTERN: '|', self.DOT: '.',
+                    self.PLUS: '+', self.OPTION: '?'}.get(self.root, chr(self.root))
         return f"{root_str}({','.join(str(t) for t in self.subtrees)})"
 
 class RegExParser:
+    """Analyseur descendant récursif, en une seule passe sur le motif.
+
+    Grammaire (concaténation et alternative associatives à gauche, comme avant) :
+        alternative := concat ('|' concat)*
+        concat      := repetition+
+        repetition  := atome ('*' | '+' | '?')*
+        atome       := caractère | '.' | '(' alternative ')' | '[' '^'? éléments ']'
+    '^' en tête et '$' en fin de motif sont acceptés et ignorés : un mot du Trie doit
+    de toute façon correspondre en entier.
+    """
+    MAX_LENGTH = 256
+    MAX_DEPTH = 32
+    MAX_CLASS_SIZE = 256
+    SPECIAL = set('()|*+?[]')
+
     def __init__(self, regex: str):
         self.regex = regex
+        self.pos = 0
+        self.depth = 0
 
     def char_to_root(self, c: str) -> int:
         return ord(c)
 
     def parse(self) -> RegExTree:
-        trees = [RegExTree(self.char_to_root(c)) for c in self.regex]
-        while len(trees) > 1 or ord('(') in [t.root for t in trees]:
-            trees = self._process_parentheses(trees)
-            trees = self._process_etoile(trees)
-            trees = self._process_concat(trees)
-            trees = self._process_altern(trees)
-        return trees[0]
-
-    def _process_parentheses(self, trees: List[RegExTree]) -> List[RegExTree]:
-        result = []
-        i = 0
-        while i < len(trees):
-            if trees[i].root == ord(')'):
-                content = []
-                while result and result[-1].root != ord('('):
-                    content.insert(0, result.pop())
-                if not result:
-                    raise ValueError("Parenthèses non équilibrées")
-                result.pop()
-                sub_tree = self.parse_sub(content)
-                result.append(sub_tree)
-            else:
-                result.append(trees[i])
-            i += 1
-        return result
-
-    def parse_sub(self, trees: List[RegExTree]) -> RegExTree:
-        while len(trees) > 1:
-            trees = self._process_etoile(trees)
-            trees = self._process_concat(trees)
-            trees = self._process_altern(trees)
-        return trees[0]
-
-    def _process_etoile(self, trees: List[RegExTree]) -> List[RegExTree]:
-        result = []
-        i = 0
-        while i < len(trees):
-            if trees[i].root == RegExTree.ETOILE and not trees[i].subtrees and result:
-                last = result.pop()
-                result.append(RegExTree(RegExTree.ETOILE, [last]))
-            else:
-                result.append(trees[i])
-            i += 1
-        return result
-
-    def _process_concat(self, trees: List[RegExTree]) -> List[RegExTree]:
-        result = []
-        i = 0
-        while i < len(trees):
-            if (result and i < len(trees) and 
-                trees[i].root != RegExTree.ALTERN and 
-                result[-1].root != RegExTree.ALTERN):
-                last = result.pop()
-                result.append(RegExTree(RegExTree.CONCAT, [last, trees[i]]))
-            else:
-                result.append(trees[i])
-            i += 1
-        return result
-
-    def _process_altern(self, trees: List[RegExTree]) -> List[RegExTree]:
-        result = []
-        i = 0
-        while i < len(trees):
-            if trees[i].root == RegExTree.ALTERN and not trees[i].subtrees and result and i + 1 < len(trees):
-                left = result.pop()
-                right = trees[i + 1]
-                result.append(RegExTree(RegExTree.ALTERN, [left, right]))
-                i += 1
+        if len(self.regex) > self.MAX_LENGTH:
+            raise RegexTooComplex(f"Expression régulière trop longue ({len(self.regex)} caractères, maximum {self.MAX_LENGTH})")
+        regex = self.regex
+        if regex.startswith('^'):
+            regex = regex[1:]
+        if regex.endswith('$'):
+            regex = regex[:-1]
+        self.regex = regex
+        self.pos = 0
+        if not regex:
+            raise ValueError("Expression régulière vide")
+        tree = self._parse_alternative()
+        if self.pos < len(regex):
+            raise ValueError(f"Caractère inattendu '{regex[self.pos]}' en position {self.pos}")
+        return tree
+
+    def _peek(self) -> Optional[str]:
+        return self.regex[self.pos] if self.pos < len(self.regex) else None
+
+    def _parse_alternative(self) -> RegExTree:
+        tree = self._parse_concat()
+        while self._peek() == '|':
+            self.pos += 1
+            tree = RegExTree(RegExTree.ALTERN, [tree, self._parse_concat()])
+        return tree
+
+    def _parse_concat(self) -> RegExTree:
+        tree = None
+        while self._peek() is not None and self._peek() not in '|)':
+            item = self._parse_repetition()
+            tree = item if tree is None else RegExTree(RegExTree.CONCAT, [tree, item])
+        if tree is None:
+            raise ValueError(f"Expression vide en position {self.pos}")
+        return tree
+
+    def _parse_repetition(self) -> RegExTree:
+        tree = self._parse_atom()
+        while self._peek() is not None and self._peek() in '*+?':
+            operator = self.regex[self.pos]
+            self.pos += 1
+            root = {'*': RegExTree.ETOILE, '+': RegExTree.PLUS, '?': RegExTree.OPTION}[operator]
+            tree = RegExTree(root, [tree])
+        return tree
+
+    def _parse_atom(self) -> RegExTree:
+        char = self.regex[self.pos]
+        if char == '(':
+            self.depth += 1
+            if self.depth > self.MAX_DEPTH:
+                raise RegexTooComplex(f"Expression régulière trop imbriquée (maximum {self.MAX_DEPTH} niveaux de parenthèses)")
+            self.pos += 1
+            tree = self._parse_alternative()
+            if self._peek() != ')':
+                raise ValueError("Parenthèses non équilibrées")
+            self.pos += 1
+            self.depth -= 1
+            return tree
+        if char == '[':
+            return self._parse_class()
+        if char in self.SPECIAL or char in '^$':
+            raise ValueError(f"Caractère inattendu '{char}' en position {self.pos}")
+        self.pos += 1
+        return RegExTree(self.char_to_root(char))
+
+    def _parse_class(self) -> RegExTree:
+        start = self.pos
+        self.pos += 1
+        negated = self._peek() == '^'
+        if negated:
+            self.pos += 1
+        symbols = set()
+        first = True
+        while True:
+            char = self._peek()
+            if char is None:
+                raise ValueError(f"Classe de caractères non fermée en position {start}")
+            if char == ']' and not first:
+                self.pos += 1
+                break
+            first = False
+            self.pos += 1
+            if self._peek() == '-' and self.pos + 1 < len(self.regex) and self.regex[self.pos + 1] != ']':
+                last = self.regex[self.pos + 1]
+                self.pos += 2
+                if ord(last) < ord(char):
+                    raise ValueError(f"Intervalle invalide {char}-{last}")
+                if ord(last) - ord(char) + 1 + len(symbols) > self.MAX_CLASS_SIZE:
+                    raise RegexTooComplex(f"Classe de caractères trop grande (maximum {self.MAX_CLASS_SIZE} caractères)")
+                symbols.update(range(ord(char), ord(last) + 1))
             else:
-                result.append(trees[i])
-            i += 1
-        return result
+                symbols.add(ord(char))
+            if len(symbols) > self.MAX_CLASS_SIZE:
+                raise RegexTooComplex(f"Classe de caractères trop grande (maximum {self.MAX_CLASS_SIZE} caractères)")
+        return RegExTree(RegExTree.CLASS, symbols=frozenset(symbols), negated=negated)
 
 class NFA:
     DOT_INDEX = 256
@@ -113,6 +174,7 @@ class NFA:
         self.start_state = 0
         self.final_state = 0
         self.transitions = defaultdict(lambda: defaultdict(set))
+        self.negated = defaultdict(list)  # état -> [(caractères exclus, état suivant)] pour les classes [^...]
         self.state_counter = 0
         self.symbols = set()
 
@@ -120,6 +182,23 @@ class NFA:
         self.state_counter += 1
         return self.state_counter - 1
 
+    def move(self, states, symbol: int) -> Set[int]:
+        """États atteints depuis states en lisant symbol (DOT_INDEX : un caractère absent de la regex).
+
+        Un caractère explicite suit aussi les transitions DOT et celles des classes [^...] qui ne l'excluent pas.
+        """
+        targets = set()
+        for state in states:
+            moves = self.transitions.get(state)
+            if moves:
+                targets.update(moves.get(symbol, ()))
+                if symbol != self.DOT_INDEX:
+                    targets.update(moves.get(self.DOT_INDEX, ()))
+            for excluded, target in self.negated.get(state, ()):
+                if symbol not in excluded:
+                    targets.add(target)
+        return targets
+
     def from_regex_tree(self, tree: RegExTree) -> 'NFA':
         self.start_state, self.final_state = self._build_transitions(tree)
         return self
@@ -158,6 +237,40 @@ class NFA:
             self.transitions[inner_end][0].add(end)
             return start, end
 
+        elif tree.root == RegExTree.PLUS:
+            if len(tree.subtrees) != 1:
+                raise ValueError(f"Plus attend 1 sous-arbre, mais {len(tree.subtrees)} trouvé(s) : {tree}")
+            start = self._next_state()
+            end = self._next_state()
+            inner_start, inner_end = self._build_transitions(tree.subtrees[0])
+            self.transitions[start][0].add(inner_start)
+            self.transitions[inner_end][0].add(inner_start)
+            self.transitions[inner_end][0].add(end)
+            return start, end
+
+        elif tree.root == RegExTree.OPTION:
+            if len(tree.subtrees) != 1:
+                raise ValueError(f"Option attend 1 sous-arbre, mais {len(tree.subtrees)} trouvé(s) : {tree}")
+            start = self._next_state()
+            end = self._next_state()
+            inner_start, inner_end = self._build_transitions(tree.subtrees[0])
+            self.transitions[start][0].add(inner_start)
+            self.transitions[start][0].add(end)
+            self.transitions[inner_end][0].add(end)
+            return start, end
+
+        elif tree.root == RegExTree.CLASS:
+            start = self._next_state()
+            end = self._next_state()
+            self.symbols.update(tree.symbols)
+            if tree.negated:
+                self.negated[start].append((tree.symbols, end))
+                self.symbols.add(self.DOT_INDEX)
+            else:
+                for symbol in tree.symbols:
+                    self.transitions[start][symbol].add(end)
+            return start, end
+
         else:  # Caractère ou DOT
             start = self._next_state()
             end = self._next_state()
@@ -181,7 +294,8 @@ class DFA:
         self.state_counter += 1
         return self.state_counter - 1
 
-    def _epsilon_closure(self, states: Set[int], nfa: NFA) -> Set[int]:
+    @staticmethod
+    def _epsilon_closure(states: Set[int], nfa: NFA) -> Set[int]:
         closure = set(states)
         stack = list(states)
         while stack:
@@ -192,7 +306,7 @@ class DFA:
                     stack.append(next_state)
         return closure
 
-    def from_nfa(self, nfa: NFA) -> 'DFA':
+    def from_nfa(self, nfa: NFA, max_states: Optional[int] = None) -> 'DFA':
         self.symbols = nfa.symbols
         state_map = {}
         queue = deque()
@@ -207,14 +321,14 @@ class DFA:
             current_state = state_map[current_set]
 
             for symbol in self.symbols:
-                next_set = set()
-                for state in current_set:
-                    next_set.update(nfa.transitions[state].get(symbol, set()))
+                next_set = nfa.move(current_set, symbol)
                 if not next_set:
                     continue
                 next_set = frozenset(self._epsilon_closure(next_set, nfa))
 
                 if next_set not in state_map:
+                    if max_states is not None and self.state_counter >= max_states:
+                        raise DFABudgetExceeded(max_states)
                     state_map[next_set] = self._next_state()
                     queue.append(next_set)
                 self.transitions[current_state][symbol] = state_map[next_set]
@@ -230,7 +344,7 @@ class DFA:
             symbol = ord(char)
             if symbol in self.transitions[current_state]:
                 current_state = self.transitions[current_state][symbol]
-            elif self.DOT_INDEX in self.transitions[current_state]:
+            elif symbol not in self.symbols and self.DOT_INDEX in self.transitions[current_state]:
                 current_state = self.transitions[current_state][self.DOT_INDEX]
             else:
                 return False
@@ -242,18 +356,595 @@ class DFA:
         symbol = ord(char)
         if symbol in self.transitions[state]:
             return self.transitions[state][symbol]
-        elif self.DOT_INDEX in self.transitions[state]:
+        elif symbol not in self.symbols and self.DOT_INDEX in self.transitions[state]:
             return self.transitions[state][self.DOT_INDEX]
         return -1  # Retourne -1 si aucune transition n'est possible
 
     def is_accepting(self, state: int) -> bool:
         return state in self.final_states
 
-def build_dfa_from_regex(regex: str) -> DFA:
+    def to_dense(self, minimize: bool = True) -> 'DenseDFA':
+        """Complète le DFA, le minimise (Hopcroft) et le range dans une table de transitions dense."""
+        symbols = sorted(symbol for symbol in self.symbols if symbol != self.DOT_INDEX)
+        class_count = len(symbols) + 1  # classe 0 : tout caractère absent de la regex (DOT)
+        dead = self.state_counter
+        state_count = dead + 1
+        delta = []
+        for state in range(state_count):
+            row = self.transitions.get(state, {})
+            other = row.get(self.DOT_INDEX, dead)
+            delta.append([other] + [row.get(symbol, dead) for symbol in symbols])
+
+        if minimize:
+            block_of = _hopcroft(state_count, class_count, delta, self.final_states)
+        else:
+            block_of = list(range(state_count))
+
+        # Renumérotation en largeur depuis l'état initial ; le bloc de l'état puits devient DEAD
+        dead_block = block_of[dead]
+        start_block = block_of[self.start_state]
+        offsets = {start_block: 0}
+        order = [self.start_state]
+        table = []
+        accepting = bytearray()
+        index = 0
+        while index < len(order):
+            state = order[index]
+            index += 1
+            row = []
+            for target in delta[state]:
+                block = block_of[target]
+                if block == dead_block:
+                    row.append(DenseDFA.DEAD)
+                    continue
+                if block not in offsets:
+                    offsets[block] = len(order) * class_count
+                    order.append(target)
+                row.append(offsets[block])
+            table.extend(row)
+            accepting.extend([state in self.final_states] * class_count)
+
+        class_of = {chr(symbol): position + 1 for position, symbol in enumerate(symbols)}
+        return DenseDFA(class_of, class_count, table, 0, accepting)
+
+
+def _hopcroft(state_count: int, class_count: int, delta: List[List[int]], final_states: Set[int]) -> List[int]:
+    """Algorithme de Hopcroft : renvoie le bloc (classe d'équivalence) de chaque état d'un DFA complet."""
+    inverse = [defaultdict(list) for _ in range(class_count)]
+    for state, row in enumerate(delta):
+        for symbol_class, target in enumerate(row):
+            inverse[symbol_class][target].append(state)
+
+    accepting = {state for state in final_states if state < state_count}
+    rejecting = set(range(state_count)) - accepting
+    blocks = [block for block in (accepting, rejecting) if block]
+    block_of = [0] * state_count
+    for index, block in enumerate(blocks):
+        for state in block:
+            block_of[state] = index
+
+    waiting = [min(range(len(blocks)), key=lambda index: len(blocks[index]))]
+    in_waiting = set(waiting)
+    while waiting:
+        splitter_index = waiting.pop()
+        in_waiting.discard(splitter_index)
+        # Les blocs scindés sont remplacés par de nouveaux ensembles : splitter reste inchangé
+        splitter = blocks[splitter_index]
+        for symbol_class in range(class_count):
+            predecessors = defaultdict(set)
+            for target in splitter:
+                for state in inverse[symbol_class].get(target, ()):
+                    predecessors[block_of[state]].add(state)
+            for index, inside in predecessors.items():
+                block = blocks[index]
+                if len(inside) == len(block):
+                    continue
+                outside = block - inside
+                blocks[index] = inside
+                blocks.append(outside)
+                new_index = len(blocks) - 1
+                for state in outside:
+                    block_of[state] = new_index
+                if index in in_waiting:
+                    waiting.append(new_index)
+                    in_waiting.add(new_index)
+                else:
+                    smaller = index if len(inside) <= len(outside) else new_index
+                    waiting.append(smaller)
+                    in_waiting.add(smaller)
+    return block_of
+
+
+class DenseDFA:
+    """DFA minimal dont les transitions sont rangées dans une table dense.
+
+    L'alphabet est remappé en classes : une par caractère explicite de la regex, plus
+    la classe 0 pour tous les autres caractères (DOT). Un état est le décalage de sa
+    ligne dans `table` (numéro d'état × nombre de classes), si bien qu'une transition
+    coûte un accès à class_of et un accès à table. DEAD (-1) signifie « aucune transition ».
+    """
+    DEAD = -1
+    literal_prefixes = None  # littéraux obligatoires en tête des mots acceptés, renseignés par build_dfa_from_regex
+    trigram_query = ('any',)
+
+    def __init__(self, class_of: Dict[str, int], class_count: int, table: List[int], start_state: int, accepting: bytearray):
+        self.class_of = class_of
+        self.class_count = class_count
+        self.table = table
+        self.start_state = start_state
+        self.accepting = accepting
+
+    @property
+    def state_count(self) -> int:
+        return len(self.table) // self.class_count
+
+    @property
+    def final_states(self) -> Set[int]:
+        return {state for state in range(0, len(self.table), self.class_count) if self.accepting[state]}
+
+    def transition(self, state: int, char: str) -> int:
+        if state < 0:
+            return self.DEAD
+        return self.table[state + self.class_of.get(char, 0)]
+
+    def is_accepting(self, state: int) -> bool:
+        return state >= 0 and bool(self.accepting[state])
+
+    def match(self, text: str) -> bool:
+        table = self.table
+        class_of = self.class_of
+        state = self.start_state
+        for char in text:
+            state = table[state + class_of.get(char, 0)]
+            if state < 0:
+                return False
+            if self.accepting[state]:
+                return True
+        return bool(self.accepting[state])
+
+
+class LazyDFA:
+    """DFA construit à la volée : un état (ensemble d'états du NFA) n'est créé que lorsqu'une
+    transition y mène pendant le parcours, puis mémorisé.
+
+    Même disposition que DenseDFA (classes de caractères, états = décalages de ligne), mais les
+    cases pas encore calculées valent UNKNOWN et sont remplies par expand(). Au-delà de
+    max_states états, expand() lève DFABudgetExceeded au lieu de continuer à construire.
+    """
+    DEAD = -1
+    UNKNOWN = -2
+    literal_prefixes = None
+    trigram_query = ('any',)
+
+    def __init__(self, nfa: NFA, max_states: Optional[int] = None):
+        symbols = sorted(symbol for symbol in nfa.symbols if symbol != NFA.DOT_INDEX)
+        self.nfa = nfa
+        self.max_states = max_states
+        self.class_of = {chr(symbol): position + 1 for position, symbol in enumerate(symbols)}
+        self.class_count = len(symbols) + 1
+        self._class_symbols = [NFA.DOT_INDEX] + symbols
+        self.table = []
+        self.accepting = bytearray()
+        self._state_sets = []
+        self._state_offsets = {}
+        self._lock = threading.Lock()
+        self.start_state = self._add_state(frozenset(DFA._epsilon_closure({nfa.start_state}, nfa)))
+
+    @property
+    def state_count(self) -> int:
+        return len(self._state_sets)
+
+    def _add_state(self, state_set: frozenset) -> int:
+        if self.max_states is not None and len(self._state_sets) >= self.max_states:
+            raise DFABudgetExceeded(self.max_states)
+        offset = len(self.table)
+        self._state_sets.append(state_set)
+        self._state_offsets[state_set] = offset
+        self.table.extend([self.UNKNOWN] * self.class_count)
+        self.accepting.extend([self.nfa.final_state in state_set] * self.class_count)
+        return offset
+
+    def expand(self, state: int, symbol_class: int) -> int:
+        """Calcule (et mémorise) la transition de state sur la classe de caractères donnée."""
+        with self._lock:
+            target = self.table[state + symbol_class]
+            if target != self.UNKNOWN:
+                return target
+            next_set = self.nfa.move(self._state_sets[state // self.class_count], self._class_symbols[symbol_class])
+            if not next_set:
+                target = self.DEAD
+            else:
+                next_set = frozenset(DFA._epsilon_closure(next_set, self.nfa))
+                target = self._state_offsets.get(next_set)
+                if target is None:
+                    target = self._add_state(next_set)
+            self.table[state + symbol_class] = target
+            return target
+
+    def transition(self, state: int, char: str) -> int:
+        if state < 0:
+            return self.DEAD
+        symbol_class = self.class_of.get(char, 0)
+        target = self.table[state + symbol_class]
+        if target == self.UNKNOWN:
+            target = self.expand(state, symbol_class)
+        return target
+
+    def is_accepting(self, state: int) -> bool:
+        return state >= 0 and bool(self.accepting[state])
+
+    def match(self, text: str) -> bool:
+        state = self.start_state
+        for char in text:
+            state = self.transition(state, char)
+            if state < 0:
+                return False
+            if self.accepting[state]:
+                return True
+        return bool(self.accepting[state])
+
+
+MAX_LITERAL_PREFIXES = 32
+
+
+def literal_prefixes(tree: RegExTree, max_count: int = MAX_LITERAL_PREFIXES) -> Optional[List[str]]:
+    """Littéraux par lesquels commence obligatoirement tout mot accepté par la regex.
+
+    Renvoie None quand la regex peut commencer par n'importe quoi (.*alice, [^a]b, a*...)
+    ou quand il faudrait plus de max_count littéraux. Aucun littéral n'est préfixe d'un autre.
+    """
+    prefixes, _ = _prefix_set(tree, max_count)
+    if '' in prefixes:
+        return None
+    result = []
+    for prefix in sorted(prefixes):
+        if not result or not prefix.startswith(result[-1]):
+            result.append(prefix)
+    return result
+
+
+def _prefix_set(tree: RegExTree, max_count: int):
+    """(ensemble de préfixes, exact) : exact signifie que l'ensemble est le langage entier du sous-arbre."""
+    root = tree.root
+    if root == RegExTree.CONCAT:
+        left, left_exact = _prefix_set(tree.subtrees[0], max_count)
+        if not left_exact:
+            return left, False
+        right, right_exact = _prefix_set(tree.subtrees[1], max_count)
+        if len(left) * len(right) > max_count:
+            return left, False
+        return {a + b for a in left for b in right}, right_exact
+    if root == RegExTree.ALTERN:
+        left, left_exact = _prefix_set(tree.subtrees[0], max_count)
+        right, right_exact = _prefix_set(tree.subtrees[1], max_count)
+        union = left | right
+        if len(union) > max_count:
+            # On ne garde que le premier caractère de chaque littéral
+            union = {prefix[:1] for prefix in union}
+            return (union, False) if len(union) <= max_count else ({''}, False)
+        return union, left_exact and right_exact
+    if root == RegExTree.OPTION:
+        inner, inner_exact = _prefix_set(tree.subtrees[0], max_count)
+        return inner | {''}, inner_exact
+    if root == RegExTree.PLUS:
+        inner, _ = _prefix_set(tree.subtrees[0], max_count)
+        return inner, False
+    if root == RegExTree.ETOILE or root == RegExTree.DOT:
+        return {''}, False
+    if root == RegExTree.CLASS:
+        if tree.negated or len(tree.symbols) > max_count:
+            return {''}, False
+        return {chr(symbol) for symbol in tree.symbols}, True
+    return {chr(root)}, True
+
+
+MAX_TRIGRAM_STRINGS = 16
+
+TRIGRAM_ANY = ('any',)
+
+
+class _TrigramInfo(NamedTuple):
+    emptyable: bool          # le sous-arbre accepte le mot vide
+    exact: Optional[set]     # langage exact du sous-arbre s'il est petit, sinon None
+    prefix: set              # tout mot accepté commence par l'une de ces chaînes
+    suffix: set              # tout mot accepté finit par l'une de ces chaînes
+    match: tuple             # requête de trigrammes satisfaite par tout mot accepté
+
+
+def _and_query(left, right):
+    if left == TRIGRAM_ANY:
+        return right
+    if right == TRIGRAM_ANY:
+        return left
+    parts = []
+    for query in (left, right):
+        for part in (query[1] if query[0] == 'and' else [query]):
+            if part not in parts:
+                parts.append(part)
+    return ('and', parts)
+
+
+def _or_query(left, right):
+    if left == TRIGRAM_ANY or right == TRIGRAM_ANY:
+        return TRIGRAM_ANY
+    parts = []
+    for query in (left, right):
+        for part in (query[1] if query[0] == 'or' else [query]):
+            if part not in parts:
+                parts.append(part)
+    return ('or', parts)
+
+
+def _strings_query(strings):
+    """Requête « le mot contient l'une de ces chaînes » ; une chaîne de moins de 3 caractères ne restreint rien."""
+    if not strings or any(len(string) < 3 for string in strings):
+        return TRIGRAM_ANY
+    query = None
+    for string in sorted(strings):
+        string_query = TRIGRAM_ANY
+        for i in range(len(string) - 2):
+            string_query = _and_query(string_query, ('tri', string[i:i + 3]))
+        query = string_query if query is None else _or_query(query, string_query)
+    return query
+
+
+def _trim(strings, keep_start):
+    """Borne la taille d'un ensemble de préfixes (keep_start) ou de suffixes en raccourcissant les chaînes."""
+    if len(strings) <= MAX_TRIGRAM_STRINGS:
+        return strings
+    strings = {string[:2] if keep_start else string[-2:] for string in strings}
+    return strings if len(strings) <= MAX_TRIGRAM_STRINGS else {''}
+
+
+def _cross(left, right):
+    if len(left) * len(right) > MAX_TRIGRAM_STRINGS:
+        left = {string[-2:] for string in left}
+        right = {string[:2] for string in right}
+        if len(left) * len(right) > MAX_TRIGRAM_STRINGS:
+            return {''}
+    return {a + b for a in left for b in right}
+
+
+def _exact_query(info):
+    return _and_query(info.match, _strings_query(info.exact)) if info.exact is not None else info.match
+
+
+def _trigram_info(tree: RegExTree) -> _TrigramInfo:
+    root = tree.root
+    if root == RegExTree.CONCAT:
+        left = _trigram_info(tree.subtrees[0])
+        right = _trigram_info(tree.subtrees[1])
+        emptyable = left.emptyable and right.emptyable
+        match = _and_query(left.match, right.match)
+        if left.exact is not None and right.exact is not None and len(left.exact) * len(right.exact) <= MAX_TRIGRAM_STRINGS:
+            exact = {a + b for a in left.exact for b in right.exact}
+            return _TrigramInfo(emptyable, exact, exact, exact, match)
+        # Trigrammes à cheval sur la frontière, puis ceux des langages exacts abandonnés
+        match = _and_query(match, _strings_query(_cross(left.suffix, right.prefix)))
+        match = _and_query(_and_query(match, _exact_query(left)), _exact_query(right))
+        prefix = _cross(left.exact, right.prefix) if left.exact is not None else set(left.prefix)
+        if left.emptyable:
+            prefix |= right.prefix
+        suffix = _cross(left.suffix, right.exact) if right.exact is not None else set(right.suffix)
+        if right.emptyable:
+            suffix |= left.suffix
+        return _TrigramInfo(emptyable, None, _trim(prefix, True), _trim(suffix, False), match)
+    if root == RegExTree.ALTERN:
+        left = _trigram_info(tree.subtrees[0])
+        right = _trigram_info(tree.subtrees[1])
+        emptyable = left.emptyable or right.emptyable
+        if left.exact is not None and right.exact is not None and len(left.exact | right.exact) <= MAX_TRIGRAM_STRINGS:
+            exact = left.exact | right.exact
+            return _TrigramInfo(emptyable, exact, exact, exact, _or_query(left.match, right.match))
+        return _TrigramInfo(emptyable, None, _trim(left.prefix | right.prefix, True),
+                            _trim(left.suffix | right.suffix, False), _or_query(_exact_query(left), _exact_query(right)))
+    if root == RegExTree.OPTION:
+        inner = _trigram_info(tree.subtrees[0])
+        if inner.exact is not None and len(inner.exact) < MAX_TRIGRAM_STRINGS:
+            exact = inner.exact | {''}
+            return _TrigramInfo(True, exact, exact, exact, inner.match)
+        return _TrigramInfo(True, None, {''}, {''}, TRIGRAM_ANY)
+    if root == RegExTree.PLUS:
+        inner = _trigram_info(tree.subtrees[0])
+        return _TrigramInfo(inner.emptyable, None, inner.prefix, inner.suffix, _exact_query(inner))
+    if root == RegExTree.ETOILE:
+        return _TrigramInfo(True, None, {''}, {''}, TRIGRAM_ANY)
+    if root == RegExTree.DOT or (root == RegExTree.CLASS and (tree.negated or len(tree.symbols) > MAX_TRIGRAM_STRINGS)):
+        return _TrigramInfo(False, None, {''}, {''}, TRIGRAM_ANY)
+    exact = {chr(symbol) for symbol in tree.symbols} if root == RegExTree.CLASS else {chr(root)}
+    return _TrigramInfo(False, exact, exact, exact, TRIGRAM_ANY)
+
+
+def trigram_query(tree: RegExTree) -> tuple:
+    """Requête de trigrammes (à la Russ Cox) que contient tout mot accepté par la regex.
+
+    Forme : ('any',), ('tri', 'abc'), ('and', [requêtes]) ou ('or', [requêtes]).
+    ('any',) signifie qu'aucun trigramme n'est garanti (la regex peut accepter des mots très courts).
+    """
+    info = _trigram_info(tree)
+    if info.exact is not None:
+        return _exact_query(info)
+    return _and_query(info.match, _and_query(_strings_query(info.prefix), _strings_query(info.suffix)))
+
+
+class GlushkovMatcher:
+    """NFA de Glushkov simulé en parallèle sur les bits d'un entier, pour les motifs courts.
+
+    Chaque feuille de l'arbre (caractère, DOT ou classe) est une position ; le bit 0 est
+    l'état initial et le bit p la position p, d'où au plus MAX_POSITIONS positions.
+    Aucune construction par sous-ensembles : un état est l'ensemble des positions actives
+    et une transition calcule (Follow(état) & masque du caractère), Follow étant lu par
+    tranches de 8 bits dans des tables précalculées. Même interface que les DFA
+    (start_state, transition, is_accepting, match) ; DEAD (-1) quand plus aucune position n'est active.
+    """
+    DEAD = -1
+    MAX_POSITIONS = 63
+    literal_prefixes = None
+    trigram_query = TRIGRAM_ANY
+
+    def __init__(self, tree: RegExTree):
+        self._position_symbols = [None]  # position -> (caractères, exclus) ; None pour la position 0
+        self._follow = [0]
+        first, last, nullable = self._glushkov(tree)
+        position_count = len(self._position_symbols) - 1
+        if position_count > self.MAX_POSITIONS:
+            raise RegexTooComplex(f"Motif trop long pour le moteur bit-parallèle ({position_count} positions, maximum {self.MAX_POSITIONS})")
+        self._follow[0] = first
+        self.final_mask = last | (1 if nullable else 0)
+        self.start_state = 1
+
+        explicit = set()
+        for symbols, _ in self._position_symbols[1:]:
+            if symbols:
+                explicit.update(symbols)
+        self.masks = dict.fromkeys(explicit, 0)  # caractère de la regex -> positions qui l'acceptent
+        self.other_mask = 0                      # positions qui acceptent tout autre caractère
+        for position, (symbols, negated) in enumerate(self._position_symbols[1:], start=1):
+            bit = 1 << position
+            if symbols is None or negated:
+                self.other_mask |= bit
+            for char in explicit:
+                if symbols is None or (char in symbols) != negated:
+                    self.masks[char] |= bit
+
+        self.follow_tables = []  # tranches de 8 bits, des poids faibles aux poids forts
+        for shift in range(0, position_count + 1, 8):
+            table = [0] * 256
+            for byte in range(1, 256):
+                low = byte & -byte
+                position = shift + low.bit_length() - 1
+                follow = self._follow[position] if position < len(self._follow) else 0
+                table[byte] = table[byte ^ low] | follow
+            self.follow_tables.append(table)
+
+    @staticmethod
+    def count_positions(tree: RegExTree) -> int:
+        """Nombre de feuilles (caractères, DOT, classes) de l'arbre."""
+        stack = [tree]
+        count = 0
+        while stack:
+            node = stack.pop()
+            if node.root in (RegExTree.CONCAT, RegExTree.ALTERN, RegExTree.ETOILE, RegExTree.PLUS, RegExTree.OPTION):
+                stack.extend(node.subtrees)
+            else:
+                count += 1
+        return count
+
+    def _glushkov(self, tree: RegExTree):
+        """(First, Last, annulable) du sous-arbre ; complète Follow au passage."""
+        root = tree.root
+        if root == RegExTree.CONCAT:
+            first1, last1, nullable1 = self._glushkov(tree.subtrees[0])
+            first2, last2, nullable2 = self._glushkov(tree.subtrees[1])
+            self._add_follow(last1, first2)
+            return (first1 | first2 if nullable1 else first1), (last1 | last2 if nullable2 else last2), nullable1 and nullable2
+        if root == RegExTree.ALTERN:
+            first1, last1, nullable1 = self._glushkov(tree.subtrees[0])
+            first2, last2, nullable2 = self._glushkov(tree.subtrees[1])
+            return first1 | first2, last1 | last2, nullable1 or nullable2
+        if root in (RegExTree.ETOILE, RegExTree.PLUS, RegExTree.OPTION):
+            first, last, nullable = self._glushkov(tree.subtrees[0])
+            if root != RegExTree.OPTION:
+                self._add_follow(last, first)
+            return first, last, nullable or root != RegExTree.PLUS
+        position = len(self._position_symbols)
+        if root == RegExTree.DOT:
+            self._position_symbols.append((None, False))
+        elif root == RegExTree.CLASS:
+            self._position_symbols.append(({chr(symbol) for symbol in tree.symbols}, tree.negated))
+        else:
+            self._position_symbols.append(({chr(root)}, False))
+        self._follow.append(0)
+        return 1 << position, 1 << position, False
+
+    def _add_follow(self, positions: int, follow: int):
+        while positions:
+            low = positions & -positions
+            self._follow[low.bit_length() - 1] |= follow
+            positions ^= low
+
+    def transition(self, state: int, char: str) -> int:
+        if state <= 0:
+            return self.DEAD
+        reach = 0
+        for table in self.follow_tables:
+            reach |= table[state & 0xff]
+            state >>= 8
+            if not state:
+                break
+        reach &= self.masks.get(char, self.other_mask)
+        return reach or self.DEAD
+
+    def is_accepting(self, state: int) -> bool:
+        return state > 0 and bool(state & self.final_mask)
+
+    def match(self, text: str) -> bool:
+        state = self.start_state
+        for char in text:
+            state = self.transition(state, char)
+            if state < 0:
+                return False
+            if state & self.final_mask:
+                return True
+        return bool(state & self.final_mask)
+
+
+REGEX_ENGINES = ('auto', 'dfa', 'glushkov')
+AUTO_DFA_MAX_POSITIONS = 12  # au plus 2**12 + 1 états de DFA : pas d'explosion possible sous le budget par défaut
+
+
+def select_engine(tree: RegExTree) -> str:
+    """Moteur choisi en mode 'auto' selon la taille du motif (nombre de positions de Glushkov).
+
+    Un DFA issu d'un motif à m positions a au plus 2**m + 1 états : jusqu'à AUTO_DFA_MAX_POSITIONS,
+    le DFA (une lecture de table par caractère) est sûr et le plus rapide. Au-delà et jusqu'à
+    GlushkovMatcher.MAX_POSITIONS, la simulation bit-parallèle évite tout risque d'explosion ;
+    les motifs plus longs restent au DFA, borné par son budget d'états.
+    """
+    positions = GlushkovMatcher.count_positions(tree)
+    if AUTO_DFA_MAX_POSITIONS < positions <= GlushkovMatcher.MAX_POSITIONS:
+        return 'glushkov'
+    return 'dfa'
+
+
+def build_matcher(regex: str, engine: str = 'auto', lazy: bool = True, max_states: Optional[int] = None):
+    """Automate de recherche de la regex selon le moteur demandé.
+
+    'dfa' : DFA construit à la volée (lazy) ou minimal à table dense ; 'glushkov' : simulation
+    bit-parallèle du NFA de Glushkov ; 'auto' : voir select_engine. L'automate porte
+    literal_prefixes et trigram_query (voir les fonctions du même nom).
+    """
+    if engine not in REGEX_ENGINES:
+        raise ValueError(f"Moteur de regex inconnu : {engine} (valeurs possibles : {REGEX_ENGINES})")
+    tree = RegExParser(regex).parse()
+    if engine == 'auto':
+        engine = select_engine(tree)
+    if engine == 'glushkov':
+        matcher = GlushkovMatcher(tree)
+    else:
+        nfa = NFA().from_regex_tree(tree)
+        matcher = LazyDFA(nfa, max_states) if lazy else DFA().from_nfa(nfa, max_states).to_dense()
+    matcher.literal_prefixes = literal_prefixes(tree)
+    matcher.trigram_query = trigram_query(tree)
+    return matcher
+
+
+def build_dfa_from_regex(regex: str, minimize: bool = True, lazy: bool = False, max_states: Optional[int] = None):
+    """DFA de la regex : minimal à table dense, ou construit à la volée (lazy) pendant le parcours.
+
+    L'automate porte aussi literal_prefixes et trigram_query (voir les fonctions du même nom).
+    Lève DFABudgetExceeded si l'automate dépasse max_states états.
+    """
     parser = RegExParser(regex)
     tree = parser.parse()
     nfa = NFA().from_regex_tree(tree)
-    return DFA().from_nfa(nfa)
+    if lazy:
+        dfa = LazyDFA(nfa, max_states)
+    else:
+        dfa = DFA().from_nfa(nfa, max_states).to_dense(minimize)
+    dfa.literal_prefixes = literal_prefixes(tree)
+    dfa.trigram_query = trigram_query(tree)
+    return dfa
 
 if __name__ == "__main__":
     test_regexes = ["alice", ".*alice", "(ali*)", "..alice"]
@@ -262,7 +953,8 @@ if __name__ == "__main__":
         dfa = build_dfa_from_regex(regex)
         print(f"Start state: {dfa.start_state}")
         print(f"Final states: {dfa.final_states}")
-        print(f"Transitions: {dict(dfa.transitions)}")
+        print(f"States: {dfa.state_count}, classes: {dfa.class_of} (+ DOT)")
+        print(f"Transitions: {dfa.table}")
         
         test_strings = ["alice", "malice", "chalice", "malicious", "ali", "alii", "waterfall"]
         for test_string in test_strings:
@@ -1,4 +1,16 @@
+import math
+import os
+import random
 from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
+
+PARALLEL_MIN_NODES = 300  # en deçà, l'intermédiarité est calculée sans pool de processus
+SOURCE_CHUNKS_PER_WORKER = 4  # lots de sources par processus, pour équilibrer la charge
+DEFAULT_EPSILON = 0.05  # erreur visée par les estimations par échantillonnage
+DEFAULT_DELTA = 0.1  # probabilité de dépasser cette erreur
+RK_CONSTANT = 0.5  # constante universelle de la borne de Riondato et Kornaropoulos
+
+_adjacency = None
 
 def build_graph(table_jaccard):
     graph = defaultdict(set)
@@ -29,7 +41,8 @@ def bfs_shortest_path(graph, start):
 
     while queue:
         current = queue.popleft()
-        for neighbor in graph[current]:
+        # get : un livre sans arête ne doit pas devenir un noeud du graphe (defaultdict de build_graph)
+        for neighbor in graph.get(current, ()):
             if neighbor not in visited:
                 visited.add(neighbor)
                 distances[neighbor] = distances[current] + 1
@@ -40,7 +53,78 @@ def bfs_shortest_path(graph, start):
             distances[node] = float('inf')
     return distances
 
-def betweenness_centrality(graph, book_ids):
+def betweenness_centrality(graph, book_ids, workers=None):
+    """Intermédiarité des livres demandés, par l'algorithme de Brandes (O(VE)).
+
+    Le graphe est converti en listes d'adjacence indexées par des entiers ; les sources sont
+    réparties entre workers processus (un par processeur par défaut) et leurs contributions
+    additionnées. Comme auparavant, les paires (s, t) sont comptées dans les deux sens et
+    la somme est divisée par betweenness_normalization(nombre de noeuds du graphe).
+    """
+    nodes, index, adjacency = compact_graph(graph)
+    workers = min(workers or os.cpu_count() or 1, len(nodes))
+
+    if workers > 1 and len(nodes) >= PARALLEL_MIN_NODES:
+        chunk_count = workers * SOURCE_CHUNKS_PER_WORKER
+        source_chunks = [range(start, len(nodes), chunk_count) for start in range(chunk_count)]
+        betweenness = [0.0] * len(nodes)
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(adjacency,)) as executor:
+            for partial in executor.map(_worker_dependencies, source_chunks):
+                betweenness = [total + value for total, value in zip(betweenness, partial)]
+    else:
+        betweenness = brandes_dependencies(adjacency, range(len(nodes)))
+
+    norm_factor = betweenness_normalization(len(nodes))
+    return {book_id: betweenness[index[book_id]] / norm_factor if book_id in index else 0.0 for book_id in book_ids}
+
+def compact_graph(graph, book_ids=()):
+    """(noeuds, {noeud: indice}, listes d'adjacence par indice) ; les book_ids absents du graphe sont des noeuds isolés."""
+    nodes = list(graph)
+    nodes.extend(book_id for book_id in dict.fromkeys(book_ids) if book_id not in graph)
+    index = {node: i for i, node in enumerate(nodes)}
+    adjacency = [[index[neighbor] for neighbor in graph[node]] if node in graph else [] for node in nodes]
+    return nodes, index, adjacency
+
+def brandes_dependencies(adjacency, sources):
+    """Somme, sur les sources données, des dépendances de Brandes de chaque noeud."""
+    betweenness = [0.0] * len(adjacency)
+    for s in sources:
+        distance = [-1] * len(adjacency)
+        sigma = [0] * len(adjacency)  # nombre de plus courts chemins depuis s (entiers exacts)
+        distance[s], sigma[s] = 0, 1
+        order = [s]
+        queue = deque([s])
+        while queue:
+            v = queue.popleft()
+            for w in adjacency[v]:
+                if distance[w] < 0:
+                    distance[w] = distance[v] + 1
+                    order.append(w)
+                    queue.append(w)
+                if distance[w] == distance[v] + 1:
+                    sigma[w] += sigma[v]
+
+        # Accumulation des dépendances, des noeuds les plus éloignés vers s ; les
+        # prédécesseurs de w sur les plus courts chemins sont ses voisins à distance - 1
+        delta = [0.0] * len(adjacency)
+        for w in reversed(order):
+            coefficient = (1 + delta[w]) / sigma[w]
+            for v in adjacency[w]:
+                if distance[v] == distance[w] - 1:
+                    delta[v] += sigma[v] * coefficient
+            if w != s:
+                betweenness[w] += delta[w]
+    return betweenness
+
+def init_worker(adjacency):
+    global _adjacency
+    _adjacency = adjacency
+
+def _worker_dependencies(sources):
+    return brandes_dependencies(_adjacency, sources)
+
+def betweenness_centrality_naive(graph, book_ids):
+    """Ancienne version (parcours des prédécesseurs pour chaque cible), conservée pour run_tests."""
     betweenness = defaultdict(float)
     all_nodes = set(graph.keys())
 
@@ -69,10 +153,13 @@ def betweenness_centrality(graph, book_ids):
                 betweenness[v] += paths_through[v] / shortest_paths[t] if shortest_paths[t] > 0 else 0
 
     # Normaliser et limiter aux book_ids demandés
-    n = len(all_nodes)
-    norm_factor = (n - 1) * (n - 2) / 2 if n > 2 else 1
+    norm_factor = betweenness_normalization(len(all_nodes))
     return {book_id: betweenness[book_id] / norm_factor for book_id in book_ids}
 
+def betweenness_normalization(n):
+    """Facteur de normalisation de l'intermédiarité pour un graphe de n noeuds."""
+    return (n - 1) * (n - 2) / 2 if n > 2 else 1
+
 def bfs_with_predecessors(graph, start):
     distances = {start: 0}
     shortest_paths = {start: 1}
@@ -93,3 +180,138 @@ def bfs_with_predecessors(graph, start):
                 shortest_paths[neighbor] += shortest_paths[current]
                 predecessors[neighbor][start].append(current)
     return predecessors, shortest_paths
+
+def connected_components(adjacency):
+    """Composantes connexes (listes d'indices) d'un graphe en listes d'adjacence."""
+    seen = [False] * len(adjacency)
+    components = []
+    for start in range(len(adjacency)):
+        if seen[start]:
+            continue
+        seen[start] = True
+        component = [start]
+        for v in component:  # la liste s'allonge pendant le parcours
+            for w in adjacency[v]:
+                if not seen[w]:
+                    seen[w] = True
+                    component.append(w)
+        components.append(component)
+    return components
+
+def bfs_distances(adjacency, source):
+    distances = {source: 0}
+    queue = deque([source])
+    while queue:
+        v = queue.popleft()
+        for w in adjacency[v]:
+            if w not in distances:
+                distances[w] = distances[v] + 1
+                queue.append(w)
+    return distances
+
+def closeness_sample_size(n, epsilon=DEFAULT_EPSILON, delta=DEFAULT_DELTA):
+    """Pivots suffisants (Eppstein et Wang) : distance moyenne de chaque noeud à epsilon x diamètre près,
+    pour tous les noeuds à la fois avec une probabilité 1 - delta (Hoeffding et borne de l'union)."""
+    return max(1, math.ceil(math.log(2 * max(n, 1) / delta) / (2 * epsilon ** 2)))
+
+def betweenness_sample_size(vertex_diameter, epsilon=DEFAULT_EPSILON, delta=DEFAULT_DELTA):
+    """Plus courts chemins à tirer (Riondato et Kornaropoulos) pour une erreur d'au plus epsilon sur
+    l'intermédiarité normalisée par n(n - 1), pour tous les noeuds avec une probabilité 1 - delta."""
+    vc_bound = math.floor(math.log2(max(vertex_diameter - 2, 1))) + 1
+    return max(1, math.ceil(RK_CONSTANT / epsilon ** 2 * (vc_bound + math.log(1 / delta))))
+
+def approximate_closeness_centrality(graph, book_ids, samples=None, epsilon=DEFAULT_EPSILON, delta=DEFAULT_DELTA, seed=None):
+    """Proximité estimée par des parcours en largeur depuis des pivots tirés au hasard (Eppstein et Wang).
+
+    Dans une composante connexe de m noeuds, la somme des distances d'un noeud aux autres est
+    estimée par m / k fois la somme de ses distances à k pivots tirés sans remise dans la
+    composante ; les composantes d'au plus k noeuds sont calculées exactement. Même
+    normalisation que closeness_centrality : (m - 1) / somme des distances.
+    k = samples, ou closeness_sample_size(nombre de noeuds, epsilon, delta).
+    """
+    nodes, index, adjacency = compact_graph(graph, book_ids)
+    rng = random.Random(seed)
+    k = samples or closeness_sample_size(len(nodes), epsilon, delta)
+    closeness = [0.0] * len(nodes)
+    for component in connected_components(adjacency):
+        m = len(component)
+        if m < 2:
+            continue
+        pivots = component if m <= k else rng.sample(component, k)
+        totals = defaultdict(int)
+        for pivot in pivots:
+            for v, distance in bfs_distances(adjacency, pivot).items():
+                totals[v] += distance
+        scale = m / len(pivots)
+        for v in component:
+            closeness[v] = (m - 1) / (scale * totals[v]) if totals[v] > 0 else 0.0
+    return {book_id: closeness[index[book_id]] for book_id in book_ids}
+
+def vertex_diameter_bound(adjacency):
+    """Majorant du nombre de noeuds d'un plus court chemin : 2 x excentricité d'un noeud + 1, par composante."""
+    bound = 1
+    for component in connected_components(adjacency):
+        eccentricity = max(bfs_distances(adjacency, component[0]).values())
+        bound = max(bound, 2 * eccentricity + 1)
+    return bound
+
+def approximate_betweenness_centrality(graph, book_ids, samples=None, epsilon=DEFAULT_EPSILON, delta=DEFAULT_DELTA, seed=None):
+    """Intermédiarité estimée sur des plus courts chemins tirés au hasard (Riondato et Kornaropoulos).
+
+    Chaque tirage choisit une paire ordonnée (u, v) de noeuds distincts, puis un plus court
+    chemin de u à v uniformément (remontée des prédécesseurs pondérée par les nombres de
+    chemins) ; chaque noeud intérieur au chemin reçoit 1 / r. Le résultat est ramené à la
+    normalisation de betweenness_centrality (n(n - 1) / betweenness_normalization(n)), où
+    l'erreur garantie devient d'environ 2 x epsilon. Comme dans betweenness_centrality, n est
+    le nombre de noeuds du graphe : les book_ids sans arête ne comptent pas et valent 0.0.
+    r = samples, ou betweenness_sample_size(vertex_diameter_bound, epsilon, delta).
+    """
+    nodes, index, adjacency = compact_graph(graph)
+    n = len(nodes)
+    betweenness = [0.0] * n
+    vertex_diameter = vertex_diameter_bound(adjacency) if n > 2 else 0
+    if vertex_diameter > 2:  # sinon aucun plus court chemin n'a de noeud intérieur
+        rng = random.Random(seed)
+        r = samples or betweenness_sample_size(vertex_diameter, epsilon, delta)
+        for _ in range(r):
+            u = rng.randrange(n)
+            v = rng.randrange(n - 1)
+            v += v >= u
+            for w in _sample_shortest_path(adjacency, u, v, rng):
+                betweenness[w] += 1
+        scale = n * (n - 1) / (r * betweenness_normalization(n))
+        betweenness = [value * scale for value in betweenness]
+    return {book_id: betweenness[index[book_id]] if book_id in index else 0.0 for book_id in book_ids}
+
+def _sample_shortest_path(adjacency, u, v, rng):
+    """Noeuds intérieurs d'un plus court chemin de u à v tiré uniformément (aucun si v est inaccessible)."""
+    distance = {u: 0}
+    sigma = {u: 1}
+    queue = deque([u])
+    while queue:
+        x = queue.popleft()
+        if v in distance and distance[x] >= distance[v]:
+            break  # sigma[v] est complet : tous les noeuds à distance[v] - 1 ont été traités
+        for y in adjacency[x]:
+            if y not in distance:
+                distance[y] = distance[x] + 1
+                sigma[y] = 0
+                queue.append(y)
+            if distance[y] == distance[x] + 1:
+                sigma[y] += sigma[x]
+    if v not in distance:
+        return []
+
+    path = []
+    w = v
+    while True:
+        pick = rng.randrange(sigma[w])
+        for z in adjacency[w]:
+            if distance.get(z, -1) == distance[w] - 1:
+                if pick < sigma[z]:
+                    break
+                pick -= sigma[z]
+        if z == u:
+            return path
+        path.append(z)
+        w = z
@@ -1,6 +1,18 @@
 from collections import defaultdict
 
-def compute_jaccard_similarity(book_ids, all_docs, threshold):
+def compute_jaccard_similarity(book_ids, all_docs, threshold, engine='sets', workers=None):
+    """Similarités de Jaccard au-dessus du seuil de toutes les paires (id1, id2), id1 avant id2 dans book_ids.
+
+    engine : 'sets' (intersection d'ensembles Python, paire par paire) ou 'bitset' (popcount
+    par blocs sur des bitsets de vocabulaire, répartis entre workers processus, voir
+    jaccard_bitset) ; le résultat est le même.
+    """
+    if engine == 'bitset':
+        from mygutenberg.algorithms.jaccard_bitset import compute_jaccard_similarity_bitset
+        return compute_jaccard_similarity_bitset(book_ids, all_docs, threshold, workers=workers)
+    if engine != 'sets':
+        raise ValueError(f"Moteur de Jaccard inconnu : {engine}")
+
     similarities = {}
     book_sets = {book_id: set(words) for book_id, words in all_docs.items()}
     
@@ -15,3 +27,56 @@ def compute_jaccard_similarity(book_ids, all_docs, threshold):
                 similarities[(id1, id2)] = similarity
     
     return similarities
+
+def compute_jaccard_similarity_for(new_ids, book_sets, threshold):
+    """Similarités des seules paires comprenant au moins un livre de new_ids.
+
+    book_sets : {book_id: ensemble des termes} de tous les livres. Les clés sont (ancien, nouveau)
+    ou (nouveau, nouveau suivant), comme si les nouveaux livres avaient été ajoutés en dernier.
+    """
+    similarities = {}
+    new_ids = [book_id for book_id in new_ids if book_id in book_sets]
+    new_set = set(new_ids)
+    previous = [book_id for book_id in book_sets if book_id not in new_set]
+    for id2 in new_ids:
+        set2 = book_sets[id2]
+        for id1 in previous:
+            set1 = book_sets[id1]
+            union = len(set1 | set2)
+            similarity = len(set1 & set2) / union if union > 0 else 0
+            if similarity >= threshold:
+                similarities[(id1, id2)] = similarity
+        previous.append(id2)
+    return similarities
+
+def compute_jaccard_similarity_lsh(book_ids, all_docs, threshold, num_perm=None, new_ids=None):
+    """Comme compute_jaccard_similarity, mais seules les paires candidates de MinHash/LSH sont comparées.
+
+    Les paires candidates (minhash.lsh_candidate_pairs, bandes choisies pour le seuil) sont
+    vérifiées avec la similarité exacte ; une paire au-dessus du seuil n'est manquée que si
+    ses signatures n'ont aucune bande commune (rappel mesuré par run_tests). Avec new_ids,
+    seules les paires comprenant un de ces livres sont retenues.
+    """
+    import numpy as np
+    from mygutenberg.algorithms.minhash import DEFAULT_PERMUTATIONS, MinHasher, lsh_candidate_pairs, lsh_parameters
+
+    similarities = {}
+    if len(book_ids) < 2:
+        return similarities
+    num_perm = num_perm or DEFAULT_PERMUTATIONS
+    book_sets = {book_id: set(all_docs[book_id]) for book_id in book_ids}
+    hasher = MinHasher(num_perm)
+    signatures = np.array([hasher.signature(book_sets[book_id]) for book_id in book_ids])
+    bands, rows = lsh_parameters(threshold, num_perm)
+
+    for i, j in sorted(lsh_candidate_pairs(signatures, bands, rows)):
+        id1, id2 = book_ids[i], book_ids[j]
+        if new_ids is not None and id1 not in new_ids and id2 not in new_ids:
+            continue
+        set1 = book_sets[id1]
+        set2 = book_sets[id2]
+        union = len(set1 | set2)
+        similarity = len(set1 & set2) / union if union > 0 else 0
+        if similarity >= threshold:
+            similarities[(id1, id2)] = similarity
+    return similarities
@@ -0,0 +1,104 @@
+"""Similarités de Jaccard exactes sur des bitsets de vocabulaire, par blocs, dans un pool de processus.
+
+Chaque mot du corpus reçoit un identifiant dense ; le vocabulaire d'un livre devient une
+ligne de bits (uint64) où le bit t vaut 1 si le livre contient le terme t. Pour deux
+livres, |A ∩ B| est le nombre de bits à 1 de (A & B) et |A ∪ B| = |A| + |B| - |A ∩ B|.
+
+Les lignes sont découpées en blocs de BLOCK_ROWS livres ; chaque bloc est comparé à tous
+les livres suivants, par tuiles dont la taille borne la mémoire des ET bit à bit
+intermédiaires (TILE_WORDS mots de 64 bits). Les blocs sont répartis entre les processus
+du pool, qui reçoivent la matrice de bits une seule fois (init_worker) et ne renvoient que
+les paires au-dessus du seuil.
+
+Le résultat est identique à celui de compute_jaccard_similarity : mêmes clés, dans le
+même ordre, et mêmes valeurs (division de deux entiers exacts en flottant double).
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+BLOCK_ROWS = 32  # livres par bloc envoyé à un processus
+TILE_WORDS = 1 << 21  # mots de 64 bits au plus dans une tuile de ET bit à bit (16 Mo)
+BYTE_POPCOUNT = np.array([bin(byte).count('1') for byte in range(256)], dtype=np.uint8)
+
+_bits = None
+_sizes = None
+
+
+def popcount_rows(words):
+    """Nombre de bits à 1 de chaque ligne (dernier axe) d'un tableau uint64 contigu."""
+    if hasattr(np, 'bitwise_count'):  # NumPy >= 2.0
+        return np.bitwise_count(words).sum(axis=-1, dtype=np.int64)
+    return BYTE_POPCOUNT[words.view(np.uint8)].sum(axis=-1, dtype=np.int64)
+
+
+def pack_term_sets(book_ids, all_docs):
+    """Matrice de bits (livres x mots de 64 bits) des vocabulaires, dans l'ordre de book_ids."""
+    term_ids = {}
+    rows = []
+    for book_id in book_ids:
+        rows.append(np.fromiter(
+            (term_ids.setdefault(term, len(term_ids)) for term in set(all_docs[book_id])), dtype=np.int64,
+        ))
+    word_count = max(1, -(-len(term_ids) // 64))
+    bits = np.zeros((len(book_ids), word_count), dtype=np.uint64)
+    present = np.zeros(word_count * 64, dtype=bool)
+    for row, ids in zip(bits, rows):
+        present[ids] = True
+        row[:] = np.packbits(present, bitorder='little').view(np.uint64)
+        present[ids] = False
+    return bits
+
+
+def block_similarities(bits, sizes, start, end, threshold):
+    """Paires (i, j, similarité), start <= i < end et i < j, au-dessus du seuil, triées par (i, j)."""
+    rows = bits[start:end]
+    columns = max(1, TILE_WORDS // (len(rows) * bits.shape[1]))
+    found_i, found_j, found_similarity = [], [], []
+    for tile_start in range(start, len(bits), columns):
+        tile = bits[tile_start:tile_start + columns]
+        intersection = popcount_rows(rows[:, None, :] & tile[None, :, :])
+        union = sizes[start:end, None] + sizes[None, tile_start:tile_start + len(tile)] - intersection
+        similarity = np.divide(intersection, union, out=np.zeros(union.shape), where=union > 0)
+        i, j = np.nonzero(similarity >= threshold)
+        i += start
+        j += tile_start
+        upper = i < j
+        found_i.append(i[upper])
+        found_j.append(j[upper])
+        found_similarity.append(similarity[i[upper] - start, j[upper] - tile_start])
+    i, j, similarity = np.concatenate(found_i), np.concatenate(found_j), np.concatenate(found_similarity)
+    order = np.lexsort((j, i))
+    return i[order], j[order], similarity[order]
+
+
+def init_worker(bits, sizes):
+    global _bits, _sizes
+    _bits, _sizes = bits, sizes
+
+
+def _worker_block(start, end, threshold):
+    return block_similarities(_bits, _sizes, start, end, threshold)
+
+
+def compute_jaccard_similarity_bitset(book_ids, all_docs, threshold, workers=None, block_rows=BLOCK_ROWS):
+    """Comme compute_jaccard_similarity ; les blocs sont calculés par workers processus (un par processeur par défaut)."""
+    similarities = {}
+    if len(book_ids) < 2:
+        return similarities
+    bits = pack_term_sets(book_ids, all_docs)
+    sizes = popcount_rows(bits)
+    blocks = [(start, min(start + block_rows, len(book_ids))) for start in range(0, len(book_ids), block_rows)]
+    workers = min(workers or os.cpu_count() or 1, len(blocks))
+
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(bits, sizes)) as executor:
+            results = list(executor.map(_worker_block, *zip(*blocks), [threshold] * len(blocks)))
+    else:
+        results = [block_similarities(bits, sizes, start, end, threshold) for start, end in blocks]
+
+    for i, j, similarity in results:
+        for a, b, value in zip(i.tolist(), j.tolist(), similarity.tolist()):
+            similarities[(book_ids[a], book_ids[b])] = value
+    return similarities
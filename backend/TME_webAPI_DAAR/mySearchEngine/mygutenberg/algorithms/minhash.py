@@ -0,0 +1,96 @@
+"""Signatures MinHash et découpage LSH en bandes, pour ne comparer que les paires de livres candidates.
+
+La signature d'un livre est, pour chacune de num_perm fonctions de hachage
+h(x) = ((a * x + b) mod 2^64) >> 32 (multiplication-décalage : pas de division, le
+dépassement de uint64 fait le modulo), le minimum de h sur les termes du livre : deux
+livres ont la même valeur pour une fonction avec une probabilité égale à leur similarité
+de Jaccard s. La signature est découpée en bands bandes de rows valeurs ; deux livres
+sont candidats s'ils ont au moins une bande identique, ce qui arrive avec une
+probabilité 1 - (1 - s^rows)^bands.
+
+bands et rows sont choisis pour le seuil en minimisant l'aire des faux négatifs (paires
+au-dessus du seuil jamais comparées), pondérée bien plus que celle des faux positifs : ces
+derniers ne coûtent qu'une comparaison exacte de plus, alors qu'une paire manquée est une
+arête perdue dans le graphe de Jaccard.
+"""
+import zlib
+from collections import defaultdict
+from functools import lru_cache
+from itertools import combinations
+
+import numpy as np
+
+HASH_SHIFT = np.uint64(32)
+EMPTY_SIGNATURE_VALUE = 1 << 32  # au-dessus de toute valeur de hachage
+DEFAULT_PERMUTATIONS = 256
+FALSE_NEGATIVE_WEIGHT = 0.95
+SIGNATURE_CHUNK = 32  # fonctions de hachage évaluées ensemble (mémoire : SIGNATURE_CHUNK x termes)
+
+
+def candidate_probability(similarity, bands, rows):
+    """Probabilité que deux livres de similarité donnée partagent au moins une bande."""
+    return 1 - (1 - similarity ** rows) ** bands
+
+
+def _integrate(f, start, end, steps=200):
+    xs = np.linspace(start, end, steps + 1)
+    ys = f(xs)
+    return float(np.sum(ys[1:] + ys[:-1]) / 2 * (end - start) / steps)
+
+
+@lru_cache(maxsize=None)
+def lsh_parameters(threshold, num_perm, false_negative_weight=FALSE_NEGATIVE_WEIGHT):
+    """(bands, rows), avec bands * rows <= num_perm, minimisant les erreurs pondérées autour du seuil."""
+    best = None
+    for bands in range(1, num_perm + 1):
+        for rows in range(1, num_perm // bands + 1):
+            false_positives = _integrate(lambda s: candidate_probability(s, bands, rows), 0.0, threshold)
+            false_negatives = _integrate(lambda s: 1 - candidate_probability(s, bands, rows), threshold, 1.0)
+            error = (1 - false_negative_weight) * false_positives + false_negative_weight * false_negatives
+            if best is None or error < best[0]:
+                best = (error, bands, rows)
+    return best[1], best[2]
+
+
+class MinHasher:
+    """Calcule des signatures comparables entre elles (mêmes fonctions de hachage pour tous les livres)."""
+
+    def __init__(self, num_perm=DEFAULT_PERMUTATIONS, seed=1):
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self.a = rng.integers(0, 1 << 63, size=(num_perm, 1), dtype=np.uint64) * np.uint64(2) + np.uint64(1)  # impairs
+        self.b = rng.integers(0, 1 << 63, size=(num_perm, 1), dtype=np.uint64)
+        self._term_hashes = {}  # les mots reviennent d'un livre à l'autre : haché une seule fois chacun
+
+    def _hash(self, term):
+        value = self._term_hashes.get(term)
+        if value is None:
+            value = term if isinstance(term, int) else zlib.crc32(term.encode('utf-8'))
+            value = self._term_hashes[term] = value & 0xFFFFFFFF
+        return value
+
+    def signature(self, terms):
+        """Signature (num_perm valeurs) d'un ensemble de termes (mots ou identifiants entiers)."""
+        hashes = np.fromiter((self._hash(term) for term in terms), dtype=np.uint64, count=len(terms))
+        signature = np.full(self.num_perm, EMPTY_SIGNATURE_VALUE, dtype=np.uint64)
+        if not len(hashes):
+            return signature
+        for start in range(0, self.num_perm, SIGNATURE_CHUNK):
+            end = start + SIGNATURE_CHUNK
+            values = (self.a[start:end] * hashes + self.b[start:end]) >> HASH_SHIFT
+            signature[start:end] = values.min(axis=1)
+        return signature
+
+
+def lsh_candidate_pairs(signatures, bands, rows):
+    """Paires (i, j), i < j, des lignes de signatures ayant au moins une bande identique."""
+    candidates = set()
+    for band in range(bands):
+        block = np.ascontiguousarray(signatures[:, band * rows:(band + 1) * rows])
+        buckets = defaultdict(list)
+        for index, key in enumerate(map(bytes, block)):
+            buckets[key].append(index)
+        for members in buckets.values():
+            if len(members) > 1:
+                candidates.update(combinations(members, 2))
+    return candidates
@@ -0,0 +1,172 @@
+"""Format binaire compact des postings d'un mot et des listes d'identifiants (Trigram.term_ids).
+
+Les postings sont rangés par colonnes, triés par gutenberg_id croissant :
+
+    octet de version (FORMAT_VERSION)
+    varint : nombre n de postings
+    n varints : écarts entre gutenberg_id successifs (le premier est l'identifiant lui-même)
+    n varints : occurrences
+    varint : nombre k de couples (tfidf, score) distincts, 0 si le dictionnaire n'est pas rentable
+    si k > 0 : k float32 tfidf, k float32 score, puis n varints (indice du couple de chaque posting)
+    si k = 0 : n float32 tfidf, puis n float32 score
+
+Les réels sont quantifiés en float32 (précision relative ~6e-8, sans effet sur le
+classement). Pour un mot donné, tfidf ne dépend que du nombre d'occurrences : les
+couples se répètent beaucoup et le dictionnaire ramène la plupart des postings à
+trois ou quatre octets. Les colonnes de réels se décodent d'un bloc avec
+array.frombytes ; seules les colonnes d'entiers sont lues octet par octet.
+
+Les postings ne sont plus stockés sous cette forme en base : la table Posting en est
+l'unique stockage (migration 0011). Le format des postings reste utilisé par les
+mesures de run_tests ; la migration 0008 en garde sa propre copie figée.
+"""
+import sys
+from array import array
+from itertools import accumulate
+
+FORMAT_VERSION = 1
+
+
+def _write_varint(out, value):
+    while value >= 0x80:
+        out.append((value & 0x7f) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varints(data, pos, count):
+    values = array('i')
+    append = values.append
+    for _ in range(count):
+        byte = data[pos]
+        pos += 1
+        if byte < 0x80:
+            append(byte)
+            continue
+        value = byte & 0x7f
+        shift = 7
+        while True:
+            byte = data[pos]
+            pos += 1
+            value |= (byte & 0x7f) << shift
+            if byte < 0x80:
+                break
+            shift += 7
+        append(value)
+    return values, pos
+
+
+def _read_floats(data, pos, count):
+    values = array('f')
+    values.frombytes(data[pos:pos + 4 * count])
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values, pos + 4 * count
+
+
+def encode_postings(postings):
+    """Encode des tuples (gutenberg_id, occurrences, tfidf, score) ; l'ordre d'entrée est indifférent."""
+    postings = sorted(postings)
+    out = bytearray([FORMAT_VERSION])
+    _write_varint(out, len(postings))
+
+    previous = 0
+    for book_id, _, _, _ in postings:
+        if book_id < 0:
+            raise ValueError(f"gutenberg_id négatif : {book_id}")
+        _write_varint(out, book_id - previous)
+        previous = book_id
+    for _, occurrences, _, _ in postings:
+        _write_varint(out, occurrences)
+
+    # Quantification en float32 avant de chercher les couples distincts
+    tfidf = array('f', (posting[2] for posting in postings))
+    scores = array('f', (posting[3] for posting in postings))
+    pairs = {}
+    indices = [pairs.setdefault(pair, len(pairs)) for pair in zip(tfidf, scores)]
+
+    if 5 * len(pairs) < 4 * len(postings):
+        _write_varint(out, len(pairs))
+        out += _float_bytes(array('f', (pair[0] for pair in pairs)))
+        out += _float_bytes(array('f', (pair[1] for pair in pairs)))
+        for index in indices:
+            _write_varint(out, index)
+    else:
+        _write_varint(out, 0)
+        out += _float_bytes(tfidf)
+        out += _float_bytes(scores)
+    return bytes(out)
+
+
+def _float_bytes(values):
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values.tobytes()
+
+
+def decode_columns(data):
+    """Décode un blob en quatre tableaux parallèles (gutenberg_id, occurrences, tfidf, score)."""
+    data = bytes(data)
+    if not data:
+        return array('i'), array('i'), array('f'), array('f')
+    if data[0] != FORMAT_VERSION:
+        raise ValueError(f"Version de format de postings inconnue : {data[0]}")
+    count, pos = _read_varints(data, 1, 1)
+    count = count[0]
+    deltas, pos = _read_varints(data, pos, count)
+    occurrences, pos = _read_varints(data, pos, count)
+    pair_count, pos = _read_varints(data, pos, 1)
+    pair_count = pair_count[0]
+    if pair_count:
+        pair_tfidf, pos = _read_floats(data, pos, pair_count)
+        pair_scores, pos = _read_floats(data, pos, pair_count)
+        indices, pos = _read_varints(data, pos, count)
+        tfidf = array('f', map(pair_tfidf.__getitem__, indices))
+        scores = array('f', map(pair_scores.__getitem__, indices))
+    else:
+        tfidf, pos = _read_floats(data, pos, count)
+        scores, pos = _read_floats(data, pos, count)
+    return array('i', accumulate(deltas)), occurrences, tfidf, scores
+
+
+def iter_postings(data):
+    """Parcourt les postings d'un blob sous forme de tuples (gutenberg_id, occurrences, tfidf, score)."""
+    return zip(*decode_columns(data))
+
+
+def encode_word_data(data):
+    """Encode un dictionnaire {gutenberg_id: {'occurrences', 'tfidf', 'score'}}."""
+    return encode_postings(
+        (int(book_id), entry.get('occurrences', 0), entry.get('tfidf', 0.0), entry.get('score', 0.0))
+        for book_id, entry in data.items()
+    )
+
+
+def decode_word_data(data):
+    """Décode un blob en dictionnaire {gutenberg_id: {'occurrences', 'tfidf', 'score'}}."""
+    return {
+        book_id: {'occurrences': occurrences, 'tfidf': tfidf, 'score': score}
+        for book_id, occurrences, tfidf, score in iter_postings(data)
+    }
+
+
+def encode_ids(ids):
+    """Encode une liste d'identifiants positifs : varint du nombre, puis écarts entre identifiants triés."""
+    out = bytearray()
+    ids = sorted(ids)
+    _write_varint(out, len(ids))
+    previous = 0
+    for value in ids:
+        _write_varint(out, value - previous)
+        previous = value
+    return bytes(out)
+
+
+def decode_ids(data):
+    """Décode une liste encodée par encode_ids en tableau trié."""
+    data = bytes(data)
+    if not data:
+        return array('i')
+    count, pos = _read_varints(data, 0, 1)
+    deltas, _ = _read_varints(data, pos, count[0])
+    return array('i', accumulate(deltas))
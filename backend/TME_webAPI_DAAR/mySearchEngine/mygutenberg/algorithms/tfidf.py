@@ -1,8 +1,12 @@
 import math
+from collections import Counter
 
 def compute_tf(term, document_words):
     """Calcule la fréquence d'un terme dans un document (occurrences / total mots)."""
-    occurrences = document_words.count(term)
+    return compute_tf_from_count(document_words.count(term))
+
+def compute_tf_from_count(occurrences):
+    """Calcule la fréquence d'un terme à partir de son nombre d'occurrences déjà compté."""
     return 1 + math.log(occurrences) if occurrences > 0 else 0
 
 def compute_idf(term, document_frequencies, total_documents):
@@ -17,7 +21,38 @@ def compute_tfidf(term, document_words, document_frequencies, total_documents):
     return tf * idf
 
 def index_document(document_words, total_documents, document_frequencies, title_words, author_words):
-    """Indexe un document avec TF-IDF et poids pour titre/auteur."""
+    """Indexe un document avec TF-IDF et poids pour titre/auteur, en comptant les termes en un seul passage."""
+    return index_term_counts(Counter(document_words), total_documents, document_frequencies, title_words, author_words)
+
+def index_term_counts(term_counts, total_documents, document_frequencies, title_words, author_words):
+    """Indexe un document à partir de ses fréquences de termes {terme: occurrences}.
+
+    Même résultat que index_document_naive, sans reparcourir le texte pour chaque terme.
+    """
+    index = {}
+    title_words = set(title_words)
+    author_words = set(author_words)
+    for term in title_words.union(term_counts, author_words):
+        occurrences = term_counts.get(term, 0)
+        tfidf = compute_tf_from_count(occurrences) * compute_idf(term, document_frequencies, total_documents)
+        index[term] = {
+            'occurrences': occurrences,
+            'tfidf': tfidf,
+            'score': weighted_score(tfidf, term in title_words, term in author_words)
+        }
+    return index
+
+def weighted_score(tfidf, in_title, in_author):
+    """Score d'un posting : tfidf (1 s'il est nul ou négatif), pondéré si le terme est dans le titre ou les auteurs."""
+    score = tfidf if tfidf > 0 else 1.0
+    if in_title:
+        score *= 5  # Poids titre
+    if in_author:
+        score *= 10  # Poids auteur
+    return score
+
+def index_document_naive(document_words, total_documents, document_frequencies, title_words, author_words):
+    """Version d'origine (document_words.count par terme), conservée pour les mesures de run_tests."""
     index = {}
     all_terms = set(document_words).union(set(title_words)).union(set(author_words))
     for term in all_terms:
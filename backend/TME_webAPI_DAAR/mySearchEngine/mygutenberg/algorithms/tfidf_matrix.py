@@ -0,0 +1,137 @@
+"""Index TF-IDF de tout le corpus, calculé d'un bloc sur une matrice creuse documents x termes (NumPy).
+
+Les termes sont numérotés dans l'ordre du vocabulaire trié, les documents de 0 à n - 1.
+Les coefficients non nuls sont rangés par colonne (format CSC) : les postings d'un
+terme sont les lignes de sa colonne, triées par document. tf = 1 + log(occurrences),
+idf = log(N / (df + 1)) et le score pondéré par le titre et les auteurs sont calculés
+comme dans tfidf.index_document, mais en opérations sur tableaux pour tout le corpus,
+sans boucle Python par livre et par terme. Les mots du titre ou des auteurs absents du
+texte ont un coefficient à 0 occurrence, comme dans index_document.
+"""
+from collections.abc import Mapping
+
+import numpy as np
+
+TITLE_WEIGHT = 5
+AUTHOR_WEIGHT = 10
+
+
+class TfidfMatrix:
+    def __init__(self, vocabulary, doc_ids, col_ptr, rows, occurrences, tfidf, score, document_frequencies):
+        self.vocabulary = vocabulary                      # mot de chaque terme (tableau trié)
+        self.doc_ids = doc_ids                            # gutenberg_id de chaque document
+        self.col_ptr = col_ptr                            # coefficients du terme t : [col_ptr[t], col_ptr[t + 1])
+        self.rows = rows                                  # document de chaque coefficient
+        self.occurrences = occurrences
+        self.tfidf = tfidf
+        self.score = score
+        self.document_frequencies = document_frequencies  # nombre de documents contenant chaque terme
+
+    @property
+    def shape(self):
+        return len(self.doc_ids), len(self.vocabulary)
+
+    @property
+    def nnz(self):
+        return len(self.rows)
+
+    def term_id(self, word):
+        """Identifiant du terme, ou -1 s'il n'est pas dans le vocabulaire."""
+        term = int(np.searchsorted(self.vocabulary, word))
+        return term if term < len(self.vocabulary) and self.vocabulary[term] == word else -1
+
+    def column(self, term):
+        """Postings du terme : tableaux (gutenberg_id, occurrences, tfidf, score) triés par document."""
+        start, end = self.col_ptr[term], self.col_ptr[term + 1]
+        return self.doc_ids[self.rows[start:end]], self.occurrences[start:end], self.tfidf[start:end], self.score[start:end]
+
+    def iter_columns(self):
+        """Parcourt les termes ayant au moins un posting : (mot, gutenberg_id, occurrences, tfidf, score)."""
+        for term in np.flatnonzero(np.diff(self.col_ptr)):
+            yield (str(self.vocabulary[term]),) + self.column(term)
+
+    def document_index(self, gutenberg_id):
+        """Index d'un document au format de tfidf.index_document (pour comparaison)."""
+        doc = int(np.flatnonzero(self.doc_ids == gutenberg_id)[0])
+        positions = np.flatnonzero(self.rows == doc)
+        terms = np.searchsorted(self.col_ptr, positions, side='right') - 1
+        return {
+            str(self.vocabulary[term]): {
+                'occurrences': int(self.occurrences[position]),
+                'tfidf': float(self.tfidf[position]),
+                'score': float(self.score[position]),
+            }
+            for term, position in zip(terms, positions)
+        }
+
+
+def _lookup(vocabulary, words):
+    """Identifiants des mots dans le vocabulaire trié et masque des mots qui y figurent."""
+    if not len(words) or not len(vocabulary):
+        return np.zeros(len(words), dtype=np.int64), np.zeros(len(words), dtype=bool)
+    words = np.asarray(words)
+    ids = np.searchsorted(vocabulary, words)
+    ids[ids == len(vocabulary)] = 0
+    return ids, vocabulary[ids] == words
+
+
+def _term_ids(vocabulary, words):
+    """Identifiants des mots dans le vocabulaire trié ; les mots inconnus sont ignorés."""
+    ids, known = _lookup(vocabulary, words)
+    return ids[known]
+
+
+def _term_counts(vocabulary, words):
+    """Termes du document, triés, et leurs occurrences ; words est une liste de mots ou un {mot: occurrences}."""
+    if isinstance(words, Mapping):
+        ids, known = _lookup(vocabulary, list(words))
+        counts = np.fromiter(words.values(), dtype=np.int64, count=len(words))
+        terms, counts = ids[known], counts[known]
+        order = np.argsort(terms)
+        return terms[order], counts[order]
+    return np.unique(_term_ids(vocabulary, words), return_counts=True)
+
+
+def build_tfidf_matrix(docs, vocabulary, title_author_words=None):
+    """Construit la matrice TF-IDF du corpus.
+
+    docs : {gutenberg_id: mots du texte, ou fréquences {mot: occurrences}} ; vocabulary : mots indexables (les autres sont ignorés) ;
+    title_author_words : {gutenberg_id: (mots du titre, mots des auteurs)}.
+    """
+    title_author_words = title_author_words or {}
+    vocabulary = np.array(sorted(set(vocabulary)), dtype=str)
+    doc_ids = np.fromiter(docs, dtype=np.int64, count=len(docs))
+    doc_count, term_count = len(doc_ids), len(vocabulary)
+
+    # Comptage des termes de chaque document ; clé d'un coefficient : terme * doc_count + document
+    word_keys, word_counts, title_keys, author_keys = [], [], [], []
+    for doc, words in enumerate(docs.values()):
+        terms, counts = _term_counts(vocabulary, words)
+        word_keys.append(terms * doc_count + doc)
+        word_counts.append(counts)
+        title_words, author_words = title_author_words.get(int(doc_ids[doc]), ((), ()))
+        title_keys.append(np.unique(_term_ids(vocabulary, title_words)) * doc_count + doc)
+        author_keys.append(np.unique(_term_ids(vocabulary, author_words)) * doc_count + doc)
+    empty = [np.empty(0, dtype=np.int64)]
+    word_keys = np.concatenate(word_keys + empty)
+    word_counts = np.concatenate(word_counts + empty)
+    title_keys = np.concatenate(title_keys + empty)
+    author_keys = np.concatenate(author_keys + empty)
+
+    keys = np.unique(np.concatenate([word_keys, title_keys, author_keys]))
+    columns = keys // doc_count if doc_count else keys
+    rows = (keys % doc_count if doc_count else keys).astype(np.int32)
+    occurrences = np.zeros(len(keys), dtype=np.int64)
+    occurrences[np.searchsorted(keys, word_keys)] = word_counts
+
+    document_frequencies = np.bincount(word_keys // doc_count if doc_count else word_keys, minlength=term_count)
+    idf = np.log(doc_count / (document_frequencies + 1.0))
+    tf = np.where(occurrences > 0, 1 + np.log(np.maximum(occurrences, 1)), 0.0)
+    tfidf = tf * idf[columns]
+    score = np.where(tfidf > 0, tfidf, 1.0)
+    score = np.where(np.isin(keys, title_keys), score * TITLE_WEIGHT, score)
+    score = np.where(np.isin(keys, author_keys), score * AUTHOR_WEIGHT, score)
+
+    col_ptr = np.zeros(term_count + 1, dtype=np.int64)
+    np.cumsum(np.bincount(columns, minlength=term_count), out=col_ptr[1:])
+    return TfidfMatrix(vocabulary, doc_ids, col_ptr, rows, occurrences, tfidf, score, document_frequencies)
@@ -0,0 +1,71 @@
+"""Index de trigrammes du vocabulaire pour les regex sans littéral en tête (.*word.*).
+
+Le compilateur de regex (automaton.trigram_query) déduit de l'arbre de la regex une
+requête ET/OU de trigrammes que tout mot accepté contient forcément ; l'index donne
+les termes candidats, seuls vérifiés ensuite par le DFA.
+"""
+from collections import defaultdict
+
+
+def word_trigrams(word):
+    return {word[i:i + 3] for i in range(len(word) - 2)}
+
+
+def build_trigram_index(terms):
+    """{trigramme: [identifiants triés]} à partir de couples (identifiant, mot)."""
+    index = defaultdict(list)
+    for term_id, word in terms:
+        for trigram in word_trigrams(word):
+            index[trigram].append(term_id)
+    for term_ids in index.values():
+        term_ids.sort()
+    return dict(index)
+
+
+def trie_words(rows):
+    """Couples (identifiant, mot) des fins de mot, à partir de tuples (id, parent_id, char, is_end_of_word)."""
+    nodes = {node_id: (parent_id, char, is_end) for node_id, parent_id, char, is_end in rows}
+    words = {}
+    for node_id, (_, _, is_end) in nodes.items():
+        if not is_end:
+            continue
+        chars = []
+        current = node_id
+        while current is not None:
+            parent_id, char, _ = nodes[current]
+            chars.append(char)
+            current = parent_id
+        words[node_id] = ''.join(reversed(chars))
+    return words.items()
+
+
+def evaluate_query(query, index):
+    """Ensemble des identifiants candidats pour la requête, ou None si elle ne restreint rien.
+
+    index associe à chaque trigramme une séquence d'identifiants ; un trigramme absent
+    de l'index ne correspond à aucun terme.
+    """
+    kind = query[0]
+    if kind == 'any':
+        return None
+    if kind == 'tri':
+        return set(index.get(query[1], ()))
+    if kind == 'and':
+        result = None
+        # Les trigrammes d'abord : leurs ensembles sont en général les plus petits
+        for part in sorted(query[1], key=lambda part: part[0] != 'tri'):
+            candidates = evaluate_query(part, index)
+            if candidates is None:
+                continue
+            result = candidates if result is None else result & candidates
+            if not result:
+                return result
+        return result
+    # 'or'
+    result = set()
+    for part in query[1]:
+        candidates = evaluate_query(part, index)
+        if candidates is None:
+            return None
+        result |= candidates
+    return result
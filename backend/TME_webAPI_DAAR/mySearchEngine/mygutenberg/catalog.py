@@ -0,0 +1,110 @@
+"""Catalogue en mémoire des métadonnées de BookText et du graphe de Jaccard.
+
+Les vues de recherche hydratent leurs résultats à partir de ce catalogue au lieu
+de faire un BookText.objects.get par livre trouvé. Il est chargé en deux requêtes
+et rechargé à chaque nouvelle génération d'index.
+"""
+import logging
+import time
+from collections import defaultdict
+from typing import List, NamedTuple
+
+from mygutenberg.generation import GenerationCache
+from mygutenberg.models import BookText, TableJaccard
+
+logger = logging.getLogger(__name__)
+
+
+def cover_url(gutenberg_id):
+    return f'https://gutenberg.org/files/{gutenberg_id}/{gutenberg_id}-h/images/cover.jpg'
+
+
+class BookRecord(NamedTuple):
+    gutenberg_id: int
+    title: str
+    authors: List[dict]
+    language: str
+    cover_url: str
+    word_count: int
+    closeness: float
+    betweenness: float
+
+    def summary(self):
+        """Champs communs à toutes les réponses de recherche."""
+        return {
+            'id': self.gutenberg_id,
+            'title': self.title,
+            'authors': self.authors,
+            'language': self.language,
+            'cover_url': self.cover_url,
+            'word_count': self.word_count,
+        }
+
+
+class BookCatalog:
+    def __init__(self, generation, books, neighbors):
+        self.generation = generation
+        self.books = books          # gutenberg_id -> BookRecord
+        self.neighbors = neighbors  # gutenberg_id -> voisins dans TableJaccard, dans l'ordre des arêtes
+
+    @classmethod
+    def from_database(cls, generation):
+        books = {}
+        for gutenberg_id, title, authors, language, word_count, closeness, betweenness in BookText.objects.values_list(
+            'gutenberg_id', 'title', 'authors', 'language', 'word_count', 'closeness_centrality', 'betweenness_centrality'
+        ).iterator():
+            books[gutenberg_id] = BookRecord(
+                gutenberg_id, title, authors, language, cover_url(gutenberg_id), word_count, closeness, betweenness
+            )
+
+        neighbors = defaultdict(list)
+        for id1, id2 in TableJaccard.objects.order_by('id').values_list(
+            'book1__gutenberg_id', 'book2__gutenberg_id'
+        ).iterator():
+            neighbors[id1].append(id2)
+            neighbors[id2].append(id1)
+        return cls(generation, books, dict(neighbors))
+
+    def get(self, gutenberg_id):
+        return self.books.get(gutenberg_id)
+
+    def get_neighbors(self, gutenberg_id):
+        return self.neighbors.get(gutenberg_id, [])
+
+
+def _load_catalog(generation):
+    start = time.time()
+    catalog = BookCatalog.from_database(generation)
+    logger.info(f"Catalogue chargé (génération {generation}) : {len(catalog.books)} livres en {time.time() - start:.2f}s")
+    return catalog
+
+
+_catalog_cache = GenerationCache(_load_catalog)
+
+
+def get_catalog():
+    """Renvoie le catalogue courant, rechargé si une nouvelle génération d'index a été publiée."""
+    return _catalog_cache.get()
+
+
+def hydrate(aggregated_results, fields=('score', 'occurrences'), with_centralities=False, book_ids=None):
+    """Construit les résultats d'une recherche à partir des agrégats {gutenberg_id: {champ: valeur}}.
+
+    book_ids restreint et ordonne les livres hydratés (par défaut, tous les livres agrégés).
+    Les livres absents du catalogue sont ignorés, comme le faisaient les vues avec BookText.DoesNotExist.
+    """
+    catalog = get_catalog()
+    results = []
+    for book_id in aggregated_results if book_ids is None else book_ids:
+        book = catalog.get(book_id)
+        if book is None:
+            continue
+        aggregated = aggregated_results[book_id]
+        result = book.summary()
+        for field in fields:
+            result[field] = aggregated[field]
+        if with_centralities:
+            result['closeness'] = book.closeness
+            result['betweenness'] = book.betweenness
+        results.append(result)
+    return results
@@ -1,21 +1,30 @@
 import re
 
-def nettoyer_texte(texte):
-    """ Sépare les métadonnées et le contenu du livre. """
-    texte = texte.lstrip("\ufeff")  # Supprime le BOM (Byte Order Mark) s'il est présent
+START_PATTERN = re.compile(r"(?m)^.*\*\*\* START .*? \*\*\*.*$")
+END_PATTERN = re.compile(r"(?m)^.*\*\*\* END .*? \*\*\*.*$")
+
+def bornes_texte(texte):
+    """ Bornes (fin des métadonnées, début du contenu, fin du contenu) d'un texte sans BOM.
 
-    metadata = ""
-    texte_clean = texte  # Par défaut, tout le texte est considéré propre
+    texte[:fin_metadata].strip() et texte[debut:fin].strip() sont les deux parties renvoyées par nettoyer_texte.
+    """
+    fin_metadata, debut, fin = 0, 0, len(texte)
 
     # Détection de la ligne `*** START ... ***`
-    match = re.search(r"(?m)^.*\*\*\* START .*? \*\*\*.*$", texte)
+    match = START_PATTERN.search(texte)
     if match:
-        metadata = texte[:match.start()].strip()  # Stocke les infos avant `START`
-        texte_clean = texte[match.end():]  # Garde uniquement le texte après cette ligne
+        fin_metadata = match.start()  # Les infos avant `START` sont les métadonnées
+        debut = match.end()  # Le texte commence après cette ligne
 
-    # Détection de la ligne `*** END ... ***`
-    match_end = re.search(r"(?m)^.*\*\*\* END .*? \*\*\*.*$", texte_clean)
+    # Détection de la ligne `*** END ... ***`, cherchée comme dans le texte après `START`
+    match_end = END_PATTERN.search(texte[debut:])
     if match_end:
-        texte_clean = texte_clean[:match_end.start()]  # Coupe avant `END`
+        fin = debut + match_end.start()  # Coupe avant `END`
 
-    return metadata, texte_clean.strip()  # Retourne les métadonnées et le texte nettoyé
+    return fin_metadata, debut, fin
+
+def nettoyer_texte(texte):
+    """ Sépare les métadonnées et le contenu du livre. """
+    texte = texte.lstrip("\ufeff")  # Supprime le BOM (Byte Order Mark) s'il est présent
+    fin_metadata, debut, fin = bornes_texte(texte)
+    return texte[:fin_metadata].strip(), texte[debut:fin].strip()  # Retourne les métadonnées et le texte nettoyé
@@ -0,0 +1,87 @@
+"""Plages du contenu d'un livre demandées à BookContent.
+
+Sans paramètre, tout le contenu nettoyé est envoyé. Une partie peut être demandée en
+octets (?offset=&length=), en paragraphes (?paragraph=&count=, d'après les débuts de
+paragraphes précalculés dans le stock) ou par l'en-tête HTTP Range: bytes=debut-fin.
+Toutes les formes se ramènent à un intervalle d'octets [start, end) du contenu.
+"""
+import re
+from typing import NamedTuple, Optional
+
+RANGE_HEADER = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class ContentRangeError(ValueError):
+    pass
+
+
+class RangeNotSatisfiable(ContentRangeError):
+    pass
+
+
+class ContentRange(NamedTuple):
+    start: int
+    end: int
+    paragraphs: Optional[tuple] = None  # (premier, dernier exclu, total) pour ?paragraph=
+
+
+def _parse_int(params, name, default, minimum):
+    raw = params.get(name)
+    if raw is None or raw == '':
+        return default
+    try:
+        value = int(raw)
+    except ValueError:
+        raise ContentRangeError(f"Paramètre {name} invalide : {raw}")
+    if value < minimum:
+        raise ContentRangeError(f"Paramètre {name} invalide : {raw} (minimum {minimum})")
+    return value
+
+
+def parse_range_header(value, total) -> Optional[ContentRange]:
+    """Plage d'un en-tête Range à une seule plage d'octets ; None si l'en-tête est absent ou ignoré.
+
+    Les en-têtes à plusieurs plages ou d'une autre unité sont ignorés (contenu entier), comme
+    le permet la RFC 9110. RangeNotSatisfiable si la plage commence après la fin du contenu.
+    """
+    match = RANGE_HEADER.match(value.strip()) if value else None
+    if match is None:
+        return None
+    first, last = match.groups()
+    if first == '' and last == '':
+        return None
+    if first == '':
+        suffix = int(last)
+        if suffix == 0:
+            raise RangeNotSatisfiable("Plage vide")
+        return ContentRange(max(total - suffix, 0), total)
+    start = int(first)
+    end = total if last == '' else min(int(last) + 1, total)
+    if start >= total or end <= start:
+        raise RangeNotSatisfiable(f"Plage hors du contenu ({total} octets)")
+    return ContentRange(start, end)
+
+
+def parse_query_range(params, paragraphs, total) -> Optional[ContentRange]:
+    """Plage demandée par ?offset=&length= ou ?paragraph=&count= ; None sans ces paramètres."""
+    if params.get('paragraph') is not None:
+        first = _parse_int(params, 'paragraph', 0, 0)
+        count = _parse_int(params, 'count', 1, 1)
+        if first >= len(paragraphs):
+            raise ContentRangeError(f"Paragraphe {first} inexistant ({len(paragraphs)} paragraphes)")
+        last = min(first + count, len(paragraphs))
+        end = paragraphs[last] if last < len(paragraphs) else total
+        return ContentRange(paragraphs[first], end, (first, last, len(paragraphs)))
+    if params.get('offset') is None and params.get('length') is None:
+        return None
+    start = _parse_int(params, 'offset', 0, 0)
+    length = _parse_int(params, 'length', total - start, 1)
+    return ContentRange(min(start, total), min(start + length, total))
+
+
+def etag_matches(header_value, etag):
+    """Vrai si l'en-tête If-None-Match / If-Range désigne l'ETag (comparaison faible)."""
+    if not header_value:
+        return False
+    candidates = [candidate.strip() for candidate in header_value.split(',')]
+    return '*' in candidates or any(candidate.removeprefix('W/') == etag for candidate in candidates)
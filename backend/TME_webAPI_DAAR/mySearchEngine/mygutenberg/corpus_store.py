@@ -0,0 +1,151 @@
+"""Stockage local, compressé livre par livre, des textes du projet Gutenberg.
+
+Chaque livre est un fichier CORPUS_STORE_DIR/<gutenberg_id>.txt.gz contenant une ligne
+d'en-tête JSON calculée à l'ingestion, suivie du texte complet sans BOM, en UTF-8 :
+
+    metadata_end, content_start, content_end : bornes (en caractères) des métadonnées
+        et du contenu nettoyé (clean_content.bornes_texte, espaces de bord exclus)
+    content_bytes : bornes du contenu nettoyé en octets dans le texte encodé
+    paragraphs : début de chaque paragraphe, en octets depuis le début du contenu
+    etag : empreinte du contenu nettoyé
+
+Le texte complet est conservé car l'indexation porte sur tout le fichier téléchargé ;
+métadonnées et contenu nettoyé (BookDetail) en sont de simples tranches, sans nouvelle
+recherche des lignes START/END. iter_content lit une plage d'octets du contenu par
+morceaux, sans décompresser le livre entier en mémoire (BookContent).
+
+Rempli par populate_and_index_books, lu par populate_and_index_books (réindexation
+sans nouveau téléchargement), run_tests, BookDetail et BookContent.
+"""
+import gzip
+import hashlib
+import json
+import os
+import re
+import tempfile
+from typing import NamedTuple
+
+from django.conf import settings
+
+from mygutenberg.clean_content import bornes_texte
+
+FORMAT_VERSION = 1
+CHUNK_SIZE = 64 * 1024
+PARAGRAPH_BREAK = re.compile(rb'(?:\r?\n[ \t]*){2,}')
+
+
+class StoredBook(NamedTuple):
+    text: str
+    metadata_end: int
+    content_start: int
+    content_end: int
+
+    def metadata(self):
+        return self.text[:self.metadata_end].strip()
+
+    def content(self):
+        return self.text[self.content_start:self.content_end].strip()
+
+    def cleaned(self):
+        """(métadonnées, contenu), comme clean_content.nettoyer_texte."""
+        return self.metadata(), self.content()
+
+
+def describe_text(text):
+    """En-tête du stock pour un texte sans BOM."""
+    metadata_end, start, end = bornes_texte(text)
+    segment = text[start:end]
+    start += len(segment) - len(segment.lstrip())
+    end = start + len(segment.strip())
+    content = text[start:end].encode('utf-8')
+    byte_start = len(text[:start].encode('utf-8'))
+    paragraphs = [0] + [match.end() for match in PARAGRAPH_BREAK.finditer(content) if match.end() < len(content)]
+    return {
+        'version': FORMAT_VERSION,
+        'metadata_end': metadata_end,
+        'content_start': start,
+        'content_end': end,
+        'content_bytes': [byte_start, byte_start + len(content)],
+        'paragraphs': paragraphs,
+        'etag': hashlib.sha1(content).hexdigest()[:20],
+    }
+
+
+class CorpusStore:
+    def __init__(self, root):
+        self.root = os.fspath(root)
+
+    def path(self, book_id):
+        return os.path.join(self.root, f"{int(book_id)}.txt.gz")
+
+    def __contains__(self, book_id):
+        return os.path.exists(self.path(book_id))
+
+    def save(self, book_id, text):
+        """Enregistre le texte d'un livre (écriture atomique) et renvoie le StoredBook correspondant."""
+        text = text.lstrip("\ufeff")
+        header = describe_text(text)
+        os.makedirs(self.root, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as raw, gzip.GzipFile(fileobj=raw, mode='wb', mtime=0) as f:
+                f.write(json.dumps(header).encode('utf-8') + b'\n' + text.encode('utf-8'))
+            os.replace(tmp_path, self.path(book_id))
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        return StoredBook(text, header['metadata_end'], header['content_start'], header['content_end'])
+
+    def _open(self, book_id):
+        try:
+            f = gzip.open(self.path(book_id), 'rb')
+        except FileNotFoundError:
+            raise KeyError(book_id)
+        header = json.loads(f.readline())
+        if header.get('version') != FORMAT_VERSION:
+            f.close()
+            raise ValueError(f"Version de format du stock inconnue pour le livre {book_id} : {header.get('version')}")
+        return f, header
+
+    def load(self, book_id):
+        """StoredBook du livre ; KeyError s'il n'est pas dans le stock."""
+        f, header = self._open(book_id)
+        with f:
+            text = f.read().decode('utf-8')
+        return StoredBook(text, header['metadata_end'], header['content_start'], header['content_end'])
+
+    def header(self, book_id):
+        """En-tête du livre, sans lire le texte."""
+        f, header = self._open(book_id)
+        f.close()
+        return header
+
+    def iter_content(self, book_id, start=0, end=None, chunk_size=CHUNK_SIZE):
+        """Octets [start, end) du contenu nettoyé, par morceaux d'au plus chunk_size octets."""
+        f, header = self._open(book_id)
+        with f:
+            byte_start, byte_end = header['content_bytes']
+            end = byte_end - byte_start if end is None else min(end, byte_end - byte_start)
+            f.seek(f.tell() + byte_start + start)  # avance en décompressant, sans garder les données sautées
+            remaining = end - start
+            while remaining > 0:
+                chunk = f.read(min(chunk_size, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+
+    def delete(self, book_id):
+        try:
+            os.unlink(self.path(book_id))
+        except FileNotFoundError:
+            pass
+
+    def book_ids(self):
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(int(name[:-len('.txt.gz')]) for name in os.listdir(self.root) if name.endswith('.txt.gz'))
+
+
+def get_corpus_store():
+    return CorpusStore(getattr(settings, 'CORPUS_STORE_DIR', os.path.join(settings.BASE_DIR, 'corpus')))
@@ -0,0 +1,79 @@
+"""Données chargées en mémoire et rechargées à chaque nouvelle génération d'index.
+
+Tous les caches du processus (instantané du Trie, catalogue, résultats de recherche) lisent
+la génération courante dans la même horloge, index_generation : ils changent donc de
+génération ensemble, au lieu de vérifier IndexGeneration chacun à son rythme.
+"""
+import threading
+import time
+
+from django.conf import settings
+
+from mygutenberg.models import IndexGeneration
+
+
+class GenerationClock:
+    """Génération d'index courante, lue en base au plus une fois toutes les
+    INDEX_GENERATION_CHECK_INTERVAL secondes, jamais pendant la recherche elle-même.
+    """
+
+    def __init__(self):
+        self.generation = None
+        self._checked_at = None
+        self._lock = threading.Lock()
+
+    def current(self):
+        interval = getattr(settings, 'INDEX_GENERATION_CHECK_INTERVAL', 5)
+        checked_at = self._checked_at
+        if checked_at is not None and time.monotonic() - checked_at < interval:
+            return self.generation
+
+        with self._lock:
+            if self._checked_at is None or time.monotonic() - self._checked_at >= interval:
+                self._read()
+            return self.generation
+
+    def refresh(self):
+        """Relit la génération en base, sans attendre la fin de l'intervalle."""
+        with self._lock:
+            return self._read()
+
+    def _read(self):
+        self.generation = IndexGeneration.current()
+        self._checked_at = time.monotonic()
+        return self.generation
+
+
+index_generation = GenerationClock()
+
+
+class GenerationCache:
+    """Valeur construite par loader(generation) et reconstruite quand index_generation change."""
+
+    def __init__(self, loader):
+        self.loader = loader
+        self.value = None
+        self.generation = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        generation = index_generation.current()
+        value = self.value
+        if value is not None and self.generation == generation:
+            return value
+
+        with self._lock:
+            if self.value is None or self.generation != generation:
+                self._load(generation)
+            return self.value
+
+    def reload(self):
+        """Relit la génération, reconstruit la valeur depuis la base et remplace la valeur courante."""
+        generation = index_generation.refresh()
+        with self._lock:
+            return self._load(generation)
+
+    def _load(self, generation):
+        self.value = self.loader(generation)
+        self.generation = generation
+        return self.value
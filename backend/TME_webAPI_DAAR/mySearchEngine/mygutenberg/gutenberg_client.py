@@ -0,0 +1,164 @@
+"""Téléchargement du catalogue Gutendex et des textes du projet Gutenberg.
+
+Une seule session requests est partagée : connexions persistantes (keep-alive) dans un
+pool de GUTENBERG_FETCH_WORKERS connexions par hôte, nouvelles tentatives avec attente
+exponentielle sur les erreurs réseau et les réponses 429/5xx, et au plus
+GUTENBERG_FETCH_RATE requêtes par seconde vers un même hôte. Les textes sont
+téléchargés par un pool de threads, au plus GUTENBERG_FETCH_WORKERS à la fois ; le
+traitement de chaque texte (découpage en mots) s'exécute dans le thread qui l'a
+téléchargé, en parallèle des téléchargements suivants.
+
+Avec un stock local (corpus_store.CorpusStore), les textes déjà stockés ne sont pas
+retéléchargés et chaque texte téléchargé y est enregistré ; store_texts se contente
+alors de garantir la présence des textes dans le stock, le traitement (par exemple
+dans un pool de processus, voir tokenization) les y relisant lui-même.
+
+Les URL sont configurables (GUTENDEX_URL, GUTENBERG_TEXT_URL) pour pouvoir viser un
+serveur HTTP local servant des textes de test.
+"""
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from urllib.parse import urlsplit
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class HostRateLimiter:
+    """Espace les requêtes vers un même hôte d'au moins 1 / rate secondes (rate nul : pas de limite)."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._next_slot = {}
+        self._lock = threading.Lock()
+
+    def wait(self, url):
+        if not self.interval:
+            return
+        host = urlsplit(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def make_session(pool_size, retries, backoff):
+    """Session requests avec pool de connexions persistantes et nouvelles tentatives (GET uniquement)."""
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset(['GET']),
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+class GutenbergClient:
+    def __init__(self, catalog_url=None, text_url=None, workers=None, rate=None, retries=None, backoff=None, timeout=None,
+                 store=None, refresh=False):
+        self.catalog_url = catalog_url or getattr(settings, 'GUTENDEX_URL', 'https://gutendex.com/books/')
+        self.text_url = text_url or getattr(settings, 'GUTENBERG_TEXT_URL', 'http://gutenberg.org/ebooks/{book_id}.txt.utf-8')
+        self.workers = workers or getattr(settings, 'GUTENBERG_FETCH_WORKERS', 8)
+        self.timeout = timeout or getattr(settings, 'GUTENBERG_FETCH_TIMEOUT', 30)
+        self.rate_limiter = HostRateLimiter(rate if rate is not None else getattr(settings, 'GUTENBERG_FETCH_RATE', 4))
+        self.store = store
+        self.refresh = refresh  # retélécharge les textes même s'ils sont dans le stock
+        self.downloaded = 0
+        self.session = make_session(
+            self.workers,
+            retries if retries is not None else getattr(settings, 'GUTENBERG_FETCH_RETRIES', 3),
+            backoff if backoff is not None else getattr(settings, 'GUTENBERG_FETCH_BACKOFF', 0.5),
+        )
+
+    def get(self, url, **kwargs):
+        self.rate_limiter.wait(url)
+        response = self.session.get(url, timeout=self.timeout, **kwargs)
+        response.raise_for_status()
+        return response
+
+    def fetch_page(self, page, languages):
+        """Livres d'une page du catalogue Gutendex et indicateur de page suivante."""
+        data = self.get(self.catalog_url, params={'page': page, 'languages': ','.join(languages)}).json()
+        return data.get('results', []), bool(data.get('next'))
+
+    def fetch_text(self, book_id):
+        """Texte du livre, lu dans le stock s'il y est, sinon téléchargé (et enregistré dans le stock)."""
+        if self.store is not None and not self.refresh:
+            try:
+                return self.store.load(book_id).text
+            except KeyError:
+                pass
+        text = self.get(self.text_url.format(book_id=book_id)).text
+        self.downloaded += 1
+        if self.store is not None:
+            text = self.store.save(book_id, text).text
+        return text
+
+    def ensure_stored(self, book_id):
+        """Télécharge le texte du livre dans le stock s'il n'y est pas (sans le relire sinon)."""
+        if self.refresh or book_id not in self.store:
+            text = self.get(self.text_url.format(book_id=book_id)).text
+            self.downloaded += 1
+            self.store.save(book_id, text)
+
+    def _fetch_and_process(self, book, process):
+        return process(book, self.fetch_text(book['id']))
+
+    def _store_and_process(self, book, process):
+        self.ensure_stored(book['id'])
+        return process(book)
+
+    def fetch_texts(self, books, process):
+        """Télécharge et traite les textes des livres en parallèle.
+
+        process(book, text) est appelé dans le thread de téléchargement. Produit des triplets
+        (book, résultat, erreur), dans l'ordre des livres en entrée, l'erreur étant la
+        requests.RequestException levée pour ce livre (ou None). Si l'appelant s'arrête avant
+        la fin, les téléchargements pas encore commencés sont annulés.
+        """
+        return self._run(books, self._fetch_and_process, process)
+
+    def store_texts(self, books, process):
+        """Comme fetch_texts, mais process(book) est appelé une fois le texte présent dans le stock."""
+        if self.store is None:
+            raise ValueError("store_texts nécessite un stock local")
+        return self._run(books, self._store_and_process, process)
+
+    def _run(self, books, task, process):
+        books = iter(books)
+        pending = deque()
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='gutenberg-fetch') as executor:
+            def submit(count):
+                for book in islice(books, count):
+                    pending.append((book, executor.submit(task, book, process)))
+
+            try:
+                submit(2 * self.workers)
+                while pending:
+                    book, future = pending.popleft()
+                    try:
+                        result, error = future.result(), None
+                    except requests.RequestException as e:
+                        result, error = None, e
+                    submit(1)
+                    yield book, result, error
+            finally:
+                for _, future in pending:
+                    future.cancel()
+
+    def close(self):
+        self.session.close()
@@ -1,203 +1,728 @@
-from django.core.management.base import BaseCommand
-import requests
+from django.core.management.base import BaseCommand, CommandError
+from django.conf import settings
+import math
+import os
 import time
 import re
 from collections import defaultdict
-from mygutenberg.models import BookText, TableJaccard, TrieNode
-from mygutenberg.algorithms.tfidf import index_document
-from mygutenberg.algorithms.jaccard import compute_jaccard_similarity
-from mygutenberg.algorithms.centrality import build_graph, closeness_centrality, betweenness_centrality
+from contextlib import closing
+from django.db import transaction
+from django.db.models import Q
+from mygutenberg.models import BookText, TableJaccard, TrieNode, Posting, Trigram, IndexGeneration
+from mygutenberg.gutenberg_client import GutenbergClient
+from mygutenberg.corpus_store import get_corpus_store
+from mygutenberg.tokenization import count_stored_book_terms, make_pool
+from mygutenberg.algorithms import postings_codec
+from mygutenberg.algorithms.trigram import build_trigram_index, trie_words
+from mygutenberg.algorithms.tfidf import index_term_counts, compute_idf, compute_tf_from_count, weighted_score
+from mygutenberg.algorithms.jaccard import compute_jaccard_similarity, compute_jaccard_similarity_for, compute_jaccard_similarity_lsh
+from mygutenberg.algorithms.centrality import build_graph, closeness_centrality, betweenness_centrality, betweenness_normalization
+from mygutenberg.algorithms.centrality import approximate_closeness_centrality, approximate_betweenness_centrality, DEFAULT_EPSILON
+
+POSTINGS_BATCH_SIZE = 5000
+SIMILARITIES_BATCH_SIZE = 5000  # arêtes TableJaccard par bulk_create
+CENTRALITIES_BATCH_SIZE = 1000  # livres par bulk_update des centralités
+IN_BATCH_SIZE = 500  # identifiants par requête ... IN (...)
+WHITELISTS = {
+    'en': 'words_alpha.txt',
+    'fr': 'liste.de.mots.francais.frgut.txt'
+}
+JACCARD_THRESHOLD = 0.35  # Seuil pour Jaccard
 
 class Command(BaseCommand):
     help = 'Remplit et indexe les livres Gutenberg, construit le Trie, et calcule les similarités Jaccard.'
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--indexer', choices=['documents', 'matrix'], default='documents',
+            help="Calcul du TF-IDF : livre par livre (documents) ou matrice creuse de tout le corpus avec NumPy (matrix)",
+        )
+        parser.add_argument('--count', type=int, help="Nombre de livres à indexer (1664 par défaut), ou à ajouter avec --incremental (aucun par défaut)")
+        parser.add_argument('--catalog-url', help="URL du catalogue Gutendex (par défaut GUTENDEX_URL)")
+        parser.add_argument('--text-url', help="Modèle d'URL des textes, avec {book_id} (par défaut GUTENBERG_TEXT_URL)")
+        parser.add_argument('--workers', type=int, help="Téléchargements simultanés (par défaut GUTENBERG_FETCH_WORKERS)")
+        parser.add_argument('--refresh-corpus', action='store_true', help="Retélécharge les textes déjà présents dans le stock local (CORPUS_STORE_DIR)")
+        parser.add_argument(
+            '--jaccard', choices=['exact', 'lsh'],
+            help="Similarités : toutes les paires (exact) ou seulement les paires candidates MinHash/LSH, vérifiées "
+                 "exactement (lsh) ; par défaut JACCARD_METHOD",
+        )
+        parser.add_argument(
+            '--centrality', choices=['exact', 'approximate'],
+            help="Centralités : exactes (Brandes, BFS depuis tous les livres) ou estimées par échantillonnage "
+                 "(approximate) ; par défaut CENTRALITY_METHOD",
+        )
+        parser.add_argument(
+            '--centrality-samples', type=int,
+            help="Pivots (proximité) et plus courts chemins tirés (intermédiarité) avec --centrality approximate "
+                 "(par défaut CENTRALITY_SAMPLES, sinon déduit de --centrality-epsilon)",
+        )
+        parser.add_argument(
+            '--centrality-epsilon', type=float,
+            help="Erreur visée avec --centrality approximate, qui fixe le nombre de tirages (par défaut CENTRALITY_EPSILON)",
+        )
+        parser.add_argument('--tokenize-workers', type=int, help="Processus de découpage des textes (par défaut TOKENIZE_WORKERS, ou un par processeur)")
+        parser.add_argument(
+            '--incremental', action='store_true',
+            help="Met à jour l'index existant (livres ajoutés avec --count, retirés avec --remove) au lieu de tout reconstruire",
+        )
+        parser.add_argument('--remove', type=int, nargs='+', default=[], metavar='GUTENBERG_ID', help="Livres à retirer de l'index (avec --incremental)")
+        parser.add_argument(
+            '--idf-tolerance', type=float,
+            help="Dérive relative d'IDF en deçà de laquelle les postings existants d'un mot ne sont pas recalculés "
+                 "(avec --incremental ; par défaut INCREMENTAL_IDF_TOLERANCE)",
+        )
+
     def handle(self, *args, **options):
+        if options['incremental']:
+            return self.handle_incremental(options)
+        if options['remove']:
+            self.stdout.write(self.style.WARNING(f"[{time.ctime()}] --remove n'est utilisé qu'avec --incremental : reconstruction complète."))
+
         self.stdout.write(f"[{time.ctime()}] Début du remplissage et de l'indexation des livres...")
 
         # Configuration
-        base_url = 'https://gutendex.com/books/'
-        target_count = 1664  # Objectif final : 1664 livres
-        threshold = 0.35  # Seuil pour Jaccard
-        page = 1
-        books_added = 0
-
-        whitelists = {
-            'en': 'words_alpha.txt',
-            'fr': 'liste.de.mots.francais.frgut.txt'
-        }
-        languages = ['en', 'fr']
-        all_docs = {}
-        book_meta = {}
-
-        # Chargement des listes blanches
-        whitelist_data = {}
-        for lang in languages:
-            with open(whitelists[lang], 'r') as f:
-                whitelist_data[lang] = set(line.strip().lower() for line in f if len(line.strip()) > 2)
-            self.stdout.write(f"[{time.ctime()}] {len(whitelist_data[lang])} mots chargés pour {lang}.")
+        target_count = options['count'] if options['count'] is not None else 1664  # Objectif final : 1664 livres
+        threshold = JACCARD_THRESHOLD
 
         # Réinitialisation des tables
         BookText.objects.all().delete()
+        Posting.objects.all().delete()
+        Trigram.objects.all().delete()
         TrieNode.objects.all().delete()
         TableJaccard.objects.all().delete()
 
-        # Récupération et traitement des livres
-        while books_added < target_count:
-            self.stdout.write(f"[{time.ctime()}] Récupération de la page {page}...")
-            response = requests.get(f'{base_url}?page={page}&languages=fr,en')
-            books = response.json().get('results', [])
-            self.stdout.write(f"[{time.ctime()}] {len(books)} livres trouvés.")
-
-            for book in books:
-                book_id = book['id']
-                if BookText.objects.filter(gutenberg_id=book_id).exists():
-                    self.stdout.write(f"[{time.ctime()}] Livre {book_id} ignoré (déjà existant)")
-                    continue
-
-                language = book.get('languages', ['en'])[0]
-                if language not in languages:
-                    continue
-
-                text_url = f'http://gutenberg.org/ebooks/{book_id}.txt.utf-8'
-                try:
-                    text_response = requests.get(text_url)
-                    text_response.raise_for_status()
-                    content = text_response.text.lower()
-                    words = re.split(r'[^A-Za-z]+', content)
-                    filtered_words = [w for w in words if w in whitelist_data[language] and len(w) > 2]
-
-                    if 10000 <= len(filtered_words) <= 100000:
-                        title = book.get('title', 'Unknown')
-                        authors_list = [{'name': a.get('name', '')} for a in book.get('authors', [])]
-
-                        all_docs[book_id] = filtered_words
-                        book_meta[book_id] = {'title': title, 'authors': authors_list, 'language': language}
-
-                        BookText.objects.create(
-                            gutenberg_id=book_id,
-                            title=title,
-                            authors=authors_list,
-                            word_count=len(filtered_words),
-                            language=language,
-                            closeness_centrality=0.0,
-                            betweenness_centrality=0.0
-                        )
-
-                        books_added += 1
-                        self.stdout.write(self.style.SUCCESS(
-                            f"[{time.ctime()}] Livre {book_id} ajouté ({len(filtered_words)} mots, {language}) - {books_added}/{target_count}"
-                        ))
-
-                        if books_added >= target_count:
-                            break
-
-                except requests.RequestException as e:
-                    self.stdout.write(self.style.WARNING(f"[{time.ctime()}] Échec de récupération du livre {book_id} : {str(e)}"))
-                    continue
-
-            self.stdout.write(f"[{time.ctime()}] Page {page} terminée - Total livres ajoutés : {books_added}/{target_count}")
-            page += 1
-
-        self.stdout.write(f"[{time.ctime()}] Fin de la récupération. Total livres ajoutés : {books_added}")
+        all_docs, book_meta = self.fetch_books(options, target_count)
+        create_books(book_meta)
+        books_added = len(all_docs)
 
         # Pré-calcul des fréquences de documents (DF)
         self.stdout.write(f"[{time.ctime()}] Calcul des fréquences de documents (DF)...")
         document_frequencies = defaultdict(int)
-        for words in all_docs.values():
-            for term in set(words):
+        for term_counts in all_docs.values():
+            for term in term_counts:
                 document_frequencies[term] += 1
         total_documents = len(all_docs)
         self.stdout.write(f"[{time.ctime()}] DF calculé pour {len(document_frequencies)} termes uniques sur {total_documents} documents.")
 
-        # Étape d'indexation avec Trie
-        self.stdout.write(f"[{time.ctime()}] Début de l'indexation pour {total_documents} livres...")
-        books_processed = 0
-        total_words_indexed = 0
+        # Construction du Trie : tous les mots du vocabulaire, sans postings
+        self.stdout.write(f"[{time.ctime()}] Construction du Trie...")
         trie_nodes_to_create = []
         trie_nodes_dict = {} # Dictionnaire pour suivre les noeuds en mémoire (clé: (parent_id, char))
-
-        for book_id, filtered_words in all_docs.items():
-            books_processed += 1
-            self.stdout.write(f"[{time.ctime()}] Indexation du livre {book_id} ({books_processed}/{total_documents})...")
-
+        end_nodes = {} # Mot -> noeud de fin de mot
+        book_words = {}
+        for book_id in all_docs:
             if book_id not in book_meta:
                 self.stdout.write(self.style.WARNING(f"[{time.ctime()}] Métadonnées manquantes pour le livre {book_id}"))
                 continue
+            book_words[book_id] = title_and_author_words(book_meta[book_id])
+        vocabulary = set(document_frequencies)
+        for title_words, author_words in book_words.values():
+            vocabulary.update(title_words)
+            vocabulary.update(author_words)
+        for word in sorted(vocabulary):
+            node = insert_word_into_trie(word, trie_nodes_dict, trie_nodes_to_create)
+            node.document_frequency = document_frequencies.get(word, 0)
+            node.idf = compute_idf(word, document_frequencies, total_documents)
+            end_nodes[word] = node
+
+        self.stdout.write(f"[{time.ctime()}] Sauvegarde des {len(trie_nodes_to_create)} noeuds dans la base...")
+        if trie_nodes_to_create:
+            save_trie_nodes(trie_nodes_to_create)
 
-            meta = book_meta[book_id]
-            title_words = [w for w in re.split(r'[^A-Za-z]+', meta['title'].lower()) if w]
-            author_words = []
-            for author in meta['authors']:
-                author_words.extend(w for w in re.split(r'[^A-Za-z]+', author['name'].lower()) if w)
-
-            doc_index = index_document(
-                document_words=filtered_words,
-                total_documents=total_documents,
-                document_frequencies=document_frequencies,
-                title_words=title_words,
-                author_words=author_words
-            )
+        # Index de trigrammes du vocabulaire, pour les regex sans littéral en tête
+        self.stdout.write(f"[{time.ctime()}] Construction de l'index de trigrammes...")
+        trigram_count = save_trigram_index(end_nodes)
+        self.stdout.write(f"[{time.ctime()}] {trigram_count} trigrammes enregistrés.")
 
-            for word, data in doc_index.items():
-                total_words_indexed = insert_word_into_trie(
-                    word, book_id, data, trie_nodes_dict, trie_nodes_to_create, total_words_indexed
-                )
-
-        self.stdout.write(f"[{time.ctime()}] Index construit avec {total_words_indexed} entrées au total.")
+        if options['indexer'] == 'matrix':
+            self.stdout.write(f"[{time.ctime()}] Construction de la matrice TF-IDF pour {total_documents} livres...")
+            total_words_indexed = save_matrix_postings(all_docs, book_words, vocabulary, end_nodes)
+            self.stdout.write(f"[{time.ctime()}] Index construit avec {total_words_indexed} entrées au total.")
+        else:
+            total_words_indexed = self.index_documents(all_docs, book_words, total_documents, document_frequencies, end_nodes)
+            self.stdout.write(f"[{time.ctime()}] Index construit avec {total_words_indexed} entrées au total.")
 
-        self.stdout.write(f"[{time.ctime()}] Sauvegarde des noeuds dans la base...")
-        if trie_nodes_to_create:
-            save_trie_nodes(trie_nodes_to_create)
-                
         self.stdout.write(self.style.SUCCESS(f"[{time.ctime()}] {books_added} livres indexés avec succès !"))
 
         # Calcul des similarités de Jaccard
-        self.stdout.write(f"[{time.ctime()}] Calcul des similarités de Jaccard avec un seuil de {threshold}...")
+        self.stdout.write(f"[{time.ctime()}] Calcul des similarités de Jaccard ({jaccard_method(options)}) avec un seuil de {threshold}...")
         book_ids = list(all_docs.keys())
-        similarities = compute_jaccard_similarity(book_ids, all_docs, threshold)
+        similarities = compute_similarities(book_ids, all_docs, threshold, jaccard_method(options))
 
         # Remplissage de TableJaccard
-        created_count = 0
-        self.stdout.write(f"[{time.ctime()}] Enregistrement des similarités dans TableJaccard...")
-        for (id1, id2), similarity in similarities.items():
-            try:
-                book1 = BookText.objects.get(gutenberg_id=id1)
-                book2 = BookText.objects.get(gutenberg_id=id2)
-                TableJaccard.objects.create(
-                    book1=book1,
-                    book2=book2,
-                    jaccard_similarity=similarity
-                )
-                created_count += 1
-                if created_count % 1000 == 0:
-                    self.stdout.write(f"[{time.ctime()}] {created_count} similarités enregistrées...")
-            except BookText.DoesNotExist:
-                self.stdout.write(self.style.WARNING(f"[{time.ctime()}] Livre {id1} ou {id2} non trouvé."))
-                continue
-
+        created_count = self.save_similarities(similarities)
         self.stdout.write(self.style.SUCCESS(f"[{time.ctime()}] {created_count} similarités enregistrées avec succès."))
 
         # Construire le graphe et calculer les centralités
-        self.stdout.write(f"[{time.ctime()}] Construction du graphe et calcul des centralités...")
-        graph = build_graph(TableJaccard.objects.all())
+        self.stdout.write(f"[{time.ctime()}] Construction du graphe et calcul des centralités ({centrality_method(options)})...")
+        graph = build_graph(TableJaccard.objects.select_related('book1', 'book2'))
         if graph:
-            books = BookText.objects.all()
+            books = list(BookText.objects.all())
             book_ids = [book.gutenberg_id for book in books]
-            closeness = closeness_centrality(graph, book_ids)
-            betweenness = betweenness_centrality(graph, book_ids)
+            closeness, betweenness = compute_centralities(graph, book_ids, options)
 
             for book in books:
                 book.closeness_centrality = closeness.get(book.gutenberg_id, 0.0)
                 book.betweenness_centrality = betweenness.get(book.gutenberg_id, 0.0)
-                book.save()
+            self.save_centralities(books)
 
             self.stdout.write(self.style.SUCCESS(f"[{time.ctime()}] Centralités calculées et enregistrées dans BookText."))
         else:
             self.stdout.write(self.style.WARNING(f"[{time.ctime()}] Aucun graphe généré."))
 
+        # Publication de la nouvelle génération : les serveurs rechargent leur instantané du Trie
+        generation = IndexGeneration.publish()
+        self.stdout.write(f"[{time.ctime()}] Génération d'index {generation} publiée.")
+
         self.stdout.write(self.style.SUCCESS(f"[{time.ctime()}] {books_added} livres ajoutés, indexés, similarités et centralités calculées avec succès !"))
 
-def insert_word_into_trie(word, book_id, data, trie_nodes_dict, trie_nodes_to_create, total_words_indexed):
+    def handle_incremental(self, options):
+        """Met à jour l'index en place : ajout de --count livres du catalogue, retrait des livres --remove.
+
+        Seuls les postings des livres ajoutés ou retirés sont écrits ou supprimés ; ceux des autres
+        livres ne sont recalculés que pour les mots dont l'IDF a dérivé de plus de --idf-tolerance
+        (en relatif) depuis son dernier calcul. Les similarités ne sont calculées que pour les paires
+        comprenant un livre ajouté, et les centralités que dans les composantes connexes touchées.
+        """
+        start = time.time()
+        target_count = options['count'] or 0
+        tolerance = options['idf_tolerance']
+        if tolerance is None:
+            tolerance = getattr(settings, 'INCREMENTAL_IDF_TOLERANCE', 0.01)
+
+        previous_ids = set(BookText.objects.values_list('gutenberg_id', flat=True))
+        removed = [book_id for book_id in dict.fromkeys(options['remove']) if book_id in previous_ids]
+        for book_id in sorted(set(options['remove']) - previous_ids):
+            self.stdout.write(self.style.WARNING(f"[{time.ctime()}] Livre {book_id} absent de l'index, non retiré."))
+        self.stdout.write(
+            f"[{time.ctime()}] Indexation incrémentale de {len(previous_ids)} livres : {len(removed)} à retirer, "
+            f"jusqu'à {target_count} à ajouter (tolérance de dérive d'IDF {tolerance})."
+        )
+
+        all_docs, book_meta = self.fetch_books(options, target_count, excluded=removed)
+        if not all_docs and not removed:
+            self.stdout.write(self.style.WARNING(f"[{time.ctime()}] Aucun livre ajouté ni retiré : index inchangé."))
+            return
+
+        with transaction.atomic():
+            previous_graph_size = jaccard_graph_size()
+            # Voisins des livres retirés dans le graphe de Jaccard, avant la suppression de leurs arêtes
+            removed_edges = TableJaccard.objects.filter(Q(book1__gutenberg_id__in=removed) | Q(book2__gutenberg_id__in=removed))
+            removed_neighbors = set()
+            for id1, id2 in removed_edges.values_list('book1__gutenberg_id', 'book2__gutenberg_id'):
+                removed_neighbors.update((id1, id2))
+            removed_neighbors.difference_update(removed)
+
+            term_ids, report = self.update_postings(all_docs, book_meta, removed, tolerance)
+            report.update(self.update_similarities(all_docs, term_ids, jaccard_method(options)))
+            report.update(self.update_centralities(set(all_docs) | removed_neighbors, previous_graph_size, options))
+
+        generation = IndexGeneration.publish()
+        self.stdout.write(f"[{time.ctime()}] Génération d'index {generation} publiée.")
+        self.stdout.write(self.style.SUCCESS(
+            f"[{time.ctime()}] Indexation incrémentale terminée en {time.time() - start:.1f}s : "
+            f"{len(all_docs)} livres ajoutés, {len(removed)} retirés.\n"
+            f"  Mots : {report['new_terms']} nouveaux, {report['dead_terms']} retirés, "
+            f"{report['refreshed_terms']} recalculés, {report['skipped_terms']} laissés tels quels (dérive d'IDF <= {tolerance}).\n"
+            f"  Postings : {report['created_postings']} créés, {report['deleted_postings']} supprimés, "
+            f"{report['updated_postings']} recalculés, {report['skipped_postings']} non modifiés.\n"
+            f"  Jaccard : {report['computed_pairs']} paires avec un livre ajouté ({report['created_edges']} arêtes ajoutées), "
+            f"{report['skipped_pairs']} paires existantes non recalculées.\n"
+            f"  Centralités : {report['recomputed_books']} livres recalculés, {report['rescaled_books']} remis à l'échelle, "
+            f"{report['unchanged_books']} inchangés."
+        ))
+
+    def update_postings(self, all_docs, book_meta, removed, tolerance):
+        """Retire et ajoute les livres dans BookText, le Trie, Posting et l'index de trigrammes.
+
+        Renvoie {mot: identifiant du TrieNode} pour tout le vocabulaire et les compteurs du rapport.
+        """
+        rows = list(TrieNode.objects.values_list('id', 'parent_id', 'char', 'is_end_of_word'))
+        children = {(parent_id, char): node_id for node_id, parent_id, char, _ in rows}
+        term_ids = {word: node_id for node_id, word in trie_words(rows)}
+        del rows
+
+        # Livres retirés : DF des mots de leur texte décrémenté, postings supprimés
+        document_frequency_changes = defaultdict(int)
+        removed_terms = set()
+        for term_id, occurrences in Posting.objects.filter(gutenberg_id__in=removed).values_list('term_id', 'occurrences'):
+            removed_terms.add(term_id)
+            if occurrences > 0:
+                document_frequency_changes[term_id] -= 1
+        deleted_postings, _ = Posting.objects.filter(gutenberg_id__in=removed).delete()
+        BookText.objects.filter(gutenberg_id__in=removed).delete()  # et leurs arêtes de TableJaccard
+        self.stdout.write(f"[{time.ctime()}] {len(removed)} livres retirés ({deleted_postings} postings supprimés).")
+
+        # Livres ajoutés : nouveaux mots insérés dans le Trie, DF incrémenté
+        create_books(book_meta)
+        book_words = {book_id: title_and_author_words(meta) for book_id, meta in book_meta.items()}
+        new_words = set()
+        for book_id, term_counts in all_docs.items():
+            title_words, author_words = book_words[book_id]
+            new_words.update(word for word in term_counts if word not in term_ids)
+            new_words.update(word for word in title_words + author_words if word not in term_ids)
+        new_terms = extend_trie(sorted(new_words), children)
+        term_ids.update(new_terms)
+        for term_counts in all_docs.values():
+            for word in term_counts:
+                document_frequency_changes[term_ids[word]] += 1
+        self.stdout.write(f"[{time.ctime()}] {len(new_terms)} nouveaux mots insérés dans le Trie.")
+
+        # IDF de chaque mot : recalculé seulement si la dérive depuis son dernier calcul dépasse la tolérance
+        total_documents = BookText.objects.count()
+        term_stats = {}  # identifiant -> (DF, IDF des postings)
+        refreshed = []
+        skipped_terms = 0
+        stats = TrieNode.objects.filter(is_end_of_word=True).values_list('id', 'document_frequency', 'idf')
+        for term_id, document_frequency, idf in stats.iterator(chunk_size=10000):
+            document_frequency += document_frequency_changes.get(term_id, 0)
+            new_idf = math.log(total_documents / (document_frequency + 1)) if total_documents else None
+            if idf is not None and new_idf is not None and abs(new_idf - idf) <= tolerance * abs(idf):
+                new_idf = idf
+                skipped_terms += 1
+            elif idf is not None:
+                refreshed.append(term_id)
+            term_stats[term_id] = (document_frequency, new_idf)
+
+        # Postings des livres ajoutés, avec l'IDF retenu pour chaque mot
+        added = set(all_docs)
+        added_terms = set()
+        created_postings = 0
+        postings = []
+        for book_id, term_counts in all_docs.items():
+            title_words, author_words = map(set, book_words[book_id])
+            for word in title_words.union(term_counts, author_words):
+                term_id = term_ids[word]
+                added_terms.add(term_id)
+                tfidf = compute_tf_from_count(term_counts.get(word, 0)) * term_stats[term_id][1]
+                postings.append(Posting(
+                    term_id=term_id,
+                    gutenberg_id=book_id,
+                    occurrences=term_counts.get(word, 0),
+                    tfidf=tfidf,
+                    score=weighted_score(tfidf, word in title_words, word in author_words)
+                ))
+            if len(postings) >= POSTINGS_BATCH_SIZE:
+                Posting.objects.bulk_create(postings, batch_size=POSTINGS_BATCH_SIZE)
+                created_postings += len(postings)
+                postings = []
+        if postings:
+            Posting.objects.bulk_create(postings, batch_size=POSTINGS_BATCH_SIZE)
+            created_postings += len(postings)
+
+        # Postings des autres livres pour les mots dont l'IDF a trop dérivé
+        self.stdout.write(f"[{time.ctime()}] Recalcul des postings de {len(refreshed)} mots ({skipped_terms} mots sous la tolérance)...")
+        words = {term_id: word for word, term_id in term_ids.items()}
+        book_title_author = {}
+        for book in BookText.objects.values('gutenberg_id', 'title', 'authors'):
+            title_words, author_words = title_and_author_words(book)
+            book_title_author[book['gutenberg_id']] = (set(title_words), set(author_words))
+        updated_postings = 0
+        for batch in chunks(refreshed, IN_BATCH_SIZE):
+            to_update = []
+            for posting in Posting.objects.filter(term_id__in=batch).only('id', 'term_id', 'gutenberg_id', 'occurrences'):
+                if posting.gutenberg_id in added:
+                    continue
+                word = words[posting.term_id]
+                title_words, author_words = book_title_author.get(posting.gutenberg_id, ((), ()))
+                posting.tfidf = compute_tf_from_count(posting.occurrences) * term_stats[posting.term_id][1]
+                posting.score = weighted_score(posting.tfidf, word in title_words, word in author_words)
+                to_update.append(posting)
+            Posting.objects.bulk_update(to_update, ['tfidf', 'score'], batch_size=1000)
+            updated_postings += len(to_update)
+        touched = removed_terms | added_terms | set(refreshed)
+
+        # Mots qui n'apparaissent plus dans aucun livre : retirés du vocabulaire (les noeuds restent)
+        candidates = removed_terms - added_terms
+        alive = set()
+        for batch in chunks(sorted(candidates), IN_BATCH_SIZE):
+            alive.update(Posting.objects.filter(term_id__in=batch).values_list('term_id', flat=True).distinct())
+        dead = candidates - alive
+        for batch in chunks(sorted(dead), IN_BATCH_SIZE):
+            TrieNode.objects.filter(id__in=batch).update(is_end_of_word=False, document_frequency=0, idf=None)
+
+        self.stdout.write(f"[{time.ctime()}] Écriture de DF et IDF pour {len(touched - dead)} mots...")
+        save_term_stats(touched - dead, term_stats)
+        update_trigram_index({term_id: word for word, term_id in new_terms.items()}, {term_id: words[term_id] for term_id in dead})
+        for term_id in dead:
+            del term_ids[words[term_id]]
+
+        return term_ids, {
+            'new_terms': len(new_terms),
+            'dead_terms': len(dead),
+            'refreshed_terms': len(refreshed),
+            'skipped_terms': skipped_terms,
+            'created_postings': created_postings,
+            'deleted_postings': deleted_postings,
+            'updated_postings': updated_postings,
+            'skipped_postings': Posting.objects.count() - created_postings - updated_postings,
+        }
+
+    def update_similarities(self, all_docs, term_ids, method):
+        """Ajoute dans TableJaccard les arêtes des seules paires comprenant un livre ajouté."""
+        existing_count = BookText.objects.count() - len(all_docs)
+        report = {'computed_pairs': 0, 'created_edges': 0, 'skipped_pairs': existing_count * (existing_count - 1) // 2}
+        if not all_docs:
+            return report
+
+        # Mots du texte des livres déjà indexés, relus dans Posting ; des mots plutôt que des
+        # identifiants pour que les signatures MinHash soient celles d'une reconstruction complète
+        self.stdout.write(f"[{time.ctime()}] Calcul des similarités de Jaccard ({method}) des {len(all_docs)} livres ajoutés...")
+        words = {term_id: word for word, term_id in term_ids.items()}
+        existing_sets = defaultdict(set)
+        for book_id, term_id in Posting.objects.filter(occurrences__gt=0).values_list('gutenberg_id', 'term_id').iterator(chunk_size=10000):
+            if book_id not in all_docs:
+                existing_sets[book_id].add(words[term_id])
+        book_sets = {book_id: existing_sets[book_id] for book_id in sorted(existing_sets)}
+        for book_id, term_counts in all_docs.items():
+            book_sets[book_id] = set(term_counts)
+
+        if method == 'lsh':
+            similarities = compute_similarities(list(book_sets), book_sets, JACCARD_THRESHOLD, method, new_ids=set(all_docs))
+        else:
+            similarities = compute_jaccard_similarity_for(list(all_docs), book_sets, JACCARD_THRESHOLD)
+        report['computed_pairs'] = len(all_docs) * existing_count + len(all_docs) * (len(all_docs) - 1) // 2
+        report['created_edges'] = self.save_similarities(similarities)
+        return report
+
+    def update_centralities(self, touched_books, previous_graph_size, options):
+        """Recalcule les centralités des composantes connexes contenant un livre touché.
+
+        Ailleurs, la proximité ne change pas et l'intermédiarité est seulement remise à l'échelle
+        du nouveau nombre de noeuds du graphe de Jaccard (previous_graph_size avant la mise à jour) :
+        même normalisation que betweenness_centrality sur tout le graphe, où les livres sans arête
+        ne comptent pas.
+        """
+        graph = build_graph(TableJaccard.objects.select_related('book1', 'book2'))
+        books = list(BookText.objects.all())
+        norm_factor = betweenness_normalization(len(graph))
+        scale = betweenness_normalization(previous_graph_size) / norm_factor
+        book_ids = {book.gutenberg_id for book in books}
+        closeness, betweenness = {}, {}
+        for book_id in sorted(touched_books & book_ids):
+            if book_id in closeness:
+                continue
+            component = connected_component(graph, book_id)
+            subgraph = {node: graph.get(node, set()) for node in component}
+            component_closeness, component_betweenness = compute_centralities(subgraph, component, options)
+            closeness.update(component_closeness)
+            component_factor = betweenness_normalization(len(subgraph)) / norm_factor
+            for node, value in component_betweenness.items():
+                betweenness[node] = value * component_factor
+        self.stdout.write(f"[{time.ctime()}] Centralités recalculées pour {len(closeness)} livres sur {len(books)}.")
+
+        to_update = []
+        rescaled = 0
+        for book in books:
+            if book.gutenberg_id in closeness:
+                book.closeness_centrality = closeness[book.gutenberg_id]
+                book.betweenness_centrality = betweenness[book.gutenberg_id]
+                to_update.append(book)
+            elif scale != 1 and book.betweenness_centrality:
+                book.betweenness_centrality *= scale
+                to_update.append(book)
+                rescaled += 1
+        self.save_centralities(to_update)
+        return {
+            'recomputed_books': len(closeness),
+            'rescaled_books': rescaled,
+            'unchanged_books': len(books) - len(closeness) - rescaled,
+        }
+
+    def fetch_books(self, options, target_count, excluded=()):
+        """Récupère jusqu'à target_count nouveaux livres du catalogue et compte les termes de leur texte.
+
+        Les textes sont téléchargés (ou trouvés dans le stock local) par un pool de threads, puis
+        découpés dans un pool de processus qui les relit dans le stock. Renvoie
+        ({gutenberg_id: {mot: occurrences}}, {gutenberg_id: métadonnées}) dans l'ordre du catalogue.
+        """
+        all_docs = {}
+        book_meta = {}
+        if target_count <= 0:
+            return all_docs, book_meta
+
+        client = GutenbergClient(options['catalog_url'], options['text_url'], options['workers'],
+                                 store=get_corpus_store(), refresh=options['refresh_corpus'])
+        languages = ['en', 'fr']
+        for lang in languages:
+            if not os.path.exists(WHITELISTS[lang]):
+                raise CommandError(f"Liste blanche introuvable pour {lang} : {WHITELISTS[lang]}")
+        tokenize_workers = options['tokenize_workers'] or getattr(settings, 'TOKENIZE_WORKERS', None) or os.cpu_count()
+
+        # Récupération et traitement des livres : les pages du catalogue sont lues au fil de l'eau,
+        # les textes téléchargés en parallèle puis découpés dans le pool de processus, et les
+        # résultats reçus dans l'ordre du catalogue
+        def catalog_books():
+            page = 1
+            has_next = True
+            seen = set(excluded)
+            while has_next:
+                self.stdout.write(f"[{time.ctime()}] Récupération de la page {page}...")
+                books, has_next = client.fetch_page(page, ['fr', 'en'])
+                self.stdout.write(f"[{time.ctime()}] {len(books)} livres trouvés.")
+                for book in books:
+                    book_id = book['id']
+                    if book_id in seen or BookText.objects.filter(gutenberg_id=book_id).exists():
+                        self.stdout.write(f"[{time.ctime()}] Livre {book_id} ignoré (déjà existant)")
+                        continue
+                    seen.add(book_id)
+
+                    language = book.get('languages', ['en'])[0]
+                    if language not in languages:
+                        continue
+                    yield dict(book, language=language)
+                page += 1
+
+        pool = make_pool({lang: WHITELISTS[lang] for lang in languages}, tokenize_workers)
+
+        def count_terms(book):
+            # Dans le thread de téléchargement : seuls l'identifiant du livre et ses fréquences de termes
+            # transitent entre processus, le texte est relu dans le stock par le processus de découpage
+            return pool.submit(count_stored_book_terms, client.store.root, book['id'], book['language']).result()
+
+        start = time.time()
+        self.stdout.write(f"[{time.ctime()}] Découpage des textes dans {tokenize_workers} processus.")
+        with pool, closing(client.store_texts(catalog_books(), count_terms)) as results:
+            for book, result, error in results:
+                book_id = book['id']
+                language = book['language']
+                if error is not None:
+                    self.stdout.write(self.style.WARNING(f"[{time.ctime()}] Échec de récupération du livre {book_id} : {str(error)}"))
+                    continue
+
+                term_counts, word_count = result
+                if 10000 <= word_count <= 100000:
+                    all_docs[book_id] = term_counts
+                    book_meta[book_id] = {
+                        'title': book.get('title', 'Unknown'),
+                        'authors': [{'name': a.get('name', '')} for a in book.get('authors', [])],
+                        'language': language,
+                        'word_count': word_count,
+                    }
+                    self.stdout.write(self.style.SUCCESS(
+                        f"[{time.ctime()}] Livre {book_id} ajouté ({word_count} mots, {language}) - {len(all_docs)}/{target_count}"
+                    ))
+
+                    if len(all_docs) >= target_count:
+                        break
+
+        client.close()
+        self.stdout.write(
+            f"[{time.ctime()}] Récupération des textes terminée en {time.time() - start:.1f}s : {client.downloaded} téléchargés "
+            f"({client.workers} simultanés), les autres lus dans le stock {client.store.root}."
+        )
+        self.stdout.write(f"[{time.ctime()}] Fin de la récupération. Total livres ajoutés : {len(all_docs)}")
+        return all_docs, book_meta
+
+    def save_similarities(self, similarities):
+        """Enregistre les arêtes {(id1, id2): similarité} dans TableJaccard ; renvoie le nombre créé.
+
+        Les gutenberg_id sont traduits en clés primaires par une seule requête, puis les arêtes
+        sont écrites par lots (bulk_create) dans une seule transaction.
+        """
+        self.stdout.write(f"[{time.ctime()}] Enregistrement des similarités dans TableJaccard...")
+        start = time.time()
+        book_pks = dict(BookText.objects.values_list('gutenberg_id', 'pk'))
+        edges = []
+        for (id1, id2), similarity in similarities.items():
+            if id1 not in book_pks or id2 not in book_pks:
+                self.stdout.write(self.style.WARNING(f"[{time.ctime()}] Livre {id1} ou {id2} non trouvé."))
+                continue
+            edges.append(TableJaccard(book1_id=book_pks[id1], book2_id=book_pks[id2], jaccard_similarity=similarity))
+
+        created_count = 0
+        with transaction.atomic():
+            for batch in chunks(edges, SIMILARITIES_BATCH_SIZE):
+                TableJaccard.objects.bulk_create(batch)
+                created_count += len(batch)
+                self.stdout.write(f"[{time.ctime()}] {created_count} similarités enregistrées...")
+        self.report_rate("similarités enregistrées", created_count, time.time() - start)
+        return created_count
+
+    def save_centralities(self, books):
+        """Écrit les centralités des livres (instances BookText modifiées) par lots, dans une seule transaction."""
+        start = time.time()
+        with transaction.atomic():
+            BookText.objects.bulk_update(books, ['closeness_centrality', 'betweenness_centrality'], batch_size=CENTRALITIES_BATCH_SIZE)
+        self.report_rate("centralités enregistrées", len(books), time.time() - start)
+
+    def report_rate(self, label, rows, elapsed):
+        rate = f"{rows / elapsed:.0f} lignes/s" if elapsed > 0 else "-"
+        self.stdout.write(f"[{time.ctime()}] {rows} {label} en {elapsed:.2f}s ({rate}).")
+
+    def index_documents(self, all_docs, book_words, total_documents, document_frequencies, end_nodes):
+        """Étape d'indexation livre par livre : les postings sont écrits par lots, dans une seule transaction."""
+        self.stdout.write(f"[{time.ctime()}] Début de l'indexation pour {total_documents} livres...")
+        books_processed = 0
+        total_words_indexed = 0
+        postings = []
+        with transaction.atomic():
+            for book_id, term_counts in all_docs.items():
+                if book_id not in book_words:
+                    continue
+                books_processed += 1
+                self.stdout.write(f"[{time.ctime()}] Indexation du livre {book_id} ({books_processed}/{total_documents})...")
+
+                title_words, author_words = book_words[book_id]
+                doc_index = index_term_counts(
+                    term_counts=term_counts,
+                    total_documents=total_documents,
+                    document_frequencies=document_frequencies,
+                    title_words=title_words,
+                    author_words=author_words
+                )
+
+                for word, data in doc_index.items():
+                    postings.append(Posting(
+                        term_id=end_nodes[word].pk,
+                        gutenberg_id=book_id,
+                        occurrences=data['occurrences'],
+                        tfidf=data['tfidf'],
+                        score=data['score']
+                    ))
+                if len(postings) >= POSTINGS_BATCH_SIZE:
+                    Posting.objects.bulk_create(postings, batch_size=POSTINGS_BATCH_SIZE)
+                    total_words_indexed += len(postings)
+                    postings = []
+            if postings:
+                Posting.objects.bulk_create(postings, batch_size=POSTINGS_BATCH_SIZE)
+                total_words_indexed += len(postings)
+
+        return total_words_indexed
+
+def title_and_author_words(meta):
+    title_words = [w for w in re.split(r'[^A-Za-z]+', meta['title'].lower()) if w]
+    author_words = []
+    for author in meta['authors']:
+        author_words.extend(w for w in re.split(r'[^A-Za-z]+', author['name'].lower()) if w)
+    return title_words, author_words
+
+def create_books(book_meta):
+    """Crée les BookText des livres récupérés par fetch_books."""
+    for book_id, meta in book_meta.items():
+        BookText.objects.create(
+            gutenberg_id=book_id,
+            title=meta['title'],
+            authors=meta['authors'],
+            word_count=meta['word_count'],
+            language=meta['language'],
+            closeness_centrality=0.0,
+            betweenness_centrality=0.0
+        )
+
+def jaccard_method(options):
+    return options['jaccard'] or getattr(settings, 'JACCARD_METHOD', 'lsh')
+
+def centrality_method(options):
+    return options['centrality'] or getattr(settings, 'CENTRALITY_METHOD', 'exact')
+
+def compute_centralities(graph, book_ids, options):
+    """(proximité, intermédiarité) des livres, exactes ou estimées par échantillonnage (--centrality approximate)."""
+    if centrality_method(options) == 'approximate':
+        samples = options['centrality_samples'] or getattr(settings, 'CENTRALITY_SAMPLES', None)
+        epsilon = options['centrality_epsilon'] or getattr(settings, 'CENTRALITY_EPSILON', DEFAULT_EPSILON)
+        return (
+            approximate_closeness_centrality(graph, book_ids, samples=samples, epsilon=epsilon),
+            approximate_betweenness_centrality(graph, book_ids, samples=samples, epsilon=epsilon),
+        )
+    return closeness_centrality(graph, book_ids), betweenness_centrality(graph, book_ids, workers=getattr(settings, 'CENTRALITY_WORKERS', None))
+
+def compute_similarities(book_ids, all_docs, threshold, method, new_ids=None):
+    """Similarités de Jaccard au-dessus du seuil, par comparaison de toutes les paires ou par MinHash/LSH."""
+    if method == 'lsh':
+        num_perm = getattr(settings, 'MINHASH_PERMUTATIONS', None)
+        return compute_jaccard_similarity_lsh(book_ids, all_docs, threshold, num_perm=num_perm, new_ids=new_ids)
+    engine = getattr(settings, 'JACCARD_EXACT_ENGINE', 'bitset')
+    return compute_jaccard_similarity(book_ids, all_docs, threshold, engine=engine, workers=getattr(settings, 'JACCARD_WORKERS', None))
+
+def chunks(items, size):
+    items = list(items)
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+def extend_trie(words, children):
+    """Insère des mots dans le Trie déjà enregistré ; renvoie {mot: identifiant du noeud de fin}.
+
+    children : {(parent_id, char): identifiant} de tous les noeuds existants, complété au fur et à
+    mesure. Les noeuds manquants sont créés profondeur par profondeur (les parents d'un niveau
+    ont leur identifiant avant la création du suivant).
+    """
+    ends = {}
+    frontier = {word: None for word in words if word}  # mot -> identifiant du dernier noeud atteint
+    depth = 0
+    while frontier:
+        to_create = {}
+        for word, parent_id in frontier.items():
+            key = (parent_id, word[depth])
+            if key not in children and key not in to_create:
+                to_create[key] = TrieNode(parent_id=parent_id, char=word[depth], is_end_of_word=False)
+        TrieNode.objects.bulk_create(to_create.values(), batch_size=1000)
+        children.update((key, node.pk) for key, node in to_create.items())
+
+        next_frontier = {}
+        for word, parent_id in frontier.items():
+            node_id = children[(parent_id, word[depth])]
+            if depth + 1 == len(word):
+                ends[word] = node_id
+            else:
+                next_frontier[word] = node_id
+        frontier = next_frontier
+        depth += 1
+
+    for batch in chunks(ends.values(), IN_BATCH_SIZE):
+        TrieNode.objects.filter(id__in=batch).update(is_end_of_word=True)
+    return ends
+
+def save_term_stats(term_ids, term_stats, batch_size=1000):
+    """Écrit DF et IDF des mots donnés ; term_stats : {identifiant: (DF, IDF)}."""
+    nodes = [TrieNode(id=term_id, document_frequency=term_stats[term_id][0], idf=term_stats[term_id][1]) for term_id in sorted(term_ids)]
+    TrieNode.objects.bulk_update(nodes, ['document_frequency', 'idf'], batch_size=batch_size)
+
+def update_trigram_index(added, removed, batch_size=1000):
+    """Ajoute à l'index de trigrammes les mots added et en retire les mots removed ({identifiant: mot})."""
+    additions = build_trigram_index(added.items())
+    removals = build_trigram_index(removed.items())
+    trigrams = sorted(set(additions) | set(removals))
+    existing = {}
+    for batch in chunks(trigrams, IN_BATCH_SIZE):
+        existing.update((row.trigram, row) for row in Trigram.objects.filter(trigram__in=batch))
+
+    to_create, to_update, to_delete = [], [], []
+    for trigram in trigrams:
+        row = existing.get(trigram)
+        term_ids = set(row.get_term_ids()) if row is not None else set()
+        term_ids.update(additions.get(trigram, ()))
+        term_ids.difference_update(removals.get(trigram, ()))
+        if row is None:
+            to_create.append(Trigram(trigram=trigram, term_ids=postings_codec.encode_ids(term_ids)))
+        elif term_ids:
+            row.term_ids = postings_codec.encode_ids(term_ids)
+            to_update.append(row)
+        else:
+            to_delete.append(row.pk)
+    Trigram.objects.bulk_create(to_create, batch_size=batch_size)
+    Trigram.objects.bulk_update(to_update, ['term_ids'], batch_size=batch_size)
+    for batch in chunks(to_delete, IN_BATCH_SIZE):
+        Trigram.objects.filter(pk__in=batch).delete()
+
+def jaccard_graph_size():
+    """Nombre de livres ayant au moins une arête dans TableJaccard, soit les noeuds du graphe de build_graph."""
+    pairs = TableJaccard.objects.values_list('book1__gutenberg_id', 'book2__gutenberg_id')
+    return len({book_id for pair in pairs for book_id in pair})
+
+def connected_component(graph, start):
+    """Livres accessibles depuis start dans le graphe de Jaccard (start compris)."""
+    component = {start}
+    queue = [start]
+    while queue:
+        for neighbor in graph.get(queue.pop(), ()):
+            if neighbor not in component:
+                component.add(neighbor)
+                queue.append(neighbor)
+    return component
+
+def insert_word_into_trie(word, trie_nodes_dict, trie_nodes_to_create):
     parent = None
     parent_id = None
     
@@ -212,16 +737,38 @@ def insert_word_into_trie(word, book_id, data, trie_nodes_dict, trie_nodes_to_cr
         parent = node
         parent_id = id(node)
         
-    if not parent.is_end_of_word:
-        parent.is_end_of_word = True
-        parent.set_word_data({book_id: data})
-    else:
-        existing_data = parent.get_word_data()
-        existing_data[book_id] = data
-        parent.set_word_data(existing_data)
-
-    total_words_indexed += 1
-    return total_words_indexed
+    parent.is_end_of_word = True
+    return parent
+
+def save_matrix_postings(all_docs, book_words, vocabulary, end_nodes, batch_size=POSTINGS_BATCH_SIZE):
+    """Indexe tout le corpus d'un bloc (tfidf_matrix) ; les postings sont écrits colonne par colonne."""
+    from mygutenberg.algorithms.tfidf_matrix import build_tfidf_matrix
+
+    docs = {book_id: term_counts for book_id, term_counts in all_docs.items() if book_id in book_words}
+    matrix = build_tfidf_matrix(docs, vocabulary, book_words)
+    postings = []
+    with transaction.atomic():
+        for word, book_ids, occurrences, tfidf, scores in matrix.iter_columns():
+            term_id = end_nodes[word].pk
+            postings.extend(
+                Posting(term_id=term_id, gutenberg_id=book_id, occurrences=count, tfidf=value, score=score)
+                for book_id, count, value, score in zip(book_ids.tolist(), occurrences.tolist(), tfidf.tolist(), scores.tolist())
+            )
+            if len(postings) >= batch_size:
+                Posting.objects.bulk_create(postings, batch_size=batch_size)
+                postings = []
+        if postings:
+            Posting.objects.bulk_create(postings, batch_size=batch_size)
+    return matrix.nnz
+
+def save_trigram_index(end_nodes, batch_size=1000):
+    """Enregistre, pour chaque trigramme du vocabulaire, les TrieNode de fin des mots qui le contiennent."""
+    index = build_trigram_index((node.pk, word) for word, node in end_nodes.items())
+    Trigram.objects.bulk_create(
+        [Trigram(trigram=trigram, term_ids=postings_codec.encode_ids(term_ids)) for trigram, term_ids in index.items()],
+        batch_size=batch_size,
+    )
+    return len(index)
 
 def save_trie_nodes(trie_nodes_to_create):
     # Sauvegarder les noeuds racines (parent=None)
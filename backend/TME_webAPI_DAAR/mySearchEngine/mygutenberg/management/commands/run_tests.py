@@ -6,11 +6,22 @@ from collections import defaultdict
 import os
 import requests
 import re
-from mygutenberg.models import BookText, TrieNode, TableJaccard
-from mygutenberg.algorithms.tfidf import index_document
-from mygutenberg.algorithms.jaccard import compute_jaccard_similarity
-from mygutenberg.algorithms.centrality import build_graph, closeness_centrality, betweenness_centrality
-from mygutenberg.algorithms.automaton import build_dfa_from_regex
+import json
+import zlib
+from django.db.models import Count
+from mygutenberg.models import BookText, TrieNode, TableJaccard, Posting
+from mygutenberg.algorithms import postings_codec
+from mygutenberg.algorithms.tfidf import index_document, index_document_naive
+from mygutenberg.algorithms.tfidf_matrix import build_tfidf_matrix
+from mygutenberg.algorithms.jaccard import compute_jaccard_similarity, compute_jaccard_similarity_lsh
+from mygutenberg.algorithms.minhash import DEFAULT_PERMUTATIONS, MinHasher, lsh_candidate_pairs, lsh_parameters
+from mygutenberg.algorithms.centrality import build_graph, closeness_centrality, betweenness_centrality, betweenness_centrality_naive
+from mygutenberg.algorithms.centrality import approximate_closeness_centrality, approximate_betweenness_centrality
+from mygutenberg.algorithms.automaton import build_dfa_from_regex, build_matcher, GlushkovMatcher, RegExParser, NFA, DFA
+from mygutenberg.trie_snapshot import TrieSnapshot
+from mygutenberg.views import SearchByRegex
+from mygutenberg.gutenberg_client import GutenbergClient
+from mygutenberg.corpus_store import get_corpus_store
 
 class Command(BaseCommand):
     help = 'Exécute les tests de performance et génère des graphiques'
@@ -30,11 +41,30 @@ class Command(BaseCommand):
         print("Tests de performance terminés, génération des graphiques...")
         plot_performance(sizes, tfidf_sizes, tfidf_times, jaccard_times, closeness_times, betweenness_times)
 
+        print("Comparaison de l'indexation livre par livre et de la matrice TF-IDF...")
+        tfidf_matrix_benchmark(tfidf_docs)
+
+        print("Comparaison de Jaccard exact et MinHash/LSH...")
+        sizes, jaccard_results = jaccard_lsh_benchmark(book_ids, all_docs)
+        plot_jaccard_lsh_performance(sizes, jaccard_results)
+
+        print("Comparaison des centralités exactes et estimées par échantillonnage...")
+        epsilons, centrality_results = centrality_approximation_benchmark(book_ids, all_docs)
+        plot_centrality_approximation(epsilons, centrality_results)
+
         print("Démarrage des tests de performance de recherche...")
         sizes, trie_times, index_times = search_performance_test(book_ids, index_array, trie_root)
         print("Tests terminés, génération des graphiques...")
         plot_search_performance(sizes, trie_times, index_times)
 
+        print("Démarrage du benchmark du format des postings...")
+        sizes, decode_times = postings_codec_benchmark()
+        plot_postings_codec_performance(sizes, decode_times)
+
+        print("Démarrage du benchmark des automates...")
+        patterns, state_counts, build_times, traversal_times = automaton_benchmark()
+        plot_automaton_performance(patterns, state_counts, build_times, traversal_times)
+
         print("Tests terminés !")
 
 class TempTrieNode:
@@ -118,14 +148,12 @@ def get_testbed(max_books):
         print("Whitelist non trouvée.")
 
     all_docs = {}
+    client = GutenbergClient(timeout=10, store=get_corpus_store())
     for book_id in book_ids:
         if book_id not in all_docs:
-            text_url = f'http://gutenberg.org/ebooks/{book_id}.txt.utf-8'
             try:
-                print(f"  Téléchargement du livre {book_id}... {len(all_docs)+1}/{len(book_ids)}")
-                response = requests.get(text_url, timeout=10)
-                response.raise_for_status()
-                content = response.text.lower()
+                print(f"  Lecture du livre {book_id}... {len(all_docs)+1}/{len(book_ids)}")
+                content = client.fetch_text(book_id).lower()
                 words = re.split(r'[^A-Za-z]+', content)
                 filtered_words = [w for w in words if w in whitelist or not whitelist]
                 if 10000 <= len(filtered_words) <= 100000:
@@ -199,6 +227,7 @@ def get_tfidf_testbed():
     books_per_range = 5  # Objectif : 5 livres par intervalle
     range_counts = {range_tuple: 0 for range_tuple in target_ranges}
 
+    client = GutenbergClient(timeout=10, store=get_corpus_store())
     for book in books:
         # Arrêter si chaque plage a ses 5 livres
         if all(count >= books_per_range for count in range_counts.values()):
@@ -206,11 +235,8 @@ def get_tfidf_testbed():
         
         book_id = book.gutenberg_id
         if book_id not in book_ids:
-            text_url = f'http://gutenberg.org/ebooks/{book_id}.txt.utf-8'
             try:
-                response = requests.get(text_url, timeout=10)
-                response.raise_for_status()
-                content = response.text.lower()
+                content = client.fetch_text(book_id).lower()
                 words = re.split(r'[^A-Za-z]+', content)
                 filtered_words = [w for w in words if w in whitelist or not whitelist]
                 word_count = len(filtered_words)
@@ -235,29 +261,39 @@ def performance_test(book_ids, all_docs, tfidf_book_ids, tfidf_docs):
         (10000, 20000), (20000, 30000), (30000, 40000), (40000, 50000),
         (50000, 60000), (60000, 70000), (70000, 80000), (80000, 90000), (90000, 100000)
     ]
-    tfidf_times, jaccard_times, closeness_times, betweenness_times = [], [], [], []
+    tfidf_times = {'naive': [], 'counter': []}  # list.count par terme / comptage en un passage (Counter)
+    jaccard_times = {'sets': [], 'bitset': []}  # ensembles Python paire par paire / popcount sur bitsets
+    closeness_times = []
+    betweenness_times = {'naive': [], 'brandes': []}  # parcours des prédécesseurs par cible / Brandes
 
     # Test TF-IDF basé sur les plages de mots
     print("Test TF-IDF par plages de nombre de mots...")
     for min_words, max_words in tfidf_size_ranges:
         print(f"Traitement TF-IDF pour la plage {min_words}-{max_words} mots...")
-        tfidf_avg = []
+        tfidf_avg = {'naive': [], 'counter': []}
         for book_id in tfidf_book_ids:
             doc_words = tfidf_docs[book_id]
             word_count = len(doc_words)
             if min_words <= word_count <= max_words:
-                start = time.time()
-                total_docs = len(tfidf_docs)
-                doc_freq = defaultdict(int, {word: 1 for word in set(doc_words)})
-                title_words = doc_words[:5]
-                author_words = doc_words[:2]
-                index_document(doc_words, total_docs, doc_freq, title_words, author_words)
-                tfidf_avg.append(time.time() - start)
-        if tfidf_avg:
-            tfidf_times.append(np.mean(tfidf_avg))
-            print(f"  TF-IDF pour {min_words}-{max_words} mots: {tfidf_times[-1]:.4f}s")
+                indexes = {}
+                for method, indexer in (('naive', index_document_naive), ('counter', index_document)):
+                    start = time.time()
+                    total_docs = len(tfidf_docs)
+                    doc_freq = defaultdict(int, {word: 1 for word in set(doc_words)})
+                    title_words = doc_words[:5]
+                    author_words = doc_words[:2]
+                    indexes[method] = indexer(doc_words, total_docs, doc_freq, title_words, author_words)
+                    tfidf_avg[method].append(time.time() - start)
+                if indexes['naive'] != indexes['counter']:
+                    print(f"  Attention : index différents pour le livre {book_id}")
+        if tfidf_avg['naive']:
+            for method in tfidf_times:
+                tfidf_times[method].append(np.mean(tfidf_avg[method]))
+            print(f"  TF-IDF pour {min_words}-{max_words} mots: {tfidf_times['naive'][-1]:.4f}s (list.count), "
+                  f"{tfidf_times['counter'][-1]:.4f}s (Counter)")
         else:
-            tfidf_times.append(0.0)  # Placeholder si aucun livre dans la plage
+            for method in tfidf_times:
+                tfidf_times[method].append(0.0)  # Placeholder si aucun livre dans la plage
             print(f"  Aucun livre trouvé dans la plage {min_words}-{max_words} mots")
 
     # Tests Jaccard et centralités basés sur le nombre de livres
@@ -267,13 +303,20 @@ def performance_test(book_ids, all_docs, tfidf_book_ids, tfidf_docs):
         if len(sample_ids) < size:
             print(f"Pas assez de livres pour la taille {size}, utilisation de {len(sample_ids)} livres.")
         
-        jaccard_avg, closeness_avg, betweenness_avg = [], [], []
+        jaccard_avg = {'sets': [], 'bitset': []}
+        closeness_avg = []
+        betweenness_avg = {'naive': [], 'brandes': []}
 
         # Jaccard
         print(f"  Calcul de Jaccard pour la taille {size}...")
-        start = time.time()
-        compute_jaccard_similarity(sample_ids, {bid: all_docs[bid] for bid in sample_ids}, threshold=0.35)
-        jaccard_avg.append(time.time() - start)
+        sample_docs = {bid: all_docs[bid] for bid in sample_ids}
+        similarities = {}
+        for engine in jaccard_avg:
+            start = time.time()
+            similarities[engine] = compute_jaccard_similarity(sample_ids, sample_docs, threshold=0.35, engine=engine)
+            jaccard_avg[engine].append(time.time() - start)
+        if similarities['sets'] != similarities['bitset']:
+            print(f"  Attention : similarités différentes entre les moteurs pour la taille {size}")
 
         # Centralités
         print(f"  Construction du graphe pour la taille {size}...")
@@ -285,18 +328,21 @@ def performance_test(book_ids, all_docs, tfidf_book_ids, tfidf_docs):
         closeness_centrality(graph, sample_ids)
         closeness_avg.append(time.time() - start)
 
-        start = time.time()
-        betweenness_centrality(graph, sample_ids)
-        betweenness_avg.append(time.time() - start)
+        for method, centrality in (('naive', betweenness_centrality_naive), ('brandes', betweenness_centrality)):
+            start = time.time()
+            centrality(graph, sample_ids)
+            betweenness_avg[method].append(time.time() - start)
 
-        jaccard_times.append(np.mean(jaccard_avg))
+        for engine in jaccard_times:
+            jaccard_times[engine].append(np.mean(jaccard_avg[engine]))
         closeness_times.append(np.mean(closeness_avg))
-        betweenness_times.append(np.mean(betweenness_avg))
+        for method in betweenness_times:
+            betweenness_times[method].append(np.mean(betweenness_avg[method]))
 
         print(f"Résultats pour taille {size}:")
-        print(f"  Jaccard: {jaccard_times[-1]:.4f}s")
+        print(f"  Jaccard: {jaccard_times['sets'][-1]:.4f}s (ensembles), {jaccard_times['bitset'][-1]:.4f}s (bitsets)")
         print(f"  Closeness: {closeness_times[-1]:.4f}s")
-        print(f"  Betweenness: {betweenness_times[-1]:.4f}s")
+        print(f"  Betweenness: {betweenness_times['naive'][-1]:.4f}s (ancienne version), {betweenness_times['brandes'][-1]:.4f}s (Brandes)")
 
     return sizes, tfidf_size_ranges, tfidf_times, jaccard_times, closeness_times, betweenness_times
 
@@ -306,10 +352,12 @@ def plot_performance(sizes, tfidf_size_ranges, tfidf_times, jaccard_times, close
     # TF-IDF par plages de nombre de mots
     tfidf_labels = [f"{min_w}-{max_w}" for min_w, max_w in tfidf_size_ranges]
     plt.figure(figsize=(10, 5))
-    plt.plot(range(len(tfidf_labels)), tfidf_times, label="TF-IDF", marker='o', color='blue')
+    plt.plot(range(len(tfidf_labels)), tfidf_times['naive'], label="TF-IDF (list.count par terme)", marker='o', color='blue')
+    plt.plot(range(len(tfidf_labels)), tfidf_times['counter'], label="TF-IDF (Counter, un passage)", marker='o', color='orange')
     plt.xticks(range(len(tfidf_labels)), tfidf_labels, rotation=45)
     plt.xlabel("Plage de nombre de mots dans le livre")
-    plt.ylabel("Temps d'exécution moyen (secondes)")
+    plt.ylabel("Temps d'exécution moyen (secondes, échelle log)")
+    plt.yscale('log')
     plt.title("Performance de TF-IDF par taille de texte")
     plt.legend()
     plt.grid(True)
@@ -319,7 +367,8 @@ def plot_performance(sizes, tfidf_size_ranges, tfidf_times, jaccard_times, close
 
     # Jaccard par nombre de livres
     plt.figure(figsize=(8, 5))
-    plt.plot(sizes, jaccard_times, label="Jaccard", marker='o', color='green')
+    plt.plot(sizes, jaccard_times['sets'], label="Jaccard (ensembles, paire par paire)", marker='o', color='green')
+    plt.plot(sizes, jaccard_times['bitset'], label="Jaccard (bitsets, popcount par blocs)", marker='o', color='purple')
     plt.xlabel("Taille de l'échantillon (nombre de livres)")
     plt.ylabel("Temps d'exécution (secondes)")
     plt.title("Performance de Jaccard")
@@ -331,7 +380,8 @@ def plot_performance(sizes, tfidf_size_ranges, tfidf_times, jaccard_times, close
     # Centralités par nombre de livres
     plt.figure(figsize=(10, 6))
     plt.plot(sizes, closeness_times, label="Closeness Centrality", marker='o', color='orange')
-    plt.plot(sizes, betweenness_times, label="Betweenness Centrality", marker='o', color='red')
+    plt.plot(sizes, betweenness_times['naive'], label="Betweenness Centrality (ancienne version)", marker='o', color='brown')
+    plt.plot(sizes, betweenness_times['brandes'], label="Betweenness Centrality (Brandes)", marker='o', color='red')
     plt.xlabel("Taille de l'échantillon (nombre de livres)")
     plt.ylabel("Temps d'exécution (secondes)")
     plt.title("Performance des Centralités")
@@ -341,13 +391,13 @@ def plot_performance(sizes, tfidf_size_ranges, tfidf_times, jaccard_times, close
     plt.show()
 
     # Diagramme en barres (sans TF-IDF)
-    times = [jaccard_times, closeness_times, betweenness_times]
-    labels = ["Jaccard", "Closeness", "Betweenness"]
+    times = [jaccard_times['sets'], jaccard_times['bitset'], closeness_times, betweenness_times['naive'], betweenness_times['brandes']]
+    labels = ["Jaccard (ensembles)", "Jaccard (bitsets)", "Closeness", "Betweenness (ancienne)", "Betweenness (Brandes)"]
     means = [np.mean(t) for t in times]
     stds = [np.std(t) for t in times]
     
     plt.figure(figsize=(10, 6))
-    plt.bar(labels, means, yerr=stds, capsize=5, color=['green', 'orange', 'red', 'purple'])
+    plt.bar(labels, means, yerr=stds, capsize=5, color=['green', 'purple', 'orange', 'brown', 'red'])
     plt.yscale('log')
     plt.ylabel("Temps moyen (secondes, échelle log)")
     plt.title("Temps moyen et écart-type des algorithmes (Jaccard et Centralités)")
@@ -508,4 +558,295 @@ def plot_search_performance(sizes, trie_times, index_times):
     plt.legend()
     plt.savefig("graphs/search_comparison.png")
     plt.show()
-    print("Graphiques générés.")
\ No newline at end of file
+    print("Graphiques générés.")
+
+def tfidf_matrix_benchmark(docs):
+    """Compare index_document appelé livre par livre et build_tfidf_matrix sur tout le testbed (temps et écart maximal)."""
+    title_author_words = {book_id: (words[:5], words[:2]) for book_id, words in docs.items()}
+    start = time.time()
+    document_frequencies = defaultdict(int)
+    for words in docs.values():
+        for term in set(words):
+            document_frequencies[term] += 1
+    indexes = {
+        book_id: index_document(words, len(docs), document_frequencies, *title_author_words[book_id])
+        for book_id, words in docs.items()
+    }
+    documents_time = time.time() - start
+
+    vocabulary = set(document_frequencies).union(*(title + author for title, author in title_author_words.values()))
+    start = time.time()
+    matrix = build_tfidf_matrix(docs, vocabulary, title_author_words)
+    matrix_time = time.time() - start
+
+    max_error = 0.0
+    for book_id, index in indexes.items():
+        matrix_index = matrix.document_index(book_id)
+        if matrix_index.keys() != index.keys():
+            print(f"  Attention : termes différents pour le livre {book_id}")
+            continue
+        for term, data in index.items():
+            max_error = max(max_error, abs(data['tfidf'] - matrix_index[term]['tfidf']), abs(data['score'] - matrix_index[term]['score']))
+    print(f"  {len(docs)} livres, {matrix.nnz} postings : livre par livre {documents_time:.4f}s, "
+          f"matrice {matrix_time:.4f}s, écart maximal {max_error:.2e}")
+    return documents_time, matrix_time, max_error
+
+def jaccard_lsh_benchmark(book_ids, all_docs, threshold=0.35, num_perm=DEFAULT_PERMUTATIONS):
+    """Compare Jaccard exact et MinHash/LSH sur des échantillons croissants du testbed : temps, paires candidates et rappel."""
+    book_ids = [book_id for book_id in book_ids if book_id in all_docs]
+    bands, rows = lsh_parameters(threshold, num_perm)
+    print(f"  {num_perm} fonctions de hachage, {bands} bandes de {rows} valeurs")
+    sizes = [size for size in (25, 50, 100, 150, 200) if size <= len(book_ids)] or [len(book_ids)]
+    results = {'exact': [], 'lsh': [], 'recall': [], 'candidates': []}
+    for size in sizes:
+        sample_ids = book_ids[:size]
+        docs = {book_id: all_docs[book_id] for book_id in sample_ids}
+
+        start = time.time()
+        exact = compute_jaccard_similarity(sample_ids, docs, threshold)
+        results['exact'].append(time.time() - start)
+
+        start = time.time()
+        approximate = compute_jaccard_similarity_lsh(sample_ids, docs, threshold, num_perm=num_perm)
+        results['lsh'].append(time.time() - start)
+
+        hasher = MinHasher(num_perm)
+        signatures = np.array([hasher.signature(set(docs[book_id])) for book_id in sample_ids])
+        candidates = len(lsh_candidate_pairs(signatures, bands, rows))
+        pairs = size * (size - 1) // 2
+        found = len(exact.keys() & approximate.keys())
+        results['recall'].append(found / len(exact) if exact else 1.0)
+        results['candidates'].append(candidates / pairs if pairs else 0.0)
+        if approximate.keys() - exact.keys():
+            print(f"  Attention : {len(approximate.keys() - exact.keys())} arêtes absentes du calcul exact")
+        print(f"  {size} livres : exact {results['exact'][-1]:.4f}s, LSH {results['lsh'][-1]:.4f}s, "
+              f"{candidates}/{pairs} paires candidates, {found}/{len(exact)} arêtes retrouvées "
+              f"(rappel {results['recall'][-1]:.3f})")
+    return sizes, results
+
+def plot_jaccard_lsh_performance(sizes, results):
+    print("Génération des graphiques...")
+    fig, (ax_time, ax_recall) = plt.subplots(1, 2, figsize=(12, 5))
+    ax_time.plot(sizes, results['exact'], label="Exact (toutes les paires)", marker='o', color='green')
+    ax_time.plot(sizes, results['lsh'], label="MinHash/LSH", marker='o', color='blue')
+    ax_time.set_xlabel("Nombre de livres")
+    ax_time.set_ylabel("Temps (secondes)")
+    ax_time.set_title("Temps de calcul de Jaccard")
+    ax_time.legend()
+    ax_recall.plot(sizes, results['recall'], label="Rappel des arêtes", marker='o', color='blue')
+    ax_recall.plot(sizes, results['candidates'], label="Part de paires candidates", marker='o', color='gray')
+    ax_recall.set_xlabel("Nombre de livres")
+    ax_recall.set_ylim(0, 1.05)
+    ax_recall.set_title("MinHash/LSH par rapport au calcul exact")
+    ax_recall.legend()
+    plt.tight_layout()
+    plt.savefig("graphs/jaccard_lsh_performance.png")
+    plt.show()
+    print("Graphiques générés.")
+
+def centrality_approximation_benchmark(book_ids, all_docs, threshold=0.35, epsilons=(0.2, 0.1, 0.05, 0.02), seed=1):
+    """Écart des centralités estimées (pivots / chemins tirés) aux valeurs exactes, sur le graphe de Jaccard du testbed."""
+    book_ids = [book_id for book_id in book_ids if book_id in all_docs]
+    similarities = compute_jaccard_similarity(book_ids, all_docs, threshold, engine='bitset')
+    graph = defaultdict(set)
+    for id1, id2 in similarities:
+        graph[id1].add(id2)
+        graph[id2].add(id1)
+    for book_id in book_ids:
+        graph[book_id]  # livres isolés : même nombre de noeuds que dans populate_and_index_books
+
+    start = time.time()
+    exact = {'closeness': closeness_centrality(graph, book_ids), 'betweenness': betweenness_centrality(graph, book_ids)}
+    exact_time = time.time() - start
+    print(f"  {len(book_ids)} livres, {len(similarities)} arêtes : centralités exactes en {exact_time:.4f}s")
+
+    results = {'exact_time': exact_time, 'time': [], 'closeness': [], 'betweenness': []}
+    for epsilon in epsilons:
+        start = time.time()
+        approximate = {
+            'closeness': approximate_closeness_centrality(graph, book_ids, epsilon=epsilon, seed=seed),
+            'betweenness': approximate_betweenness_centrality(graph, book_ids, epsilon=epsilon, seed=seed),
+        }
+        results['time'].append(time.time() - start)
+        for measure in ('closeness', 'betweenness'):
+            errors = [abs(approximate[measure][book_id] - exact[measure][book_id]) for book_id in book_ids]
+            results[measure].append((max(errors), float(np.mean(errors))))
+        print(f"  epsilon {epsilon} : {results['time'][-1]:.4f}s, écart maximal proximité {results['closeness'][-1][0]:.4f} "
+              f"(moyen {results['closeness'][-1][1]:.4f}), intermédiarité {results['betweenness'][-1][0]:.4f} "
+              f"(moyen {results['betweenness'][-1][1]:.4f})")
+    return list(epsilons), results
+
+def plot_centrality_approximation(epsilons, results):
+    print("Génération des graphiques...")
+    fig, (ax_error, ax_time) = plt.subplots(1, 2, figsize=(12, 5))
+    ax_error.plot(epsilons, [error[0] for error in results['closeness']], label="Proximité (écart maximal)", marker='o', color='orange')
+    ax_error.plot(epsilons, [error[0] for error in results['betweenness']], label="Intermédiarité (écart maximal)", marker='o', color='red')
+    ax_error.plot(epsilons, [error[1] for error in results['betweenness']], label="Intermédiarité (écart moyen)", marker='o', linestyle='--', color='red')
+    ax_error.set_xlabel("Erreur visée (epsilon)")
+    ax_error.set_ylabel("Écart aux valeurs exactes")
+    ax_error.set_title("Précision des centralités estimées")
+    ax_error.legend()
+    ax_time.plot(epsilons, results['time'], label="Estimation (échantillonnage)", marker='o', color='blue')
+    ax_time.axhline(results['exact_time'], label="Calcul exact", color='green')
+    ax_time.set_xlabel("Erreur visée (epsilon)")
+    ax_time.set_ylabel("Temps (secondes)")
+    ax_time.set_title("Temps de calcul des centralités")
+    ax_time.legend()
+    plt.tight_layout()
+    plt.savefig("graphs/centrality_approximation.png")
+    plt.show()
+    print("Graphiques générés.")
+
+def postings_codec_benchmark(max_terms=2000, repeat=3):
+    """Compare taille et vitesse de décodage des blobs zlib+JSON et du format binaire sur les mots les plus fréquents."""
+    print(f"Chargement des postings des {max_terms} mots les plus fréquents...")
+    term_ids = list(
+        Posting.objects.values('term_id').annotate(n=Count('id')).order_by('-n').values_list('term_id', flat=True)[:max_terms]
+    )
+    word_data = defaultdict(dict)
+    for i in range(0, len(term_ids), 500):
+        rows = Posting.objects.filter(term_id__in=term_ids[i:i + 500]).values_list(
+            'term_id', 'gutenberg_id', 'occurrences', 'tfidf', 'score'
+        )
+        for term_id, book_id, occurrences, tfidf, score in rows:
+            word_data[term_id][book_id] = {'occurrences': occurrences, 'tfidf': tfidf, 'score': score}
+
+    legacy_blobs = [zlib.compress(json.dumps(data).encode('utf-8'), level=9) for data in word_data.values()]
+    binary_blobs = [postings_codec.encode_word_data(data) for data in word_data.values()]
+    sizes = {'zlib+JSON': sum(map(len, legacy_blobs)), 'binaire': sum(map(len, binary_blobs))}
+    total_postings = sum(len(data) for data in word_data.values())
+    print(f"  {len(word_data)} mots, {total_postings} postings")
+    for name, size in sizes.items():
+        print(f"  Taille {name}: {size} octets ({size / max(total_postings, 1):.2f} octets/posting)")
+
+    def decode_legacy():
+        for blob in legacy_blobs:
+            json.loads(zlib.decompress(blob).decode('utf-8'))
+
+    def decode_stream():
+        for blob in binary_blobs:
+            for _ in postings_codec.iter_postings(blob):
+                pass
+
+    def decode_columns():
+        for blob in binary_blobs:
+            postings_codec.decode_columns(blob)
+
+    decode_times = {}
+    for name, decode in [('zlib+JSON', decode_legacy), ('binaire (flux)', decode_stream), ('binaire (colonnes)', decode_columns)]:
+        times = []
+        for _ in range(repeat):
+            start = time.time()
+            decode()
+            times.append(time.time() - start)
+        decode_times[name] = min(times)
+        print(f"  Décodage {name}: {decode_times[name]:.4f}s")
+
+    return sizes, decode_times
+
+def plot_postings_codec_performance(sizes, decode_times):
+    print("Génération des graphiques...")
+    fig, (ax_size, ax_time) = plt.subplots(1, 2, figsize=(12, 5))
+    ax_size.bar(list(sizes), [size / 1024 for size in sizes.values()], color=['gray', 'blue'])
+    ax_size.set_ylabel("Taille totale (Kio)")
+    ax_size.set_title("Taille des postings")
+    ax_time.bar(list(decode_times), list(decode_times.values()), color=['gray', 'blue', 'green'])
+    ax_time.set_ylabel("Temps de décodage (secondes)")
+    ax_time.set_title("Décodage des postings")
+    plt.tight_layout()
+    plt.savefig("graphs/postings_codec_performance.png")
+    plt.show()
+    print("Graphiques générés.")
+
+def traverse_with_dict_dfa(trie, dfa):
+    """Parcours du Trie avec le DFA non minimisé à transitions en dictionnaires (référence du benchmark)."""
+    chars = trie.chars
+    subtree_end = trie.subtree_end
+    matched_terms = []
+    stack = [(0, dfa.start_state)]
+    while stack:
+        node, state = stack.pop()
+        child = node + 1
+        end = subtree_end[node]
+        while child < end:
+            next_state = dfa.transition(state, chars[child])
+            if next_state != -1:
+                if dfa.is_accepting(next_state) and trie.term_at(child) >= 0:
+                    matched_terms.append(trie.term_at(child))
+                stack.append((child, next_state))
+            child = subtree_end[child]
+    matched_terms.sort()
+    return matched_terms
+
+def automaton_benchmark(repeat=5):
+    """Compare le DFA de la construction par sous-ensembles, le DFA minimal à table dense et le moteur
+    bit-parallèle de Glushkov (états : positions + 1) sur le Trie complet."""
+    patterns = ["alice", ".*alice", "(ali*)", "..alice", "w.*ter", ".*l.*v", "a.*", ".*ing"]
+    print("Chargement du Trie en mémoire...")
+    trie = TrieSnapshot.from_database(None)
+    print(f"  {trie.node_count} noeuds, {trie.term_count} termes")
+
+    state_counts = {'sous-ensembles': [], 'minimal': [], 'glushkov': []}
+    build_times = {'sous-ensembles': [], 'minimal': [], 'glushkov': []}
+    traversal_times = {'sous-ensembles': [], 'minimal': [], 'glushkov': []}
+    for pattern in patterns:
+        start = time.time()
+        for _ in range(repeat):
+            dfa = DFA().from_nfa(NFA().from_regex_tree(RegExParser(pattern).parse()))
+        build_times['sous-ensembles'].append((time.time() - start) / repeat)
+        start = time.time()
+        for _ in range(repeat):
+            dense = build_dfa_from_regex(pattern)
+        build_times['minimal'].append((time.time() - start) / repeat)
+        start = time.time()
+        for _ in range(repeat):
+            glushkov = build_matcher(pattern, engine='glushkov')
+        build_times['glushkov'].append((time.time() - start) / repeat)
+        state_counts['sous-ensembles'].append(dfa.state_counter)
+        state_counts['minimal'].append(dense.state_count)
+        state_counts['glushkov'].append(GlushkovMatcher.count_positions(RegExParser(pattern).parse()) + 1)
+
+        start = time.time()
+        for _ in range(repeat):
+            expected = traverse_with_dict_dfa(trie, dfa)
+        traversal_times['sous-ensembles'].append((time.time() - start) / repeat)
+        start = time.time()
+        for _ in range(repeat):
+            matched = SearchByRegex._traverse_with_dfa(trie, dense)
+        traversal_times['minimal'].append((time.time() - start) / repeat)
+        start = time.time()
+        for _ in range(repeat):
+            matched_glushkov = SearchByRegex._traverse_with_dfa(trie, glushkov)
+        traversal_times['glushkov'].append((time.time() - start) / repeat)
+        if matched != expected or matched_glushkov != expected:
+            print(f"  Attention : résultats différents pour {pattern}")
+
+        print(f"  {pattern}: {dfa.state_counter} -> {dense.state_count} états, "
+              f"parcours {traversal_times['sous-ensembles'][-1]:.4f}s -> {traversal_times['minimal'][-1]:.4f}s "
+              f"(Glushkov {traversal_times['glushkov'][-1]:.4f}s) "
+              f"({len(matched)} termes)")
+
+    return patterns, state_counts, build_times, traversal_times
+
+def plot_automaton_performance(patterns, state_counts, build_times, traversal_times):
+    print("Génération des graphiques...")
+    x = np.arange(len(patterns))
+    width = 0.25
+    fig, axes = plt.subplots(1, 3, figsize=(18, 5))
+    for ax, values, title, ylabel in [
+        (axes[0], state_counts, "Nombre d'états", "États"),
+        (axes[1], build_times, "Construction de l'automate", "Temps (secondes)"),
+        (axes[2], traversal_times, "Parcours du Trie", "Temps (secondes)"),
+    ]:
+        ax.bar(x - width, values['sous-ensembles'], width, label='Sous-ensembles (dict)', color='gray')
+        ax.bar(x, values['minimal'], width, label='Minimal (table dense)', color='blue')
+        ax.bar(x + width, values['glushkov'], width, label='Glushkov (bit-parallèle)', color='green')
+        ax.set_xticks(x)
+        ax.set_xticklabels(patterns, rotation=45)
+        ax.set_title(title)
+        ax.set_ylabel(ylabel)
+        ax.legend()
+    plt.tight_layout()
+    plt.savefig("graphs/automaton_performance.png")
+    plt.show()
+    print("Graphiques générés.")
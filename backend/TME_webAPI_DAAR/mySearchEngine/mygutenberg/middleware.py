@@ -0,0 +1,34 @@
+from django.conf import settings
+from django.db import connection
+
+import logging
+logger = logging.getLogger(__name__)
+
+class QueryCountMiddleware:
+    """Compte les requêtes SQL exécutées pour chaque requête HTTP.
+
+    Le total est renvoyé dans l'en-tête X-DB-Queries, ce qui permet de vérifier le nombre
+    de requêtes par recherche sans modifier le corps des réponses. Il est journalisé au niveau
+    DEBUG, ou WARNING au-delà de DB_QUERY_LOG_THRESHOLD requêtes.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        query_count = 0
+
+        def count_queries(execute, sql, params, many, context):
+            nonlocal query_count
+            query_count += 1
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(count_queries):
+            response = self.get_response(request)
+
+        response['X-DB-Queries'] = str(query_count)
+        if query_count > getattr(settings, 'DB_QUERY_LOG_THRESHOLD', 20):
+            logger.warning(f"{request.path} : {query_count} requête(s) SQL")
+        else:
+            logger.debug(f"{request.path} : {query_count} requête(s) SQL")
+        return response
@@ -0,0 +1,55 @@
+# Generated by Django 5.1.7 on 2026-10-18 08:49
+
+import django.db.models.deletion
+import json
+import zlib
+from django.db import migrations, models
+
+
+def explode_word_data(apps, schema_editor):
+    """Crée une ligne Posting par livre présent dans le blob word_data de chaque fin de mot."""
+    TrieNode = apps.get_model('mygutenberg', 'TrieNode')
+    Posting = apps.get_model('mygutenberg', 'Posting')
+    postings = []
+    nodes = TrieNode.objects.filter(is_end_of_word=True).exclude(word_data=None).values_list('id', 'word_data')
+    for node_id, word_data in nodes.iterator(chunk_size=2000):
+        data = json.loads(zlib.decompress(word_data).decode('utf-8'))
+        for book_id in sorted(data, key=int):
+            postings.append(Posting(
+                term_id=node_id,
+                gutenberg_id=int(book_id),
+                occurrences=data[book_id].get('occurrences', 0),
+                tfidf=data[book_id].get('tfidf', 0.0),
+                score=data[book_id].get('score', 0.0),
+            ))
+        if len(postings) >= 10000:
+            Posting.objects.bulk_create(postings, batch_size=1000)
+            postings = []
+    if postings:
+        Posting.objects.bulk_create(postings, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mygutenberg', '0006_indexgeneration'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Posting',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('gutenberg_id', models.IntegerField()),
+                ('occurrences', models.IntegerField(default=0)),
+                ('tfidf', models.FloatField(default=0.0)),
+                ('score', models.FloatField(default=0.0)),
+                ('term', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='postings', to='mygutenberg.trienode')),
+            ],
+            options={
+                'ordering': ('term', 'gutenberg_id'),
+                'unique_together': {('term', 'gutenberg_id')},
+            },
+        ),
+        migrations.RunPython(explode_word_data, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,125 @@
+from django.db import migrations
+import json
+import sys
+import zlib
+from array import array
+from itertools import accumulate
+
+# Copie figée du format 1 de algorithms/postings_codec.py : cette migration écrit et relit
+# toujours ce format, quelles que soient les évolutions ultérieures du codec.
+_FORMAT_VERSION = 1
+
+def _write_varint(out, value):
+    while value >= 0x80:
+        out.append((value & 0x7f) | 0x80)
+        value >>= 7
+    out.append(value)
+
+def _read_varints(data, pos, count):
+    values = []
+    for _ in range(count):
+        value = shift = 0
+        while True:
+            byte = data[pos]
+            pos += 1
+            value |= (byte & 0x7f) << shift
+            if byte < 0x80:
+                break
+            shift += 7
+        values.append(value)
+    return values, pos
+
+def _float_bytes(values):
+    values = array('f', values)
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values.tobytes()
+
+def _read_floats(data, pos, count):
+    values = array('f')
+    values.frombytes(data[pos:pos + 4 * count])
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values, pos + 4 * count
+
+def _encode_word_data(data):
+    postings = sorted(
+        (int(book_id), entry.get('occurrences', 0), entry.get('tfidf', 0.0), entry.get('score', 0.0))
+        for book_id, entry in data.items()
+    )
+    out = bytearray([_FORMAT_VERSION])
+    _write_varint(out, len(postings))
+    previous = 0
+    for book_id, _, _, _ in postings:
+        _write_varint(out, book_id - previous)
+        previous = book_id
+    for _, occurrences, _, _ in postings:
+        _write_varint(out, occurrences)
+    tfidf = array('f', (posting[2] for posting in postings))
+    scores = array('f', (posting[3] for posting in postings))
+    pairs = {}
+    indices = [pairs.setdefault(pair, len(pairs)) for pair in zip(tfidf, scores)]
+    if 5 * len(pairs) < 4 * len(postings):
+        _write_varint(out, len(pairs))
+        out += _float_bytes(pair[0] for pair in pairs)
+        out += _float_bytes(pair[1] for pair in pairs)
+        for index in indices:
+            _write_varint(out, index)
+    else:
+        _write_varint(out, 0)
+        out += _float_bytes(tfidf)
+        out += _float_bytes(scores)
+    return bytes(out)
+
+def _decode_word_data(data):
+    (count,), pos = _read_varints(data, 1, 1)
+    deltas, pos = _read_varints(data, pos, count)
+    occurrences, pos = _read_varints(data, pos, count)
+    (pair_count,), pos = _read_varints(data, pos, 1)
+    if pair_count:
+        pair_tfidf, pos = _read_floats(data, pos, pair_count)
+        pair_scores, pos = _read_floats(data, pos, pair_count)
+        indices, pos = _read_varints(data, pos, count)
+        tfidf = [pair_tfidf[index] for index in indices]
+        scores = [pair_scores[index] for index in indices]
+    else:
+        tfidf, pos = _read_floats(data, pos, count)
+        scores, pos = _read_floats(data, pos, count)
+    return {
+        book_id: {'occurrences': occ, 'tfidf': value, 'score': score}
+        for book_id, occ, value, score in zip(accumulate(deltas), occurrences, tfidf, scores)
+    }
+
+def _convert_word_data(apps, convert):
+    TrieNode = apps.get_model('mygutenberg', 'TrieNode')
+    batch = []
+    nodes = TrieNode.objects.filter(is_end_of_word=True).exclude(word_data=None).only('id', 'word_data')
+    for node in nodes.iterator(chunk_size=2000):
+        node.word_data = convert(bytes(node.word_data))
+        batch.append(node)
+        if len(batch) >= 1000:
+            TrieNode.objects.bulk_update(batch, ['word_data'])
+            batch = []
+    if batch:
+        TrieNode.objects.bulk_update(batch, ['word_data'])
+
+def zlib_json_to_binary(apps, schema_editor):
+    # Les blobs zlib commencent par l'octet 0x78 : ceux déjà convertis sont laissés tels quels
+    def convert(word_data):
+        if word_data[0] == _FORMAT_VERSION:
+            return word_data
+        data = json.loads(zlib.decompress(word_data).decode('utf-8'))
+        return _encode_word_data(data)
+    _convert_word_data(apps, convert)
+
+def binary_to_zlib_json(apps, schema_editor):
+    def convert(word_data):
+        if word_data[0] != _FORMAT_VERSION:
+            return word_data
+        data = _decode_word_data(word_data)
+        return zlib.compress(json.dumps(data).encode('utf-8'), level=9)
+    _convert_word_data(apps, convert)
+
+class Migration(migrations.Migration):
+    dependencies = [('mygutenberg', '0007_posting')]
+    operations = [migrations.RunPython(zlib_json_to_binary, binary_to_zlib_json)]
@@ -0,0 +1,35 @@
+from django.db import migrations, models
+
+from mygutenberg.algorithms import postings_codec
+from mygutenberg.algorithms.trigram import build_trigram_index, trie_words
+
+
+def build_trigrams(apps, schema_editor):
+    """Construit l'index de trigrammes du vocabulaire déjà présent dans TrieNode."""
+    TrieNode = apps.get_model('mygutenberg', 'TrieNode')
+    Trigram = apps.get_model('mygutenberg', 'Trigram')
+    rows = TrieNode.objects.values_list('id', 'parent_id', 'char', 'is_end_of_word').iterator(chunk_size=10000)
+    index = build_trigram_index(trie_words(rows))
+    Trigram.objects.bulk_create(
+        [Trigram(trigram=trigram, term_ids=postings_codec.encode_ids(term_ids)) for trigram, term_ids in index.items()],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mygutenberg', '0008_binary_word_data'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Trigram',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('trigram', models.CharField(max_length=3, unique=True)),
+                ('term_ids', models.BinaryField()),
+            ],
+        ),
+        migrations.RunPython(build_trigrams, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,47 @@
+import math
+
+from django.db import migrations, models
+
+
+def fill_document_frequencies(apps, schema_editor):
+    """DF de chaque mot d'après ses postings, et IDF correspondant à l'index déjà construit."""
+    TrieNode = apps.get_model('mygutenberg', 'TrieNode')
+    Posting = apps.get_model('mygutenberg', 'Posting')
+    BookText = apps.get_model('mygutenberg', 'BookText')
+    total_documents = BookText.objects.count()
+    if not total_documents:
+        return
+    frequencies = dict(
+        Posting.objects.filter(occurrences__gt=0).values('term_id').annotate(df=models.Count('id')).values_list('term_id', 'df')
+    )
+    batch = []
+    for node in TrieNode.objects.filter(is_end_of_word=True).only('id').iterator(chunk_size=10000):
+        node.document_frequency = frequencies.get(node.id, 0)
+        node.idf = math.log(total_documents / (node.document_frequency + 1))
+        batch.append(node)
+        if len(batch) >= 1000:
+            TrieNode.objects.bulk_update(batch, ['document_frequency', 'idf'])
+            batch = []
+    if batch:
+        TrieNode.objects.bulk_update(batch, ['document_frequency', 'idf'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mygutenberg', '0009_trigram'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='trienode',
+            name='document_frequency',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='trienode',
+            name='idf',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.RunPython(fill_document_frequencies, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,48 @@
+import importlib
+
+from django.db import migrations
+
+# Format binaire figé de la migration 0008 (le nom du module commence par un chiffre)
+binary_word_data = importlib.import_module('mygutenberg.migrations.0008_binary_word_data')
+
+
+def rebuild_word_data(apps, schema_editor):
+    """Retour arrière : reconstruit le blob word_data de chaque fin de mot à partir de Posting."""
+    TrieNode = apps.get_model('mygutenberg', 'TrieNode')
+    Posting = apps.get_model('mygutenberg', 'Posting')
+
+    def flush(term_id, data, batch):
+        batch.append(TrieNode(id=term_id, word_data=binary_word_data._encode_word_data(data)))
+        if len(batch) >= 1000:
+            TrieNode.objects.bulk_update(batch, ['word_data'])
+            batch.clear()
+
+    batch = []
+    current, data = None, {}
+    rows = Posting.objects.order_by('term_id', 'gutenberg_id').values_list('term_id', 'gutenberg_id', 'occurrences', 'tfidf', 'score')
+    for term_id, book_id, occurrences, tfidf, score in rows.iterator(chunk_size=10000):
+        if term_id != current:
+            if data:
+                flush(current, data, batch)
+            current, data = term_id, {}
+        data[book_id] = {'occurrences': occurrences, 'tfidf': tfidf, 'score': score}
+    if data:
+        flush(current, data, batch)
+    if batch:
+        TrieNode.objects.bulk_update(batch, ['word_data'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mygutenberg', '0010_trienode_document_frequency_idf'),
+    ]
+
+    # Posting devient l'unique stockage des postings : la copie word_data est supprimée
+    operations = [
+        migrations.RunPython(migrations.RunPython.noop, rebuild_word_data),
+        migrations.RemoveField(
+            model_name='trienode',
+            name='word_data',
+        ),
+    ]
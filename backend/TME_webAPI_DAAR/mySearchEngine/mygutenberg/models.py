@@ -1,6 +1,6 @@
-from django.db import models
-import json
-import zlib
+from django.db import connection, models
+from collections import defaultdict
+from mygutenberg.algorithms import postings_codec
 
 class BookText(models.Model):
     gutenberg_id = models.IntegerField(unique=True)
@@ -28,7 +28,11 @@ class TrieNode(models.Model):
     )
     char = models.CharField(max_length=1)
     is_end_of_word = models.BooleanField(default=False)
-    word_data = models.BinaryField(null=True, blank=True)
+    # Fins de mot : nombre de livres dont le texte contient le mot, et IDF utilisé pour
+    # calculer les tfidf de ses postings (l'indexation incrémentale ne recalcule un mot
+    # que si son IDF a dérivé au-delà de la tolérance)
+    document_frequency = models.IntegerField(default=0)
+    idf = models.FloatField(null=True, blank=True)
 
     class Meta:
         indexes = [
@@ -36,52 +40,153 @@ class TrieNode(models.Model):
         ]
         unique_together = ('parent', 'char')
 
-    def set_word_data(self, data):
-        if data:
-            json_str = json.dumps(data)
-            compressed = zlib.compress(json_str.encode('utf-8'), level=9)
-            self.word_data = compressed
-        else:
-            self.word_data = None
-
-    def get_word_data(self):
-        if self.word_data:
-            decompressed = zlib.decompress(self.word_data).decode('utf-8')
-            return json.loads(decompressed)
-        return {}
-
     @classmethod
     def search_by_prefix(cls, prefix):
+        """Mots commençant par le préfixe et leurs postings, en une seule requête récursive.
+
+        La descente le long du préfixe puis la collecte du sous-arbre sont faites
+        par SQLite ; les mots sont renvoyés dans l'ordre du Trie (ordre lexicographique).
+        """
         if not prefix:
             return []
-        
-        current_node = None
-        for char in prefix.lower():
-            if current_node is None:
-                current_node = cls.objects.filter(parent__isnull=True, char=char).first()
-            else:
-                current_node = cls.objects.filter(parent=current_node, char=char).first()
-            if not current_node:
-                return []
-        
+        prefix = prefix.lower()
+
+        sql = cls._prefix_subtree_sql() + f"""
+            SELECT subtree.word, posting.gutenberg_id, posting.occurrences, posting.tfidf, posting.score
+            FROM subtree JOIN {Posting._meta.db_table} posting ON posting.term_id = subtree.id
+            ORDER BY subtree.word, posting.gutenberg_id
+        """
         results = []
-        cls._collect_words(current_node, results)
+        with connection.cursor() as cursor:
+            cursor.execute(sql, cls._prefix_subtree_params(prefix))
+            for word, book_id, occurrences, tfidf, score in cursor.fetchall():
+                if not results or results[-1]['word'] != word:
+                    results.append({'word': word, 'data': {}})
+                results[-1]['data'][book_id] = {'occurrences': occurrences, 'tfidf': tfidf, 'score': score}
         return results
 
     @classmethod
-    def _collect_words(cls, node, results, prefix=''):
-        if not node:
-            return
-        
-        current_prefix = prefix + node.char
-        if node.is_end_of_word:
-            results.append({
-                'word': current_prefix,
-                'data': node.get_word_data()
-            })
-        
-        for child in node.children.all():
-            cls._collect_words(child, results, current_prefix)
+    def aggregate_prefix(cls, prefix):
+        """Score et occurrences cumulés par livre sur tous les mots du préfixe.
+
+        Une seule requête : seules les colonnes gutenberg_id, score et occurrences
+        des postings du sous-arbre sont lues. Renvoie des tuples (gutenberg_id, score, occurrences).
+        """
+        if not prefix:
+            return []
+        prefix = prefix.lower()
+
+        sql = cls._prefix_subtree_sql() + f"""
+            SELECT posting.gutenberg_id, SUM(posting.score), SUM(posting.occurrences)
+            FROM subtree JOIN {Posting._meta.db_table} posting ON posting.term_id = subtree.id
+            GROUP BY posting.gutenberg_id
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(sql, cls._prefix_subtree_params(prefix))
+            return cursor.fetchall()
+
+    @classmethod
+    def _prefix_subtree_sql(cls):
+        """Clause WITH RECURSIVE : descente le long du préfixe puis sous-arbre complet (id, word)."""
+        table, char = cls._sql_names()
+        return f"""
+            WITH RECURSIVE
+            prefix_path(id, depth) AS (
+                SELECT id, 1 FROM {table} WHERE parent_id IS NULL AND {char} = %s
+                UNION ALL
+                SELECT node.id, path.depth + 1 FROM {table} node
+                JOIN prefix_path path ON node.parent_id = path.id
+                WHERE path.depth < %s AND node.{char} = SUBSTR(%s, path.depth + 1, 1)
+            ),
+            subtree(id, word) AS (
+                SELECT id, %s FROM prefix_path WHERE depth = %s
+                UNION ALL
+                SELECT node.id, subtree.word || node.{char} FROM {table} node
+                JOIN subtree ON node.parent_id = subtree.id
+            )
+        """
+
+    @staticmethod
+    def _prefix_subtree_params(prefix):
+        return [prefix[0], len(prefix), prefix, prefix, len(prefix)]
+
+    @classmethod
+    def subtree_rows(cls, root_chars):
+        """Structure complète des sous-arbres dont la racine porte l'un des caractères donnés.
+
+        Une seule requête récursive ; renvoie des tuples (id, parent_id, char, is_end_of_word)
+        sans postings, à compléter avec postings_by_term pour les seuls noeuds retenus.
+        """
+        root_chars = sorted(set(root_chars))
+        if not root_chars:
+            return []
+
+        table, char = cls._sql_names()
+        placeholders = ', '.join(['%s'] * len(root_chars))
+        sql = f"""
+            WITH RECURSIVE subtree(id, parent_id, {char}, is_end_of_word) AS (
+                SELECT id, parent_id, {char}, is_end_of_word FROM {table}
+                WHERE parent_id IS NULL AND {char} IN ({placeholders})
+                UNION ALL
+                SELECT node.id, node.parent_id, node.{char}, node.is_end_of_word FROM {table} node
+                JOIN subtree ON node.parent_id = subtree.id
+            )
+            SELECT id, parent_id, {char}, is_end_of_word FROM subtree
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(sql, root_chars)
+            return [(node_id, parent_id, c, bool(is_end)) for node_id, parent_id, c, is_end in cursor.fetchall()]
+
+    @classmethod
+    def postings_by_term(cls, node_ids):
+        """Postings (gutenberg_id, occurrences, score) des noeuds demandés, groupés par noeud.
+
+        Lecture par lots limités au nombre de paramètres SQL autorisés.
+        """
+        node_ids = list(node_ids)
+        batch_size = connection.features.max_query_params or 5000
+        postings = defaultdict(list)
+        for i in range(0, len(node_ids), batch_size):
+            batch = node_ids[i:i + batch_size]
+            for term_id, book_id, occurrences, score in Posting.objects.filter(term_id__in=batch).values_list(
+                'term_id', 'gutenberg_id', 'occurrences', 'score'
+            ):
+                postings[term_id].append((book_id, occurrences, score))
+        return postings
+
+    @classmethod
+    def _sql_names(cls):
+        quote = connection.ops.quote_name
+        return quote(cls._meta.db_table), quote(cls._meta.get_field('char').column)
+
+class Posting(models.Model):
+    """Une entrée par couple (terme, livre) : le terme est le TrieNode de fin de mot.
+
+    Seul stockage des postings, lu par les requêtes de TrieNode comme par TrieSnapshot.
+    """
+    term = models.ForeignKey(TrieNode, on_delete=models.CASCADE, related_name='postings')
+    gutenberg_id = models.IntegerField()
+    occurrences = models.IntegerField(default=0)
+    tfidf = models.FloatField(default=0.0)
+    score = models.FloatField(default=0.0)
+
+    class Meta:
+        ordering = ('term', 'gutenberg_id')
+        unique_together = ('term', 'gutenberg_id')
+
+    def __str__(self):
+        return f"{self.term_id} - {self.gutenberg_id}: {self.score}"
+
+class Trigram(models.Model):
+    """Trigramme du vocabulaire et TrieNode de fin des mots qui le contiennent (postings_codec.encode_ids)."""
+    trigram = models.CharField(max_length=3, unique=True)
+    term_ids = models.BinaryField()
+
+    def __str__(self):
+        return self.trigram
+
+    def get_term_ids(self):
+        return postings_codec.decode_ids(self.term_ids)
 
 class TableJaccard(models.Model):
     book1 = models.ForeignKey(BookText, on_delete=models.CASCADE, related_name='similarities_as_book1')
@@ -96,3 +201,21 @@ class TableJaccard(models.Model):
 
     def __str__(self):
         return f"{self.book1.gutenberg_id} - {self.book2.gutenberg_id}: {self.jaccard_similarity}"
+
+class IndexGeneration(models.Model):
+    """Numéro de version de l'index publié par populate_and_index_books."""
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ('-id',)
+
+    def __str__(self):
+        return f"Génération {self.id} ({self.created_at})"
+
+    @classmethod
+    def current(cls):
+        return cls.objects.order_by('-id').values_list('id', flat=True).first() or 0
+
+    @classmethod
+    def publish(cls):
+        return cls.objects.create().id
@@ -0,0 +1,101 @@
+"""Pagination des recherches : limit/offset ou curseur opaque.
+
+Sans paramètre de pagination, les vues renvoient tous les résultats comme avant.
+Avec ?limit=, ?offset= ou ?cursor=, seule la page demandée est sélectionnée (tas
+borné de taille offset + limit), hydratée et renvoyée avec le nombre total de
+livres trouvés et le curseur de la page suivante.
+"""
+import base64
+import heapq
+import json
+import zlib
+from typing import NamedTuple, Optional
+
+from django.conf import settings
+
+DEFAULT_LIMIT = 20
+
+
+class PaginationError(ValueError):
+    pass
+
+
+class PageRequest(NamedTuple):
+    limit: int
+    offset: int
+
+
+def _max_limit():
+    return getattr(settings, 'SEARCH_MAX_PAGE_SIZE', 200)
+
+
+def _query_fingerprint(path):
+    return zlib.crc32(path.encode('utf-8'))
+
+
+def _parse_int(params, name, default, minimum):
+    raw = params.get(name)
+    if raw is None or raw == '':
+        return default
+    try:
+        value = int(raw)
+    except ValueError:
+        raise PaginationError(f"Paramètre {name} invalide : {raw}")
+    if value < minimum:
+        raise PaginationError(f"Paramètre {name} invalide : {raw} (minimum {minimum})")
+    return value
+
+
+def encode_cursor(request, page):
+    payload = json.dumps([page.offset, page.limit, _query_fingerprint(request.path)], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('ascii')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(request, cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        offset, limit, fingerprint = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        offset, limit, fingerprint = int(offset), int(limit), int(fingerprint)
+    except (ValueError, TypeError, UnicodeError):
+        raise PaginationError("Curseur invalide")
+    if fingerprint != _query_fingerprint(request.path):
+        raise PaginationError("Curseur invalide pour cette recherche")
+    if offset < 0 or not 1 <= limit <= _max_limit():
+        raise PaginationError("Curseur invalide")
+    return PageRequest(limit, offset)
+
+
+def parse_page_request(request) -> Optional[PageRequest]:
+    """Lit limit/offset ou cursor dans la requête ; None si aucun n'est fourni."""
+    params = request.query_params
+    cursor = params.get('cursor')
+    if cursor:
+        return decode_cursor(request, cursor)
+    if params.get('limit') is None and params.get('offset') is None:
+        return None
+    limit = _parse_int(params, 'limit', DEFAULT_LIMIT, 1)
+    if limit > _max_limit():
+        raise PaginationError(f"Paramètre limit trop grand : {limit} (maximum {_max_limit()})")
+    return PageRequest(limit, _parse_int(params, 'offset', 0, 0))
+
+
+def select_page(book_ids, key, page):
+    """Identifiants triés par clé décroissante, restreints à la page demandée.
+
+    heapq.nlargest conserve l'ordre d'origine des ex aequo, comme sorted(..., reverse=True).
+    """
+    if page is None:
+        return sorted(book_ids, key=key, reverse=True)
+    return heapq.nlargest(page.offset + page.limit, book_ids, key=key)[page.offset:]
+
+
+def page_info(request, page, total):
+    """Champs de pagination ajoutés à la réponse."""
+    next_offset = page.offset + page.limit
+    next_page = PageRequest(page.limit, next_offset)
+    return {
+        'total': total,
+        'limit': page.limit,
+        'offset': page.offset,
+        'next_cursor': encode_cursor(request, next_page) if next_offset < total else None,
+    }
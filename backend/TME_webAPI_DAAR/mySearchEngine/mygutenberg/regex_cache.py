@@ -0,0 +1,75 @@
+"""Cache des automates compilés pour les recherches par regex.
+
+Parser la regex et construire l'automate (DFA ou moteur bit-parallèle, selon
+REGEX_ENGINE) ne dépend que du motif :
+les automates sont gardés dans un cache LRU commun au processus, indépendant de la
+génération d'index. Un automate qui dépasse REGEX_MAX_DFA_STATES pendant une recherche
+est remplacé dans le cache par le moteur bit-parallèle (fallback_regex).
+
+Les motifs de REGEX_WARM_PATTERNS sont compilés à la première recherche par regex du
+processus, et non au chargement de Django (migrate, shell, commandes d'ingestion n'en
+ont pas besoin) ; un verrou évite que des requêtes simultanées les compilent chacune.
+"""
+import logging
+import threading
+
+from django.conf import settings
+
+from mygutenberg.algorithms.automaton import build_matcher
+from mygutenberg.result_cache import ResultCache
+
+logger = logging.getLogger(__name__)
+
+regex_cache = ResultCache(getattr(settings, 'REGEX_CACHE_SIZE', 256))
+_warmed = False
+_warm_lock = threading.Lock()
+
+
+def normalize_pattern(regex):
+    return regex.lower()
+
+
+def compile_regex(regex):
+    """Automate de la regex normalisée, construit au premier appel puis servi depuis le cache."""
+    if not _warmed:
+        with _warm_lock:
+            if not _warmed:
+                warm_regex_cache()
+    pattern = normalize_pattern(regex)
+    return regex_cache.get_or_compute(pattern, lambda: build_matcher(
+        pattern,
+        engine=getattr(settings, 'REGEX_ENGINE', 'auto'),
+        lazy=getattr(settings, 'REGEX_LAZY_DFA', True),
+        max_states=getattr(settings, 'REGEX_MAX_DFA_STATES', None),
+    ))
+
+
+def fallback_regex(regex):
+    """Remplace l'automate de la regex, qui a dépassé REGEX_MAX_DFA_STATES, par le moteur de Glushkov.
+
+    Le DFA est retiré du cache avec les états déjà construits. Les motifs de plus de
+    GlushkovMatcher.MAX_POSITIONS positions n'ont pas de repli : RegexTooComplex est levée.
+    """
+    pattern = normalize_pattern(regex)
+    regex_cache.discard(pattern)
+    matcher = build_matcher(pattern, engine='glushkov')
+    regex_cache.put(pattern, matcher)
+    return matcher
+
+
+def warm_regex_cache(patterns=None):
+    """Compile les motifs donnés (par défaut REGEX_WARM_PATTERNS) ; les motifs invalides sont ignorés."""
+    global _warmed
+    if patterns is None:
+        _warmed = True
+        patterns = getattr(settings, 'REGEX_WARM_PATTERNS', [])
+    compiled = 0
+    for pattern in patterns:
+        try:
+            compile_regex(pattern)
+            compiled += 1
+        except Exception as e:
+            logger.warning(f"Motif ignoré au préchauffage du cache des regex ({pattern}) : {e}")
+    if compiled:
+        logger.info(f"Cache des regex préchauffé : {compiled} motifs compilés")
+    return compiled
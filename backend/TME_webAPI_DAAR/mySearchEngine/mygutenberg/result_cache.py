@@ -0,0 +1,111 @@
+"""Cache LRU des résultats agrégés des recherches.
+
+Les vues y rangent les agrégats {gutenberg_id: {'score', ...}} calculés à partir du
+Trie, avant tri, pagination et hydratation. Le cache est vidé dès qu'une nouvelle
+génération d'index est publiée par populate_and_index_books (au plus
+INDEX_GENERATION_CHECK_INTERVAL secondes après la fin de l'indexation), en même temps
+que l'instantané du Trie et le catalogue sont rechargés : tous lisent la génération
+dans generation.index_generation.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+from mygutenberg.generation import index_generation
+
+_MISSING = object()
+
+
+class ResultCache:
+    def __init__(self, max_size, ttl=None, generation_source=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.generation_source = generation_source
+        self.generation = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # clé -> (valeur, date d'insertion)
+        self._lock = threading.Lock()
+
+    def _check_generation(self):
+        if self.generation_source is None:
+            return
+        generation = self.generation_source()
+        if generation != self.generation:
+            self._entries.clear()
+            self.generation = generation
+
+    def get(self, key, default=None):
+        return self._lookup(key, default)[0]
+
+    def _lookup(self, key, default):
+        """(valeur ou default, génération courante du cache)."""
+        with self._lock:
+            self._check_generation()
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl is not None and time.monotonic() - entry[1] > self.ttl:
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return default, self.generation
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0], self.generation
+
+    def put(self, key, value, generation=_MISSING):
+        """Range la valeur ; si generation est donnée et n'est plus la génération courante, la valeur est ignorée."""
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._check_generation()
+            if generation is not _MISSING and generation != self.generation:
+                return
+            self._entries[key] = (value, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_compute(self, key, compute):
+        """Valeur en cache pour la clé, sinon compute() (appelé hors du verrou) mis en cache.
+
+        Une valeur calculée pendant un changement de génération n'est pas mise en cache.
+        """
+        value, generation = self._lookup(key, _MISSING)
+        if value is _MISSING:
+            value = compute()
+            self.put(key, value, generation)
+        return value
+
+    def discard(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl': self.ttl,
+                'generation': self.generation,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+
+search_cache = ResultCache(
+    getattr(settings, 'SEARCH_RESULT_CACHE_SIZE', 512),
+    getattr(settings, 'SEARCH_RESULT_CACHE_TTL', None),
+    generation_source=index_generation.current,
+)
@@ -0,0 +1,167 @@
+import itertools
+import random
+import re
+
+from django.test import SimpleTestCase
+
+from mygutenberg.algorithms import postings_codec
+from mygutenberg.algorithms.automaton import (
+    DFA, NFA, DFABudgetExceeded, GlushkovMatcher, RegExParser, RegexTooComplex, build_dfa_from_regex, build_matcher,
+    literal_prefixes,
+)
+from mygutenberg.algorithms.trigram import build_trigram_index, evaluate_query
+from mygutenberg.trie_snapshot import TrieSnapshot
+from mygutenberg.views import SearchByRegex
+
+ALPHABET = 'abcd'
+WORDS = [''.join(letters) for length in range(1, 6) for letters in itertools.product(ALPHABET, repeat=length)]
+REGEXES = ['(a|b)*abb', 'a*b*a*', '.*abc.*', 'abc', 'a.c', '.*a', 'a.*', '(a|b)*', 'ab*c', '(abc|bd)', '(ab)*c',
+           '(a|b)*c(a|b)*', 'a*b', '.b.d', 'ba*c*d', '(ba)*(dc)*']
+
+
+def random_regex(rng, depth):
+    """Motif aléatoire dans la syntaxe commune à RegExParser et au module re."""
+    draw = rng.random()
+    if depth <= 0 or draw < 0.3:
+        return rng.choice(list(ALPHABET) * 2 + ['.', '[ab]', '[^a]', '[b-d]'])
+    if draw < 0.6:
+        return random_regex(rng, depth - 1) + random_regex(rng, depth - 1)
+    if draw < 0.75:
+        return f'({random_regex(rng, depth - 1)}|{random_regex(rng, depth - 1)})'
+    return f'({random_regex(rng, depth - 1)}){rng.choice("*+?")}'
+
+
+def accepts(matcher, word):
+    """Le mot entier est-il accepté ? (parcours du Trie : transition puis is_accepting)"""
+    state = matcher.start_state
+    for char in word:
+        state = matcher.transition(state, char)
+        if state < 0:
+            return False
+    return matcher.is_accepting(state)
+
+
+def subset_dfa(regex):
+    """DFA de référence : construction par sous-ensembles, sans complétion ni minimisation."""
+    return DFA().from_nfa(NFA().from_regex_tree(RegExParser(regex).parse()))
+
+
+def trie_rows(words):
+    """Tuples (id, parent_id, char, is_end_of_word) du Trie des mots, comme TrieNode.values_list, et {mot: id}."""
+    ids = {}
+    rows = {}
+    for word in words:
+        for length in range(1, len(word) + 1):
+            prefix = word[:length]
+            if prefix not in ids:
+                ids[prefix] = len(ids) + 1
+                rows[prefix] = [ids[prefix], ids.get(prefix[:-1]), prefix[-1], False]
+        rows[word][3] = True
+    return [tuple(row) for row in rows.values()], {word: ids[word] for word in words}
+
+
+def matchers(regex):
+    engines = {
+        'dfa minimal': build_dfa_from_regex(regex),
+        'dfa': build_dfa_from_regex(regex, minimize=False),
+        'lazy': build_dfa_from_regex(regex, lazy=True),
+        'auto': build_matcher(regex),
+    }
+    if GlushkovMatcher.count_positions(RegExParser(regex).parse()) <= GlushkovMatcher.MAX_POSITIONS:
+        engines['glushkov'] = build_matcher(regex, engine='glushkov')
+    return engines
+
+
+class AutomatonTests(SimpleTestCase):
+    def test_engines_match_python_re(self):
+        rng = random.Random(0)
+        for _ in range(150):
+            regex = random_regex(rng, 4)
+            expected = [word for word in WORDS if re.fullmatch(regex, word)]
+            engines = matchers(regex)
+            for name, matcher in engines.items():
+                with self.subTest(regex=regex, engine=name):
+                    self.assertEqual([word for word in WORDS if accepts(matcher, word)], expected)
+            # match() s'arrête au premier préfixe accepté : même comportement pour tous les moteurs
+            prefix_matches = {name: [word for word in WORDS if matcher.match(word)] for name, matcher in engines.items()}
+            self.assertEqual(len({tuple(words) for words in prefix_matches.values()}), 1, regex)
+
+    def test_dense_dfa_matches_subset_construction(self):
+        for regex in REGEXES:
+            reference = subset_dfa(regex)
+            expected = [word for word in WORDS if accepts(reference, word)]
+            for name, dfa in matchers(regex).items():
+                with self.subTest(regex=regex, engine=name):
+                    self.assertEqual([word for word in WORDS if accepts(dfa, word)], expected)
+                    self.assertEqual([dfa.match(word) for word in WORDS], [reference.match(word) for word in WORDS])
+
+    def test_hopcroft_minimization(self):
+        for regex in REGEXES:
+            self.assertLessEqual(build_dfa_from_regex(regex).state_count, build_dfa_from_regex(regex, minimize=False).state_count)
+        # (a|b)*abb : le DFA minimal classique a 4 états (plus l'état puits éventuel)
+        self.assertLessEqual(build_dfa_from_regex('(a|b)*abb').state_count, 5)
+
+    def test_state_budget(self):
+        regex = '.*abcdabcd'
+        with self.assertRaises(DFABudgetExceeded):
+            build_dfa_from_regex(regex, max_states=5)
+        lazy = build_dfa_from_regex(regex, lazy=True, max_states=5)
+        with self.assertRaises(DFABudgetExceeded):
+            for word in WORDS:
+                accepts(lazy, word + 'abcdabcd')
+        # Sous le budget, seuls les états atteints sont construits
+        lazy = build_dfa_from_regex(regex, lazy=True)
+        accepts(lazy, 'ab')
+        self.assertLess(lazy.state_count, build_dfa_from_regex(regex, minimize=False).state_count)
+
+    def test_invalid_patterns(self):
+        for regex in ['', '(ab', 'a)', '*a', '[z-a]', 'a||b']:
+            with self.subTest(regex=regex), self.assertRaises(ValueError):
+                build_matcher(regex)
+        with self.assertRaises(RegexTooComplex):
+            build_matcher('a' * 300)
+        with self.assertRaises(RegexTooComplex):
+            build_matcher('(' * 40 + 'a' + ')' * 40)
+
+    def test_literal_prefixes(self):
+        self.assertEqual(literal_prefixes(RegExParser('alic(e|ia).*').parse()), ['alice', 'alicia'])
+        self.assertEqual(literal_prefixes(RegExParser('(ab|c)d*').parse()), ['ab', 'c'])
+        for regex in ['.*alice', '[^a]b', 'a*b', '(a|b?)c*']:
+            self.assertIsNone(literal_prefixes(RegExParser(regex).parse()), regex)
+        rng = random.Random(3)
+        for _ in range(150):
+            regex = random_regex(rng, 4)
+            prefixes = literal_prefixes(RegExParser(regex).parse())
+            if prefixes is not None:
+                for word in WORDS:
+                    if re.fullmatch(regex, word):
+                        self.assertTrue(any(word.startswith(prefix) for prefix in prefixes), (regex, word))
+
+    def test_trigram_candidates_contain_every_match(self):
+        rng = random.Random(1)
+        vocabulary = sorted({''.join(rng.choice(ALPHABET) for _ in range(rng.randint(1, 9))) for _ in range(3000)})
+        index = build_trigram_index(enumerate(vocabulary))
+        for _ in range(150):
+            regex = random_regex(rng, 4)
+            candidates = evaluate_query(build_dfa_from_regex(regex).trigram_query, index)
+            if candidates is not None:
+                matched = {term for term, word in enumerate(vocabulary) if re.fullmatch(regex, word)}
+                self.assertLessEqual(matched, candidates, regex)
+
+    def test_regex_search_matches_brute_force(self):
+        rng = random.Random(2)
+        vocabulary = sorted({''.join(rng.choice(ALPHABET) for _ in range(rng.randint(1, 8))) for _ in range(2000)})
+        rows, node_ids = trie_rows(vocabulary)
+        trie = TrieSnapshot.from_rows(None, rows)
+        index = build_trigram_index((node_ids[word], word) for word in vocabulary)
+        trie.load_trigram_index((trigram, postings_codec.encode_ids(ids)) for trigram, ids in index.items())
+        regexes = [random_regex(rng, 4) for _ in range(100)] + ['abc.*', 'ab(c|d)+', '.*abc.*', '.*(dd|cc)a', '[^a]*b']
+        for regex in regexes:
+            expected = [word for word in vocabulary if re.fullmatch(regex, word)]
+            for lazy in (True, False):
+                dfa = build_dfa_from_regex(regex, lazy=lazy)
+                with self.subTest(regex=regex, lazy=lazy):
+                    found = sorted(trie.words[term] for term in SearchByRegex._matching_terms(trie, dfa))
+                    self.assertEqual(found, expected)
+                    traversed = sorted(trie.words[term] for term in SearchByRegex._traverse_with_dfa(trie, dfa))
+                    self.assertEqual(traversed, expected)
@@ -0,0 +1,126 @@
+import random
+from collections import defaultdict, deque
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from mygutenberg.algorithms import centrality
+from mygutenberg.algorithms.centrality import (
+    approximate_betweenness_centrality, approximate_closeness_centrality, betweenness_centrality,
+    betweenness_centrality_naive, betweenness_normalization, betweenness_sample_size, closeness_centrality,
+    closeness_sample_size,
+)
+
+
+def random_graph(seed, n, p):
+    rng = random.Random(seed)
+    graph = defaultdict(set)
+    for u in range(n):
+        for v in range(u + 1, n):
+            if rng.random() < p:
+                graph[u].add(v)
+                graph[v].add(u)
+    return graph
+
+
+def random_tree(seed, n):
+    rng = random.Random(seed)
+    graph = defaultdict(set)
+    for v in range(1, n):
+        u = rng.randrange(v)
+        graph[u].add(v)
+        graph[v].add(u)
+    return graph
+
+
+def shortest_path_counts(graph, source):
+    distance = {source: 0}
+    sigma = {source: 1}
+    queue = deque([source])
+    while queue:
+        v = queue.popleft()
+        for w in graph[v]:
+            if w not in distance:
+                distance[w] = distance[v] + 1
+                sigma[w] = 0
+                queue.append(w)
+            if distance[w] == distance[v] + 1:
+                sigma[w] += sigma[v]
+    return distance, sigma
+
+
+def betweenness_by_definition(graph, book_ids):
+    """Somme, sur les paires ordonnées (s, t), de la part des plus courts chemins de s à t passant par v."""
+    nodes = list(graph)
+    counts = {s: shortest_path_counts(graph, s) for s in nodes}
+    betweenness = defaultdict(float)
+    for s in nodes:
+        distance_s, sigma_s = counts[s]
+        for t in distance_s:
+            if t == s:
+                continue
+            for v in distance_s:
+                if v in (s, t):
+                    continue
+                distance_v, sigma_v = counts[v]
+                if t in distance_v and distance_s[v] + distance_v[t] == distance_s[t]:
+                    betweenness[v] += sigma_s[v] * sigma_v[t] / sigma_s[t]
+    norm = betweenness_normalization(len(nodes))
+    return {book_id: betweenness[book_id] / norm for book_id in book_ids}
+
+
+class CentralityTests(SimpleTestCase):
+    def assertScoresEqual(self, result, expected, places=9):
+        self.assertEqual(set(result), set(expected))
+        for book_id in expected:
+            self.assertAlmostEqual(result[book_id], expected[book_id], places=places, msg=book_id)
+
+    def test_brandes_matches_definition(self):
+        for seed, n, p in ((1, 30, 0.1), (2, 40, 0.05), (3, 25, 0.3)):
+            graph = random_graph(seed, n, p)
+            book_ids = list(graph) + [1000]  # un livre sans arête
+            self.assertScoresEqual(betweenness_centrality(graph, book_ids, workers=1), betweenness_by_definition(graph, book_ids))
+
+    def test_brandes_matches_naive_walk_on_trees(self):
+        # Un seul plus court chemin par paire : l'ancien parcours des prédécesseurs est alors exact
+        graph = random_tree(4, 60)
+        self.assertScoresEqual(betweenness_centrality(graph, list(graph), workers=1), betweenness_centrality_naive(graph, list(graph)))
+
+    def test_parallel_brandes_matches_sequential(self):
+        graph = random_graph(5, 80, 0.06)
+        sequential = betweenness_centrality(graph, list(graph), workers=1)
+        with mock.patch.object(centrality, 'PARALLEL_MIN_NODES', 10):
+            self.assertScoresEqual(betweenness_centrality(graph, list(graph), workers=2), sequential)
+
+    def test_approximate_closeness_is_exact_with_every_pivot(self):
+        graph = random_graph(6, 50, 0.06)
+        book_ids = list(graph) + [1000]
+        exact = closeness_centrality(graph, list(graph))
+        exact[1000] = 0.0
+        self.assertScoresEqual(approximate_closeness_centrality(graph, book_ids, samples=len(book_ids), seed=1), exact)
+
+    def test_approximate_closeness_error(self):
+        graph = random_graph(7, 300, 0.02)
+        exact = closeness_centrality(graph, list(graph))
+        approximate = approximate_closeness_centrality(graph, list(graph), samples=100, seed=2)
+        errors = [abs(approximate[v] - exact[v]) / exact[v] for v in graph if exact[v]]
+        self.assertLess(max(errors), 0.2)
+
+    def test_approximate_betweenness_error(self):
+        graph = random_graph(8, 150, 0.03)
+        book_ids = list(graph) + list(range(1000, 1150))  # autant de livres sans arête que de noeuds du graphe
+        epsilon = 0.02
+        exact = betweenness_centrality(graph, book_ids, workers=1)
+        approximate = approximate_betweenness_centrality(graph, book_ids, epsilon=epsilon, seed=3)
+        self.assertLessEqual(max(abs(approximate[v] - exact[v]) for v in book_ids), 2 * epsilon)
+        self.assertEqual({approximate[v] for v in range(1000, 1150)}, {0.0})
+
+    def test_approximate_betweenness_without_inner_nodes(self):
+        graph = {1: {2}, 2: {1}, 3: {4}, 4: {3}}
+        self.assertEqual(approximate_betweenness_centrality(graph, [1, 2, 3, 4, 5], seed=1), dict.fromkeys([1, 2, 3, 4, 5], 0.0))
+
+    def test_sample_sizes(self):
+        self.assertLess(closeness_sample_size(100), closeness_sample_size(10 ** 6))
+        self.assertLess(closeness_sample_size(1000, epsilon=0.1), closeness_sample_size(1000, epsilon=0.05))
+        self.assertLess(betweenness_sample_size(4), betweenness_sample_size(100))
+        self.assertLess(betweenness_sample_size(10, delta=0.2), betweenness_sample_size(10, delta=0.01))
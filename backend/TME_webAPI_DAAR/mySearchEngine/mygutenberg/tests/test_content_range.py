@@ -0,0 +1,125 @@
+import random
+import re
+import tempfile
+
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from mygutenberg.content_range import (
+    ContentRange, ContentRangeError, RangeNotSatisfiable, etag_matches, parse_query_range, parse_range_header,
+)
+from mygutenberg.corpus_store import get_corpus_store
+from mygutenberg.models import BookText
+
+BOOK_ID = 84
+
+
+def sample_text(seed=0, paragraphs=700):
+    rng = random.Random(seed)
+    words = ['été', 'cœur', 'naïve', 'alpha', 'beta', 'gamma', 'über', 'word']
+    body = '\n\n'.join(' '.join(rng.choice(words) for _ in range(rng.randint(5, 80))) for _ in range(paragraphs))
+    return (
+        "Title: Exemple\nAuthor: Personne\n\n"
+        "*** START OF THE PROJECT GUTENBERG EBOOK EXEMPLE ***\n\n"
+        f"{body}\n\n"
+        "*** END OF THE PROJECT GUTENBERG EBOOK EXEMPLE ***\nLicence\n"
+    )
+
+
+class ParseRangeTests(SimpleTestCase):
+    def test_range_header(self):
+        self.assertEqual(parse_range_header('bytes=0-9', 100), ContentRange(0, 10))
+        self.assertEqual(parse_range_header('bytes=90-', 100), ContentRange(90, 100))
+        self.assertEqual(parse_range_header('bytes=95-500', 100), ContentRange(95, 100))
+        self.assertEqual(parse_range_header('bytes=-30', 100), ContentRange(70, 100))
+        self.assertEqual(parse_range_header('bytes=-300', 100), ContentRange(0, 100))
+        for ignored in (None, '', 'bytes=-', 'bytes=0-1,5-6', 'items=0-5'):
+            self.assertIsNone(parse_range_header(ignored, 100))
+        for unsatisfiable in ('bytes=100-', 'bytes=-0', 'bytes=50-10'):
+            with self.subTest(header=unsatisfiable), self.assertRaises(RangeNotSatisfiable):
+                parse_range_header(unsatisfiable, 100)
+
+    def test_query_range(self):
+        paragraphs = [0, 10, 25, 60]
+        self.assertIsNone(parse_query_range({}, paragraphs, 100))
+        self.assertEqual(parse_query_range({'offset': '20', 'length': '5'}, paragraphs, 100), ContentRange(20, 25))
+        self.assertEqual(parse_query_range({'offset': '90'}, paragraphs, 100), ContentRange(90, 100))
+        self.assertEqual(parse_query_range({'paragraph': '1'}, paragraphs, 100), ContentRange(10, 25, (1, 2, 4)))
+        self.assertEqual(parse_query_range({'paragraph': '2', 'count': '9'}, paragraphs, 100), ContentRange(25, 100, (2, 4, 4)))
+        for params in ({'paragraph': '4'}, {'paragraph': '-1'}, {'offset': 'x'}, {'length': '0'}, {'paragraph': '0', 'count': '0'}):
+            with self.subTest(params=params), self.assertRaises(ContentRangeError):
+                parse_query_range(params, paragraphs, 100)
+
+    def test_etag_matches(self):
+        self.assertTrue(etag_matches('"abc"', '"abc"'))
+        self.assertTrue(etag_matches('W/"abc", "def"', '"abc"'))
+        self.assertTrue(etag_matches('*', '"abc"'))
+        self.assertFalse(etag_matches('"abd"', '"abc"'))
+        self.assertFalse(etag_matches(None, '"abc"'))
+
+
+class BookContentTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings = override_settings(CORPUS_STORE_DIR=directory.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        BookText.objects.create(gutenberg_id=BOOK_ID, title='Exemple')
+        store = get_corpus_store()
+        store.save(BOOK_ID, sample_text())
+        # Référence naïve : contenu nettoyé du livre décompressé en entier
+        self.content = store.load(BOOK_ID).content().encode('utf-8')
+        self.url = f'/gutenberg/book/{BOOK_ID}/content/'
+
+    def get(self, **kwargs):
+        response = self.client.get(self.url, **kwargs)
+        body = b''.join(response.streaming_content) if response.streaming else response.content
+        return response, body
+
+    def test_full_content(self):
+        self.assertGreater(len(self.content), 128 * 1024)  # plusieurs morceaux de CHUNK_SIZE
+        response, body = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(body, self.content)
+        self.assertEqual(response['Content-Length'], str(len(self.content)))
+
+    def test_byte_ranges_match_slices(self):
+        total = len(self.content)
+        rng = random.Random(1)
+        for _ in range(20):
+            start = rng.randrange(total)
+            end = rng.randrange(start, total)
+            response, body = self.get(HTTP_RANGE=f'bytes={start}-{end}')
+            self.assertEqual(response.status_code, 206)
+            self.assertEqual(body, self.content[start:end + 1])
+            self.assertEqual(response['Content-Range'], f'bytes {start}-{end}/{total}')
+            response, body = self.get(data={'offset': start, 'length': end - start + 1})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(body, self.content[start:end + 1])
+        response, body = self.get(HTTP_RANGE='bytes=-100')
+        self.assertEqual(body, self.content[-100:])
+        response, _ = self.get(HTTP_RANGE=f'bytes={total}-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], f'bytes */{total}')
+
+    def test_paragraphs_match_split(self):
+        paragraphs = re.split(rb'(?:\r?\n[ \t]*){2,}', self.content)
+        for index in (0, 1, 57, len(paragraphs) - 1):
+            response, body = self.get(data={'paragraph': index})
+            self.assertEqual(body.strip(), paragraphs[index])
+            self.assertEqual(response['X-Paragraphs'], f'{index}-{index}/{len(paragraphs)}')
+        _, body = self.get(data={'paragraph': 3, 'count': 4})
+        self.assertEqual(re.split(rb'(?:\r?\n[ \t]*){2,}', body.strip()), paragraphs[3:7])
+
+    def test_etag(self):
+        response, _ = self.get()
+        etag = response['ETag']
+        self.assertEqual(self.get(HTTP_IF_NONE_MATCH=etag)[0].status_code, 304)
+        # If-Range périmé : la plage est ignorée et tout le contenu est renvoyé
+        response, body = self.get(HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"ancien"')
+        self.assertEqual((response.status_code, body), (200, self.content))
+        response, body = self.get(HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE=etag)
+        self.assertEqual((response.status_code, body), (206, self.content[:10]))
+
+    def test_unknown_book(self):
+        self.assertEqual(self.client.get('/gutenberg/book/999999/content/').status_code, 404)
@@ -0,0 +1,42 @@
+import tempfile
+
+from django.test import SimpleTestCase
+
+from mygutenberg.clean_content import nettoyer_texte
+from mygutenberg.corpus_store import CorpusStore
+
+TEXTS = {
+    1: "Title: Exemple\n\n*** START OF THE PROJECT GUTENBERG EBOOK EXEMPLE ***\nBonjour été.\n*** END OF THE PROJECT GUTENBERG EBOOK EXEMPLE ***\nLicence\n",
+    2: "\ufeffTitle: BOM\n*** START OF THIS PROJECT GUTENBERG EBOOK BOM ***\ncontenu\n",
+    3: "Aucun marqueur\nseulement du texte\n",
+    4: "*** END OF THE PROJECT GUTENBERG EBOOK X ***\navant\n*** START OF THE PROJECT GUTENBERG EBOOK X ***\naprès\n",
+    5: "Titre\n*** START OF THE PROJECT GUTENBERG EBOOK X ***\nun\n*** END OF THE PROJECT GUTENBERG EBOOK X ***\ndeux\n*** END OF THE PROJECT GUTENBERG EBOOK X ***\n",
+}
+
+
+class CorpusStoreTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.store = CorpusStore(directory.name)
+
+    def test_round_trip_matches_nettoyer_texte(self):
+        for book_id, text in TEXTS.items():
+            with self.subTest(book_id=book_id):
+                saved = self.store.save(book_id, text)
+                loaded = self.store.load(book_id)
+                self.assertEqual(loaded, saved)
+                self.assertEqual(loaded.text, text.lstrip('\ufeff'))
+                self.assertEqual(loaded.cleaned(), nettoyer_texte(text))
+
+    def test_book_ids_and_delete(self):
+        self.assertEqual(self.store.book_ids(), [])
+        for book_id in (12, 3):
+            self.store.save(book_id, TEXTS[1])
+        self.assertEqual(self.store.book_ids(), [3, 12])
+        self.assertIn(12, self.store)
+        self.store.delete(12)
+        self.store.delete(12)
+        self.assertNotIn(12, self.store)
+        with self.assertRaises(KeyError):
+            self.store.load(12)
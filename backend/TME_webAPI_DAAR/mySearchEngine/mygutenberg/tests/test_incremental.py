@@ -0,0 +1,186 @@
+import io
+import json
+import os
+import random
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+from urllib.parse import parse_qs, urlsplit
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from mygutenberg.algorithms.trigram import trie_words
+from mygutenberg.management.commands import populate_and_index_books
+from mygutenberg.models import BookText, Posting, TableJaccard, TrieNode, Trigram
+from mygutenberg.trie_snapshot import TrieSnapshot
+
+PAGE_SIZE = 10
+ISOLATED_BOOK = 5  # présents à la fin des deux scénarios de test
+BRIDGE_BOOK = 6
+
+
+def make_corpus(seed=11, books=14):
+    """Livres de quatre vocabulaires, avec un fonds commun, juste au-dessus du minimum de 10000 mots.
+
+    Le livre ISOLATED_BOOK a un vocabulaire disjoint de celui des autres : il n'a aucune arête
+    dans le graphe de Jaccard. BRIDGE_BOOK mêle deux vocabulaires et relie leurs livres, pour que
+    des intermédiarités soient non nulles.
+    """
+    rng = random.Random(seed)
+    letters = 'abcdefghijklmnop'
+    groups = [sorted({''.join(rng.choice(letters) for _ in range(rng.randint(3, 7))) for _ in range(150)}) for _ in range(4)]
+    common = sorted({''.join(rng.choice('qrstuvwxyz') for _ in range(rng.randint(3, 6))) for _ in range(60)})
+    isolated = sorted({''.join(rng.choice(letters) for _ in range(rng.randint(4, 7))) for _ in range(150)}.difference(*groups))
+    texts = {}
+    titles = {}
+    for book_id in range(1, books + 1):
+        if book_id == ISOLATED_BOOK:
+            words = rng.sample(isolated, 110)
+        elif book_id == BRIDGE_BOOK:
+            words = rng.sample(groups[2], 75) + rng.sample(groups[3], 75) + rng.sample(common, 15)
+        else:
+            words = rng.sample(groups[book_id % 4], rng.randint(90, 130)) + rng.sample(common, 15)
+        body = ' '.join(rng.choice(words) for _ in range(rng.randint(10100, 10600)))
+        texts[book_id] = f'*** START OF THE PROJECT GUTENBERG EBOOK {book_id} ***\n{body}\n*** END OF THE PROJECT GUTENBERG EBOOK {book_id} ***'
+        titles[book_id] = f'{rng.choice(common)} {rng.choice(groups[0])}'
+    vocabulary = sorted(set(common).union(isolated, *groups))
+    return texts, titles, vocabulary
+
+
+class FakeGutenberg(BaseHTTPRequestHandler):
+    """Catalogue Gutendex (ids servis : catalog_ids) et textes, servis depuis la mémoire."""
+    protocol_version = 'HTTP/1.1'
+    texts = titles = None
+    catalog_ids = []
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path == '/books/':
+            page = int(parse_qs(url.query)['page'][0])
+            ids = self.catalog_ids[(page - 1) * PAGE_SIZE:page * PAGE_SIZE]
+            body = json.dumps({
+                'results': [{'id': book_id, 'title': self.titles[book_id], 'authors': [{'name': f'Auteur{book_id % 3}, Jean'}],
+                             'languages': ['en']} for book_id in ids],
+                'next': 'suivante' if page * PAGE_SIZE < len(self.catalog_ids) else None,
+            }).encode()
+        else:
+            body = self.texts[int(url.path.rsplit('/', 1)[1].split('.')[0])].encode()
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class IncrementalIndexingTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        texts, titles, vocabulary = make_corpus()
+        FakeGutenberg.texts, FakeGutenberg.titles = texts, titles
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), FakeGutenberg)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base_url = f'http://127.0.0.1:{cls.server.server_address[1]}'
+
+        cls.directory = tempfile.TemporaryDirectory()
+        whitelists = {}
+        for language in ('en', 'fr'):
+            whitelists[language] = os.path.join(cls.directory.name, f'{language}.txt')
+            with open(whitelists[language], 'w') as f:
+                f.write('\n'.join(vocabulary))
+        cls.whitelists = mock.patch.dict(populate_and_index_books.WHITELISTS, whitelists)
+        cls.whitelists.start()
+        # Seuil abaissé pour que BRIDGE_BOOK soit relié aux livres de ses deux vocabulaires
+        cls.threshold = mock.patch.object(populate_and_index_books, 'JACCARD_THRESHOLD', 0.2)
+        cls.threshold.start()
+        cls.settings = override_settings(CORPUS_STORE_DIR=os.path.join(cls.directory.name, 'corpus'), GUTENBERG_FETCH_RATE=0)
+        cls.settings.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.settings.disable()
+        cls.threshold.stop()
+        cls.whitelists.stop()
+        cls.server.shutdown()
+        cls.server.server_close()
+        cls.directory.cleanup()
+        super().tearDownClass()
+
+    def index(self, catalog_ids, **options):
+        FakeGutenberg.catalog_ids = catalog_ids
+        call_command(
+            'populate_and_index_books', catalog_url=f'{self.base_url}/books/', text_url=f'{self.base_url}/ebooks/{{book_id}}.txt.utf-8',
+            workers=2, tokenize_workers=1, stdout=io.StringIO(), **options,
+        )
+
+    def snapshot(self):
+        words = dict(trie_words(TrieNode.objects.values_list('id', 'parent_id', 'char', 'is_end_of_word')))
+        end_nodes = TrieNode.objects.filter(is_end_of_word=True)
+        trie = TrieSnapshot.from_database(None)
+        return {
+            'books': {book.gutenberg_id: (book.word_count, book.closeness_centrality, book.betweenness_centrality) for book in BookText.objects.all()},
+            'postings': {(words[posting.term_id], posting.gutenberg_id): (posting.occurrences, posting.tfidf, posting.score) for posting in Posting.objects.all()},
+            'stats': {words[node.id]: (node.document_frequency, node.idf) for node in end_nodes},
+            'trigrams': {row.trigram: sorted(words[i] for i in row.get_term_ids() if i in words) for row in Trigram.objects.all() if row.get_term_ids()},
+            'jaccard': {tuple(sorted((row.book1.gutenberg_id, row.book2.gutenberg_id))): row.jaccard_similarity for row in TableJaccard.objects.select_related('book1', 'book2')},
+            'snapshot': {result['word']: result['data'] for char in {word[0] for word in trie.words} for result in trie.search_by_prefix(char)},
+        }
+
+    def assertSameIndex(self, incremental, full):
+        for key in full:
+            with self.subTest(table=key):
+                self.assertTrue(full[key])
+                self.assertEqual(set(incremental[key]), set(full[key]))
+                for item, expected in full[key].items():
+                    self.assertValuesAlmostEqual(incremental[key][item], expected, f'{key} {item}')
+
+    def assertValuesAlmostEqual(self, value, expected, msg):
+        if isinstance(expected, dict):
+            self.assertEqual(set(value), set(expected), msg)
+            for key in expected:
+                self.assertValuesAlmostEqual(value[key], expected[key], msg)
+        elif isinstance(expected, (list, tuple)):
+            self.assertEqual(len(value), len(expected), msg)
+            for item, expected_item in zip(value, expected):
+                self.assertValuesAlmostEqual(item, expected_item, msg)
+        elif isinstance(expected, float):
+            self.assertAlmostEqual(value, expected, delta=1e-9 * max(1.0, abs(expected)), msg=msg)
+        else:
+            self.assertEqual(value, expected, msg)
+
+    def test_incremental_update_matches_full_rebuild(self):
+        self.index(list(range(1, 11)), count=8)
+        indexed = sorted(BookText.objects.values_list('gutenberg_id', flat=True))
+        self.assertEqual(len(indexed), 8)
+
+        # Retrait de deux livres (et d'un livre inconnu), ajout de trois autres, IDF recalculés exactement
+        removed = [indexed[1], indexed[-1], 999]
+        self.index(list(range(1, 15)), incremental=True, count=3, remove=removed, idf_tolerance=0)
+        incremental = self.snapshot()
+        final = sorted(incremental['books'])
+        self.assertEqual(len(final), 9)
+        self.assertFalse(set(removed) & set(final))
+        self.assertNotIn(ISOLATED_BOOK, {book_id for pair in incremental['jaccard'] for book_id in pair})
+        self.assertIn(ISOLATED_BOOK, final)
+        self.assertGreater(incremental['books'][BRIDGE_BOOK][2], 0)
+
+        self.index(final, count=len(final))
+        self.assertSameIndex(incremental, self.snapshot())
+
+    def test_remove_only_then_add_only(self):
+        self.index(list(range(1, 11)), count=7)
+        indexed = sorted(BookText.objects.values_list('gutenberg_id', flat=True))
+        self.index(list(range(1, 15)), incremental=True, remove=indexed[:3], idf_tolerance=0)
+        self.index(list(range(1, 15)), incremental=True, count=2, idf_tolerance=0)
+        incremental = self.snapshot()
+        final = sorted(incremental['books'])
+        self.assertEqual(len(final), 6)
+        self.assertIn(ISOLATED_BOOK, final)
+        self.assertGreater(incremental['books'][BRIDGE_BOOK][2], 0)
+
+        self.index(final, count=len(final))
+        self.assertSameIndex(incremental, self.snapshot())
@@ -0,0 +1,94 @@
+import random
+from unittest import mock
+
+import numpy as np
+from django.test import SimpleTestCase
+
+from mygutenberg.algorithms import jaccard_bitset
+from mygutenberg.algorithms.jaccard import (
+    compute_jaccard_similarity, compute_jaccard_similarity_for, compute_jaccard_similarity_lsh,
+)
+from mygutenberg.algorithms.minhash import MinHasher, candidate_probability, lsh_parameters
+
+
+def random_corpus(seed, books=60, groups=4):
+    """Livres tirés dans quelques vocabulaires : des paires très proches, d'autres presque disjointes."""
+    rng = random.Random(seed)
+    common = [f'w{i}' for i in range(200)]
+    vocabularies = [[f'g{g}_{i}' for i in range(400)] for g in range(groups)]
+    docs = {}
+    for book_id in rng.sample(range(1, 10 ** 5), books):
+        vocabulary = vocabularies[book_id % groups]
+        words = rng.sample(vocabulary, rng.randint(150, 400)) + rng.sample(common, rng.randint(0, 50))
+        docs[book_id] = {word: rng.randint(1, 9) for word in words}
+    docs[min(docs)] = {}  # livre sans vocabulaire
+    return list(docs), docs
+
+
+class JaccardTests(SimpleTestCase):
+    def test_bitset_matches_sets(self):
+        book_ids, docs = random_corpus(1)
+        for threshold in (0.0, 0.2, 0.5):
+            expected = compute_jaccard_similarity(book_ids, docs, threshold)
+            for workers, block_rows in ((1, 32), (1, 7), (2, 5)):
+                with self.subTest(threshold=threshold, workers=workers, block_rows=block_rows):
+                    result = jaccard_bitset.compute_jaccard_similarity_bitset(book_ids, docs, threshold, workers, block_rows)
+                    self.assertEqual(list(result.items()), list(expected.items()))
+
+    def test_bitset_small_tiles(self):
+        book_ids, docs = random_corpus(2, books=20)
+        expected = compute_jaccard_similarity(book_ids, docs, 0.1)
+        with mock.patch.object(jaccard_bitset, 'TILE_WORDS', 1):
+            result = compute_jaccard_similarity(book_ids, docs, 0.1, engine='bitset', workers=1)
+        self.assertEqual(result, expected)
+
+    def test_popcount_fallback(self):
+        words = np.random.default_rng(3).integers(0, 2 ** 63, size=(5, 9), dtype=np.uint64)
+        expected = [sum(bin(int(word)).count('1') for word in row) for row in words]
+        self.assertEqual(jaccard_bitset.popcount_rows(words).tolist(), expected)
+        self.assertEqual(jaccard_bitset.BYTE_POPCOUNT[words.view(np.uint8)].sum(axis=-1).tolist(), expected)
+
+    def test_unknown_engine(self):
+        with self.assertRaises(ValueError):
+            compute_jaccard_similarity([1, 2], {1: {}, 2: {}}, 0.5, engine='gpu')
+
+    def test_incremental_pairs(self):
+        book_ids, docs = random_corpus(4, books=30)
+        new_ids = book_ids[-6:]
+        book_sets = {book_id: set(docs[book_id]) for book_id in book_ids}
+        expected = {pair: value for pair, value in compute_jaccard_similarity(book_ids, docs, 0.2).items()
+                    if pair[0] in new_ids or pair[1] in new_ids}
+        self.assertEqual(compute_jaccard_similarity_for(new_ids, book_sets, 0.2), expected)
+
+    def test_lsh_pairs_are_exact_and_recall_is_high(self):
+        book_ids, docs = random_corpus(5, books=80)
+        threshold = 0.3
+        exact = compute_jaccard_similarity(book_ids, docs, threshold)
+        approximate = compute_jaccard_similarity_lsh(book_ids, docs, threshold)
+        # Pas de faux positif : chaque paire candidate est vérifiée avec la similarité exacte
+        for (id1, id2), value in approximate.items():
+            self.assertEqual(value, exact.get((id1, id2), exact.get((id2, id1))))
+        self.assertGreaterEqual(len(approximate), 0.95 * len(exact))
+
+    def test_lsh_new_ids(self):
+        book_ids, docs = random_corpus(6, books=40)
+        new_ids = set(book_ids[:5])
+        result = compute_jaccard_similarity_lsh(book_ids, docs, 0.3, new_ids=new_ids)
+        self.assertTrue(all(id1 in new_ids or id2 in new_ids for id1, id2 in result))
+
+    def test_minhash_estimates_similarity(self):
+        hasher = MinHasher(512)
+        for shared in (0, 100, 300, 500):
+            first = {f'a{i}' for i in range(500)}
+            second = {f'a{i}' for i in range(shared)} | {f'b{i}' for i in range(500 - shared)}
+            exact = len(first & second) / len(first | second)
+            estimate = float(np.mean(hasher.signature(first) == hasher.signature(second)))
+            self.assertAlmostEqual(estimate, exact, delta=0.08)
+        self.assertTrue((hasher.signature(set()) == hasher.signature(set())).all())
+
+    def test_lsh_parameters(self):
+        for threshold in (0.2, 0.5, 0.8):
+            bands, rows = lsh_parameters(threshold, 128)
+            self.assertLessEqual(bands * rows, 128)
+            # Les paires bien au-dessus du seuil sont presque toujours candidates
+            self.assertGreater(candidate_probability(min(1.0, threshold + 0.15), bands, rows), 0.95)
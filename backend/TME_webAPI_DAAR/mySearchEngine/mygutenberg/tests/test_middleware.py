@@ -0,0 +1,30 @@
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+
+from mygutenberg.middleware import QueryCountMiddleware
+from mygutenberg.models import BookText
+
+
+def two_queries(request):
+    BookText.objects.count()
+    BookText.objects.exists()
+    return HttpResponse()
+
+
+class QueryCountMiddlewareTests(TestCase):
+    def setUp(self):
+        self.middleware = QueryCountMiddleware(two_queries)
+        self.request = RequestFactory().get('/gutenberg/search/al/')
+
+    @override_settings(DB_QUERY_LOG_THRESHOLD=2)
+    def test_header_without_log_under_threshold(self):
+        with self.assertNoLogs('mygutenberg.middleware', 'INFO'):
+            response = self.middleware(self.request)
+        self.assertEqual(response['X-DB-Queries'], '2')
+
+    @override_settings(DB_QUERY_LOG_THRESHOLD=1)
+    def test_warning_over_threshold(self):
+        with self.assertLogs('mygutenberg.middleware', 'WARNING') as logs:
+            response = self.middleware(self.request)
+        self.assertEqual(response['X-DB-Queries'], '2')
+        self.assertIn('/gutenberg/search/al/ : 2 requête(s) SQL', logs.output[0])
@@ -0,0 +1,64 @@
+import random
+
+from django.test import SimpleTestCase, TestCase
+
+from mygutenberg import trie_snapshot
+from mygutenberg.models import BookText
+from mygutenberg.pagination import PageRequest, select_page
+from mygutenberg.result_cache import search_cache
+
+from .test_trie_snapshot import WORDS, insert_words
+
+URLS = ['/gutenberg/search/a/', '/gutenberg/regex/.*a.*/', '/gutenberg/search_with_ranking/a/occurrences/',
+        '/gutenberg/search_with_suggestions/a/']
+
+
+class SelectPageTests(SimpleTestCase):
+    def test_matches_sorted_slices(self):
+        rng = random.Random(0)
+        book_ids = rng.sample(range(1000), 200)
+        scores = {book_id: rng.randint(0, 20) for book_id in book_ids}  # nombreux ex aequo
+        expected = sorted(book_ids, key=scores.get, reverse=True)
+        self.assertEqual(select_page(book_ids, scores.get, None), expected)
+        for limit, offset in ((1, 0), (7, 3), (50, 180), (20, 300)):
+            self.assertEqual(select_page(book_ids, scores.get, PageRequest(limit, offset)), expected[offset:offset + limit])
+
+
+class PaginatedSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        insert_words(WORDS, random.Random(1))
+        BookText.objects.bulk_create([BookText(gutenberg_id=book_id, title=f'Livre {book_id}') for book_id in range(1, 40)])
+
+    def setUp(self):
+        trie_snapshot.reload_trie_snapshot()
+        search_cache.clear()
+
+    def results(self, response):
+        body = response.json()
+        return body['results'] if isinstance(body, dict) else body
+
+    def test_cursor_pages_concatenate_to_full_results(self):
+        for url in URLS:
+            with self.subTest(url=url):
+                expected = self.results(self.client.get(url))
+                self.assertGreater(len(expected), 7)
+                pages = []
+                response = self.client.get(url, {'limit': 3})
+                while True:
+                    body = response.json()
+                    self.assertEqual(body['total'], len(expected))
+                    pages.extend(body['results'])
+                    if body['next_cursor'] is None:
+                        break
+                    response = self.client.get(url, {'cursor': body['next_cursor']})
+                self.assertEqual(pages, expected)
+                self.assertEqual(self.results(self.client.get(url, {'limit': 2, 'offset': 5})), expected[5:7])
+
+    def test_invalid_parameters(self):
+        cursor = self.client.get(URLS[0], {'limit': 3}).json()['next_cursor']
+        for params in ({'limit': 0}, {'limit': 10 ** 6}, {'offset': -1}, {'limit': 'x'}, {'cursor': 'abc'}):
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get(URLS[0], params).status_code, 400)
+        # Un curseur n'est valable que pour la recherche qui l'a produit
+        self.assertEqual(self.client.get(URLS[1], {'cursor': cursor}).status_code, 400)
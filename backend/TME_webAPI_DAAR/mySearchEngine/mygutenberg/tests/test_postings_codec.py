@@ -0,0 +1,68 @@
+import importlib
+import random
+from array import array
+
+from django.test import SimpleTestCase
+
+from mygutenberg.algorithms import postings_codec
+
+
+def float32(value):
+    return array('f', [value])[0]
+
+
+def random_postings(rng, count, distinct_scores):
+    book_ids = rng.sample(range(1, 80000), count)
+    scores = [(rng.random() * 3, rng.random() * 40) for _ in range(distinct_scores)]
+    return [(book_id, rng.randint(1, 5000), *rng.choice(scores)) for book_id in book_ids]
+
+
+class PostingsCodecTests(SimpleTestCase):
+    def test_round_trip_with_and_without_dictionary(self):
+        rng = random.Random(3)
+        # Peu de couples (tfidf, score) distincts : dictionnaire ; tous distincts : colonnes brutes
+        for distinct_scores in (3, 400):
+            postings = random_postings(rng, 400, distinct_scores)
+            decoded = list(postings_codec.iter_postings(postings_codec.encode_postings(postings)))
+            expected = [(book_id, occurrences, float32(tfidf), float32(score))
+                        for book_id, occurrences, tfidf, score in sorted(postings)]
+            self.assertEqual(decoded, expected)
+
+    def test_empty_and_large_values(self):
+        self.assertEqual(list(postings_codec.iter_postings(postings_codec.encode_postings([]))), [])
+        postings = [(2 ** 31 - 1, 2 ** 30, 0.5, 1.0), (0, 0, 0.0, 0.0)]
+        decoded = list(postings_codec.iter_postings(postings_codec.encode_postings(postings)))
+        self.assertEqual(decoded, sorted(postings))
+
+    def test_negative_book_id_is_rejected(self):
+        with self.assertRaises(ValueError):
+            postings_codec.encode_postings([(-1, 1, 0.0, 0.0)])
+
+    def test_word_data_round_trip(self):
+        rng = random.Random(5)
+        data = {
+            book_id: {'occurrences': occurrences, 'tfidf': tfidf, 'score': score}
+            for book_id, occurrences, tfidf, score in random_postings(rng, 300, 300)
+        }
+        decoded = postings_codec.decode_word_data(postings_codec.encode_word_data(data))
+        self.assertEqual(decoded, {
+            book_id: {'occurrences': entry['occurrences'], 'tfidf': float32(entry['tfidf']), 'score': float32(entry['score'])}
+            for book_id, entry in data.items()
+        })
+
+    def test_ids_round_trip(self):
+        ids = random.Random(7).sample(range(10 ** 6), 1000)
+        self.assertEqual(list(postings_codec.decode_ids(postings_codec.encode_ids(ids))), sorted(ids))
+        self.assertEqual(list(postings_codec.decode_ids(postings_codec.encode_ids([]))), [])
+
+    def test_word_data_matches_frozen_migration_format(self):
+        frozen_codec = importlib.import_module('mygutenberg.migrations.0008_binary_word_data')
+        rng = random.Random(9)
+        for distinct_scores in (3, 300):
+            data = {
+                book_id: {'occurrences': occurrences, 'tfidf': tfidf, 'score': score}
+                for book_id, occurrences, tfidf, score in random_postings(rng, 300, distinct_scores)
+            }
+            encoded = postings_codec.encode_word_data(data)
+            self.assertEqual(frozen_codec._encode_word_data(data), encoded)
+            self.assertEqual(frozen_codec._decode_word_data(encoded), postings_codec.decode_word_data(encoded))
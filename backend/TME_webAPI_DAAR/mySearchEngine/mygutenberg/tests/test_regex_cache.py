@@ -0,0 +1,56 @@
+import threading
+import time
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from mygutenberg import regex_cache as regex_cache_module
+from mygutenberg.regex_cache import compile_regex, regex_cache, warm_regex_cache
+
+
+class RegexCacheTests(SimpleTestCase):
+    def setUp(self):
+        regex_cache.clear()
+
+    @mock.patch.object(regex_cache_module, '_warmed', True)
+    def test_normalized_pattern_is_compiled_once(self):
+        automaton = compile_regex('AB.*')
+        self.assertIs(compile_regex('ab.*'), automaton)
+        self.assertEqual(regex_cache.stats()['size'], 1)
+
+    @mock.patch.object(regex_cache_module, '_warmed', True)
+    def test_warm_up_skips_invalid_patterns(self):
+        with self.assertLogs('mygutenberg.regex_cache', 'WARNING'):
+            self.assertEqual(warm_regex_cache(['ab.*', 'a)', '.*cd']), 2)
+        self.assertEqual(regex_cache.stats()['size'], 2)
+
+    @mock.patch.object(regex_cache_module, '_warmed', False)
+    @override_settings(REGEX_WARM_PATTERNS=['ab.*', '.*cd'])
+    def test_first_search_warms_the_cache_once(self):
+        compile_regex('x.*')
+        self.assertEqual(regex_cache.stats()['size'], 3)
+        regex_cache.clear()
+        compile_regex('y.*')
+        self.assertEqual(regex_cache.stats()['size'], 1)
+
+    @mock.patch.object(regex_cache_module, '_warmed', False)
+    @override_settings(REGEX_WARM_PATTERNS=['ab.*', '.*cd'])
+    def test_concurrent_first_searches_warm_the_cache_once(self):
+        barrier = threading.Barrier(8)
+
+        def search(index):
+            barrier.wait()
+            compile_regex(f'x{index}.*')
+
+        def slow_warm():
+            time.sleep(0.05)  # les autres recherches arrivent pendant le préchauffage
+            return warm_regex_cache()
+
+        with mock.patch.object(regex_cache_module, 'warm_regex_cache', side_effect=slow_warm) as warm:
+            threads = [threading.Thread(target=search, args=(index,)) for index in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(warm.call_count, 1)
+        self.assertEqual(regex_cache.stats()['size'], 10)
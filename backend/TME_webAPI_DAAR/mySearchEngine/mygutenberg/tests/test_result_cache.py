@@ -0,0 +1,102 @@
+import random
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from mygutenberg import result_cache, trie_snapshot
+from mygutenberg.generation import index_generation
+from mygutenberg.models import BookText, IndexGeneration
+from mygutenberg.result_cache import ResultCache, search_cache
+
+from .test_trie_snapshot import WORDS, insert_words
+
+
+class ResultCacheTests(SimpleTestCase):
+    def test_lru_eviction(self):
+        cache = ResultCache(3)
+        for key in 'abc':
+            cache.put(key, key.upper())
+        self.assertEqual(cache.get('a'), 'A')  # 'a' devient la plus récente
+        cache.put('d', 'D')
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual([cache.get(key) for key in 'acd'], ['A', 'C', 'D'])
+        stats = cache.stats()
+        self.assertEqual((stats['size'], stats['hits'], stats['misses'], stats['evictions']), (3, 4, 1, 1))
+
+    def test_ttl(self):
+        cache = ResultCache(10, ttl=30)
+        with mock.patch.object(result_cache.time, 'monotonic', return_value=100.0):
+            cache.put('a', 1)
+        with mock.patch.object(result_cache.time, 'monotonic', return_value=129.0):
+            self.assertEqual(cache.get('a'), 1)
+        with mock.patch.object(result_cache.time, 'monotonic', return_value=131.0):
+            self.assertIsNone(cache.get('a'))
+
+    def test_generation_change_clears_entries(self):
+        generation = [1]
+        cache = ResultCache(10, generation_source=lambda: generation[0])
+        cache.put('a', 1)
+        self.assertEqual(cache.get('a'), 1)
+        generation[0] = 2
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.stats()['generation'], 2)
+
+    def test_value_computed_across_a_generation_change_is_not_cached(self):
+        generation = [1]
+        cache = ResultCache(10, generation_source=lambda: generation[0])
+
+        def compute():
+            generation[0] = 2  # nouvelle génération publiée pendant le calcul
+            return 'ancien'
+
+        self.assertEqual(cache.get_or_compute('k', compute), 'ancien')
+        self.assertIsNone(cache.get('k'))
+
+    def test_get_or_compute(self):
+        cache = ResultCache(10)
+        compute = mock.Mock(return_value={'x': 1})
+        self.assertEqual(cache.get_or_compute('k', compute), {'x': 1})
+        self.assertEqual(cache.get_or_compute('k', compute), {'x': 1})
+        compute.assert_called_once()
+        ResultCache(0).get_or_compute('k', compute)  # taille 0 : cache désactivé
+        self.assertEqual(compute.call_count, 2)
+
+
+@override_settings(INDEX_GENERATION_CHECK_INTERVAL=0)
+class SearchCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        insert_words(WORDS, random.Random(1))
+        BookText.objects.bulk_create([BookText(gutenberg_id=book_id, title=f'Livre {book_id}') for book_id in range(1, 40)])
+
+    def setUp(self):
+        trie_snapshot.reload_trie_snapshot()
+        search_cache.clear()
+
+    def test_normalized_keywords_share_an_entry(self):
+        first = self.client.get('/gutenberg/search/al ca/').json()
+        hits = search_cache.stats()['hits']
+        self.assertEqual(self.client.get('/gutenberg/search/al,ca/').json(), first)
+        self.assertEqual(search_cache.stats()['hits'], hits + 1)
+
+    def test_new_generation_invalidates_results(self):
+        before = self.client.get('/gutenberg/search/qua/').json()
+        self.assertEqual(before, [])
+        insert_words(['quartz'], random.Random(2))
+        self.assertEqual(self.client.get('/gutenberg/search/qua/').json(), before)
+        IndexGeneration.publish()
+        self.assertNotEqual(self.client.get('/gutenberg/search/qua/').json(), before)
+
+    @override_settings(INDEX_GENERATION_CHECK_INTERVAL=60)
+    def test_caches_share_the_index_generation(self):
+        before = self.client.get('/gutenberg/search/qua/').json()
+        insert_words(['quartz'], random.Random(2))
+        generation = IndexGeneration.publish()
+        # Sur l'intervalle de vérification, ni l'instantané ni les résultats ne changent de génération
+        self.assertEqual(self.client.get('/gutenberg/search/qua/').json(), before)
+        self.assertNotEqual(trie_snapshot.get_trie_snapshot().generation, generation)
+        # Dès que la génération est relue, tous les caches la voient en même temps
+        index_generation.refresh()
+        self.assertNotEqual(self.client.get('/gutenberg/search/qua/').json(), before)
+        self.assertEqual(trie_snapshot.get_trie_snapshot().generation, generation)
+        self.assertEqual(search_cache.stats()['generation'], generation)
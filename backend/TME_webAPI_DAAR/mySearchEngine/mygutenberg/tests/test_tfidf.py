@@ -0,0 +1,62 @@
+import random
+from collections import Counter
+
+from django.test import SimpleTestCase
+
+from mygutenberg.algorithms.tfidf import index_document, index_document_naive
+from mygutenberg.algorithms.tfidf_matrix import build_tfidf_matrix
+
+
+def random_corpus(seed, books=12):
+    """Livres tirés dans un petit vocabulaire, avec des mots de titre et d'auteur parfois absents du texte."""
+    rng = random.Random(seed)
+    vocabulary = [f'mot{i}' for i in range(300)]
+    docs = {}
+    title_author_words = {}
+    for book_id in rng.sample(range(1, 10 ** 5), books):
+        words = rng.sample(vocabulary, rng.randint(20, 120))
+        docs[book_id] = [rng.choice(words) for _ in range(rng.randint(200, 2000))]
+        title_author_words[book_id] = (rng.sample(vocabulary, 3), rng.sample(vocabulary, 2))
+    return docs, title_author_words, vocabulary
+
+
+def document_frequencies(docs):
+    frequencies = Counter()
+    for words in docs.values():
+        frequencies.update(set(words))
+    return frequencies
+
+
+class TfidfTests(SimpleTestCase):
+    def test_one_pass_index_matches_naive(self):
+        docs, title_author_words, _ = random_corpus(1)
+        frequencies = document_frequencies(docs)
+        for book_id, words in docs.items():
+            title_words, author_words = title_author_words[book_id]
+            self.assertEqual(
+                index_document(words, len(docs), frequencies, title_words, author_words),
+                index_document_naive(words, len(docs), frequencies, title_words, author_words),
+            )
+
+    def test_matrix_matches_per_book_index(self):
+        docs, title_author_words, vocabulary = random_corpus(2)
+        matrix = build_tfidf_matrix(docs, vocabulary, title_author_words)
+        frequencies = document_frequencies(docs)
+        self.assertEqual(matrix.shape, (len(docs), len(vocabulary)))
+        for book_id, words in docs.items():
+            title_words, author_words = title_author_words[book_id]
+            expected = index_document(words, len(docs), frequencies, title_words, author_words)
+            result = matrix.document_index(book_id)
+            self.assertEqual(set(result), set(expected))
+            for word, entry in expected.items():
+                self.assertEqual(result[word]['occurrences'], entry['occurrences'])
+                self.assertAlmostEqual(result[word]['tfidf'], entry['tfidf'], places=12)
+                self.assertAlmostEqual(result[word]['score'], entry['score'], places=12)
+
+    def test_matrix_columns(self):
+        docs, title_author_words, vocabulary = random_corpus(3, books=5)
+        matrix = build_tfidf_matrix(docs, vocabulary, title_author_words)
+        for word, book_ids, occurrences, _, _ in matrix.iter_columns():
+            self.assertEqual(list(book_ids), sorted(book_ids, key=list(docs).index))
+            self.assertEqual(list(occurrences), [docs[int(book_id)].count(word) for book_id in book_ids])
+        self.assertEqual(matrix.term_id('absent'), -1)
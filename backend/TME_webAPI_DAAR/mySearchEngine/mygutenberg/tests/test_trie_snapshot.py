@@ -0,0 +1,151 @@
+import random
+
+from django.test import TestCase, override_settings
+
+from mygutenberg import trie_snapshot
+from mygutenberg.algorithms.automaton import GlushkovMatcher
+from mygutenberg.management.commands.populate_and_index_books import save_trigram_index
+from mygutenberg.models import BookText, IndexGeneration, Posting, TrieNode
+from mygutenberg.regex_cache import regex_cache
+from mygutenberg.result_cache import search_cache
+from mygutenberg.trie_snapshot import TrieSnapshot, get_trie_snapshot
+from mygutenberg.views import aggregate_prefix_results
+
+WORDS = ['a', 'alice', 'alien', 'align', 'all', 'alley', 'ball', 'balloon', 'bat', 'battle', 'cat', 'cattle', 'zoo']
+
+
+def insert_words(words, rng):
+    """Crée les noeuds du Trie des mots donnés, avec leurs postings ; renvoie {mot: TrieNode de fin}."""
+    nodes = {}
+    end_nodes = {}
+    for word in words:
+        parent = None
+        for length in range(1, len(word) + 1):
+            prefix = word[:length]
+            if prefix not in nodes:
+                nodes[prefix] = TrieNode.objects.create(parent=parent, char=word[length - 1])
+            parent = nodes[prefix]
+        parent.is_end_of_word = True
+        parent.save(update_fields=['is_end_of_word'])
+        end_nodes[word] = parent
+    Posting.objects.bulk_create([
+        Posting(term=node, gutenberg_id=book_id, occurrences=rng.randint(1, 50), tfidf=rng.random() / 3, score=rng.random() * 7)
+        for node in end_nodes.values() for book_id in rng.sample(range(1, 40), rng.randint(1, 8))
+    ])
+    return end_nodes
+
+
+class TrieSnapshotTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.end_nodes = insert_words(WORDS, random.Random(1))
+        # 'bat' reste une fin de mot sans posting, comme un mot dont tous les livres ont été retirés
+        Posting.objects.filter(term=cls.end_nodes['bat']).delete()
+        save_trigram_index(cls.end_nodes)
+        BookText.objects.bulk_create([BookText(gutenberg_id=book_id, title=f'Livre {book_id}') for book_id in range(1, 40)])
+
+    def assertScoreEqual(self, score, expected):
+        # Sommes en double précision, dans un ordre qui peut différer de celui de SQLite
+        self.assertAlmostEqual(score, expected, places=9)
+
+    def setUp(self):
+        trie_snapshot.reload_trie_snapshot()
+        search_cache.clear()
+
+    def prefixes(self):
+        return sorted({word[:length] for word in WORDS for length in range(1, len(word) + 1)}) + ['', 'x', 'alicex', 'Ali']
+
+    def test_search_by_prefix_matches_database(self):
+        snapshot = TrieSnapshot.from_database(1)
+        for prefix in self.prefixes():
+            with self.subTest(prefix=prefix):
+                self.assertEqual(snapshot.search_by_prefix(prefix), TrieNode.search_by_prefix(prefix))
+
+    def test_prefix_queries_are_one_query(self):
+        for prefix in ('a', 'al', 'battle', 'x'):
+            with self.subTest(prefix=prefix), self.assertNumQueries(2):
+                TrieNode.search_by_prefix(prefix)
+                TrieNode.aggregate_prefix(prefix)
+
+    def test_aggregate_prefix_matches_database(self):
+        for prefix in self.prefixes():
+            with self.subTest(prefix=prefix):
+                aggregated = aggregate_prefix_results([prefix])
+                search_cache.clear()
+                with override_settings(TRIE_SNAPSHOT_ENABLED=False):
+                    expected = {int(book_id): entry for book_id, entry in aggregate_prefix_results([prefix]).items()}
+                self.assertEqual(set(aggregated), set(expected))
+                for book_id, entry in aggregated.items():
+                    self.assertScoreEqual(entry['score'], expected[book_id]['score'])
+                    self.assertEqual(entry['occurrences'], expected[book_id]['occurrences'])
+
+    def test_structure_and_trigrams(self):
+        snapshot = TrieSnapshot.from_database(1)
+        self.assertEqual(snapshot.words, sorted(WORDS))
+        self.assertEqual(snapshot.term_count, len(WORDS))
+        self.assertEqual(snapshot.node_count, TrieNode.objects.count())
+        self.assertEqual(snapshot.posting_count, Posting.objects.count())
+        self.assertEqual(set(snapshot.trigram_index), {word[i:i + 3] for word in WORDS for i in range(len(word) - 2)})
+        for trigram, terms in snapshot.trigram_index.items():
+            self.assertEqual(sorted(snapshot.words[term] for term in terms), sorted(word for word in WORDS if trigram in word))
+
+    def test_subtree_rows_without_postings(self):
+        snapshot = TrieSnapshot.from_rows(None, TrieNode.subtree_rows(['a', 'c']))
+        self.assertEqual(snapshot.words, sorted(word for word in WORDS if word[0] in 'ac'))
+        self.assertEqual(snapshot.posting_count, 0)
+
+    def test_regex_search_with_and_without_snapshot(self):
+        for regex in ('al.*', 'ba(l|t)*', 'b.*o.*', '.*tt.*', 'zz'):
+            with self.subTest(regex=regex):
+                response = self.client.get(f'/gutenberg/regex/{regex}/')
+                search_cache.clear()
+                with override_settings(TRIE_SNAPSHOT_ENABLED=False):
+                    database = self.client.get(f'/gutenberg/regex/{regex}/')
+                self.assertIn('X-DB-Queries', database)
+                results = {book['id']: book for book in response.json()}
+                expected = {book['id']: book for book in database.json()}
+                self.assertEqual(set(results), set(expected))
+                self.assertEqual(bool(expected), regex != 'zz')
+                for book_id, book in expected.items():
+                    self.assertEqual(results[book_id]['matches'], book['matches'])
+                    self.assertScoreEqual(results[book_id]['score'], book['score'])
+
+    def test_regex_over_state_budget_falls_back_to_glushkov(self):
+        expected = self.client.get('/gutenberg/regex/a.*l.*e.*n/').json()
+        for enabled in (True, False):
+            with self.subTest(snapshot=enabled), override_settings(TRIE_SNAPSHOT_ENABLED=enabled, REGEX_MAX_DFA_STATES=3):
+                search_cache.clear()
+                regex_cache.clear()
+                response = self.client.get('/gutenberg/regex/a.*l.*e.*n/')
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.json(), expected)
+                # Le DFA hors budget a été remplacé dans le cache des automates
+                self.assertIsInstance(regex_cache.get('a.*l.*e.*n'), GlushkovMatcher)
+
+    @override_settings(REGEX_MAX_DFA_STATES=3)
+    def test_long_regex_over_state_budget_is_rejected(self):
+        regex = 'a.*l.*e.*n.*' * 10  # 80 positions : au-delà du moteur de Glushkov
+        for enabled in (True, False):
+            with self.subTest(snapshot=enabled), override_settings(TRIE_SNAPSHOT_ENABLED=enabled):
+                self.assertEqual(self.client.get(f'/gutenberg/regex/{regex}/').status_code, 400)
+                self.assertIsNone(regex_cache.get(regex))
+
+    @override_settings(INDEX_GENERATION_CHECK_INTERVAL=60)
+    def test_keyword_search_without_queries(self):
+        self.client.get('/gutenberg/search/al/')
+        # Instantané et catalogue déjà chargés : aucune requête SQL, même pour hydrater les livres
+        response = self.client.get('/gutenberg/search/al/')
+        self.assertEqual(response['X-DB-Queries'], '0')
+        expected = aggregate_prefix_results(['al'])
+        self.assertEqual({book['id'] for book in response.json()}, set(expected))
+        for book in response.json():
+            self.assertEqual(book['title'], f"Livre {book['id']}")
+            self.assertEqual(book['occurrences'], expected[book['id']]['occurrences'])
+
+    @override_settings(INDEX_GENERATION_CHECK_INTERVAL=0)
+    def test_reload_on_new_generation(self):
+        self.assertEqual(get_trie_snapshot().words, sorted(WORDS))
+        insert_words(['zebra'], random.Random(2))
+        self.assertNotIn('zebra', get_trie_snapshot().words)
+        IndexGeneration.publish()
+        self.assertIn('zebra', get_trie_snapshot().words)
@@ -0,0 +1,49 @@
+"""Découpage en mots et comptage des termes des livres, dans un pool de processus.
+
+Chaque processus charge les listes blanches une seule fois (init_worker), puis lit
+lui-même le texte du livre dans le stock local (corpus_store) : seuls le chemin du
+stock et l'identifiant du livre lui sont envoyés, et seules les fréquences de termes
+{mot: occurrences} du livre reviennent au processus principal, jamais le texte.
+
+Ce module n'utilise pas l'ORM, pour pouvoir être importé tel quel par des processus
+démarrés sans fork.
+"""
+import os
+import re
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from mygutenberg.corpus_store import CorpusStore
+
+WORD_SPLIT = re.compile(r'[^A-Za-z]+')
+
+_whitelists = {}
+
+
+def load_whitelist(path):
+    with open(path, 'r') as f:
+        return set(line.strip().lower() for line in f if len(line.strip()) > 2)
+
+
+def init_worker(whitelist_paths):
+    """Charge les listes blanches {langue: chemin} dans le processus."""
+    for language, path in whitelist_paths.items():
+        _whitelists[language] = load_whitelist(path)
+
+
+def count_terms(text, language):
+    """Fréquences des mots de la liste blanche de la langue et nombre total de mots retenus."""
+    whitelist = _whitelists[language]
+    counts = Counter(w for w in WORD_SPLIT.split(text.lower()) if w in whitelist and len(w) > 2)
+    return dict(counts), sum(counts.values())
+
+
+def count_stored_book_terms(store_root, book_id, language):
+    """count_terms sur le texte du livre lu dans le stock."""
+    return count_terms(CorpusStore(store_root).load(book_id).text, language)
+
+
+def make_pool(whitelist_paths, workers=None):
+    """Pool de processus de découpage ; workers par défaut : nombre de processeurs."""
+    paths = {language: os.path.abspath(path) for language, path in whitelist_paths.items()}
+    return ProcessPoolExecutor(max_workers=workers or os.cpu_count(), initializer=init_worker, initargs=(paths,))
@@ -0,0 +1,244 @@
+"""Instantané en mémoire, en lecture seule, du Trie stocké dans la table TrieNode.
+
+Les noeuds sont rangés en ordre préfixe dans des tableaux : le sous-arbre d'un
+noeud occupe l'intervalle [n, subtree_end[n]) et les mots qu'il contient forment
+un intervalle contigu d'identifiants de termes. Une recherche par préfixe se
+résume donc à une descente de len(prefix) noeuds suivie d'un parcours linéaire
+des postings, sans aucune requête SQL.
+
+Les postings sont lus dans la table Posting, seule source des postings : l'instantané et
+les requêtes SQL de TrieNode (search_by_prefix, aggregate_prefix, postings_by_term)
+renvoient donc toujours les mêmes résultats pour une génération donnée. tfidf et score
+sont gardés en double précision, comme les colonnes FloatField lues par SQLite.
+"""
+import logging
+import time
+from array import array
+from collections import defaultdict
+
+from mygutenberg.algorithms.postings_codec import decode_ids
+from mygutenberg.generation import GenerationCache
+from mygutenberg.models import Posting, TrieNode, Trigram
+
+logger = logging.getLogger(__name__)
+
+
+class TrieSnapshot:
+    def __init__(self, generation, chars, subtree_end, term_start, words, term_node_ids,
+                 posting_offsets, posting_books, posting_occurrences, posting_tfidf, posting_scores):
+        self.generation = generation
+        self.chars = chars                      # caractère de chaque noeud (le noeud 0 est une racine virtuelle)
+        self.subtree_end = subtree_end          # fin (exclue) du sous-arbre de chaque noeud
+        self.term_start = term_start            # nombre de fins de mot strictement avant chaque noeud
+        self.words = words                      # mot complet de chaque terme, en ordre préfixe
+        self.term_node_ids = term_node_ids      # identifiant TrieNode de chaque terme
+        self.posting_offsets = posting_offsets  # postings du terme t : [offsets[t], offsets[t + 1])
+        self.posting_books = posting_books
+        self.posting_occurrences = posting_occurrences
+        self.posting_tfidf = posting_tfidf
+        self.posting_scores = posting_scores
+        self.trigram_index = None               # trigramme -> identifiants de termes (None : index absent)
+
+    @property
+    def node_count(self):
+        return len(self.chars) - 1
+
+    @property
+    def term_count(self):
+        return len(self.words)
+
+    @property
+    def posting_count(self):
+        return len(self.posting_books)
+
+    @classmethod
+    def from_database(cls, generation):
+        """Construit l'instantané à partir des tables TrieNode, Posting et Trigram (une requête chacune)."""
+        rows = TrieNode.objects.values_list('id', 'parent_id', 'char', 'is_end_of_word').iterator(chunk_size=10000)
+        postings = Posting.objects.order_by('term_id', 'gutenberg_id').values_list(
+            'term_id', 'gutenberg_id', 'occurrences', 'tfidf', 'score'
+        ).iterator(chunk_size=10000)
+        snapshot = cls.from_rows(generation, rows, postings)
+        snapshot.load_trigram_index(Trigram.objects.values_list('trigram', 'term_ids').iterator(chunk_size=10000))
+        return snapshot
+
+    def load_trigram_index(self, rows):
+        """Charge l'index de trigrammes à partir de couples (trigramme, TrieNode encodés) en identifiants de termes."""
+        term_of_node = {node_id: term for term, node_id in enumerate(self.term_node_ids)}
+        index = {}
+        for trigram, term_ids in rows:
+            index[trigram] = array('i', (term_of_node[node_id] for node_id in decode_ids(term_ids) if node_id in term_of_node))
+        self.trigram_index = index or None
+
+    @classmethod
+    def from_rows(cls, generation, rows, postings=()):
+        """Construit l'instantané à partir de tuples (id, parent_id, char, is_end_of_word) et de postings
+        (term_id, gutenberg_id, occurrences, tfidf, score) triés par term_id.
+
+        Sans postings, seule la structure du Trie est construite.
+        """
+        children = defaultdict(list)
+        end_node_ids = set()
+        for node_id, parent_id, char, is_end_of_word in rows:
+            children[parent_id].append((char, node_id))
+            if is_end_of_word:
+                end_node_ids.add(node_id)
+
+        # Parcours en profondeur itératif, enfants visités par ordre alphabétique
+        chars = ['\0']
+        parents = [-1]
+        node_words = ['']
+        end_nodes = []
+        stack = [(char, node_id, 0) for char, node_id in sorted(children[None], reverse=True)]
+        while stack:
+            char, node_id, parent_index = stack.pop()
+            index = len(chars)
+            chars.append(char)
+            parents.append(parent_index)
+            node_words.append(node_words[parent_index] + char)
+            if node_id in end_node_ids:
+                end_nodes.append((index, node_id))
+            stack.extend((c, child_id, index) for c, child_id in sorted(children.pop(node_id, ()), reverse=True))
+
+        node_total = len(chars)
+        sizes = array('i', [1]) * node_total
+        for index in range(node_total - 1, 0, -1):
+            sizes[parents[index]] += sizes[index]
+        subtree_end = array('i', (index + sizes[index] for index in range(node_total)))
+
+        term_start = array('i', [0]) * (node_total + 1)
+        is_end = bytearray(node_total)
+        for index, _ in end_nodes:
+            is_end[index] = 1
+        count = 0
+        for index in range(node_total):
+            term_start[index] = count
+            count += is_end[index]
+        term_start[node_total] = count
+
+        # Postings lus dans l'ordre des term_id, puis recopiés dans l'ordre préfixe des termes
+        ranges = {}
+        read_books = array('i')
+        read_occurrences = array('i')
+        read_tfidf = array('d')
+        read_scores = array('d')
+        current_id, start = None, 0
+        for term_id, book_id, occurrences, tfidf, score in postings:
+            if term_id != current_id:
+                if current_id is not None:
+                    ranges[current_id] = (start, len(read_books))
+                current_id, start = term_id, len(read_books)
+            read_books.append(book_id)
+            read_occurrences.append(occurrences)
+            read_tfidf.append(tfidf)
+            read_scores.append(score)
+        if current_id is not None:
+            ranges[current_id] = (start, len(read_books))
+
+        words = []
+        term_node_ids = array('q')
+        posting_offsets = array('i', [0])
+        posting_books = array('i')
+        posting_occurrences = array('i')
+        posting_tfidf = array('d')
+        posting_scores = array('d')
+        for index, node_id in end_nodes:
+            words.append(node_words[index])
+            term_node_ids.append(node_id)
+            if node_id in ranges:
+                first, last = ranges[node_id]
+                posting_books.extend(read_books[first:last])
+                posting_occurrences.extend(read_occurrences[first:last])
+                posting_tfidf.extend(read_tfidf[first:last])
+                posting_scores.extend(read_scores[first:last])
+            posting_offsets.append(len(posting_books))
+
+        return cls(generation, ''.join(chars), subtree_end, term_start, words, term_node_ids,
+                   posting_offsets, posting_books, posting_occurrences, posting_tfidf, posting_scores)
+
+    def find_node(self, prefix):
+        """Renvoie l'indice du noeud atteint en suivant le préfixe, ou -1."""
+        chars = self.chars
+        subtree_end = self.subtree_end
+        node = 0
+        for char in prefix:
+            child = node + 1
+            end = subtree_end[node]
+            while child < end and chars[child] < char:
+                child = subtree_end[child]
+            if child >= end or chars[child] != char:
+                return -1
+            node = child
+        return node
+
+    def term_at(self, node):
+        """Identifiant du terme qui se termine au noeud, ou -1."""
+        term = self.term_start[node]
+        return term if self.term_start[node + 1] > term else -1
+
+    def prefix_terms(self, prefix):
+        """Intervalle [début, fin) des termes commençant par le préfixe."""
+        prefix = prefix.lower()
+        node = self.find_node(prefix) if prefix else -1
+        if node < 0:
+            return 0, 0
+        return self.term_start[node], self.term_start[self.subtree_end[node]]
+
+    def search_by_prefix(self, prefix):
+        """Équivalent de TrieNode.search_by_prefix : liste de {'word', 'data'}, mots sans posting exclus."""
+        first, last = self.prefix_terms(prefix)
+        results = []
+        for term in range(first, last):
+            data = {}
+            for position in range(self.posting_offsets[term], self.posting_offsets[term + 1]):
+                data[self.posting_books[position]] = {
+                    'occurrences': self.posting_occurrences[position],
+                    'tfidf': self.posting_tfidf[position],
+                    'score': self.posting_scores[position],
+                }
+            if data:
+                results.append({'word': self.words[term], 'data': data})
+        return results
+
+    def aggregate_prefix(self, prefix, aggregated_results):
+        """Ajoute score et occurrences de tous les mots du préfixe dans aggregated_results."""
+        first, last = self.prefix_terms(prefix)
+        return self.aggregate_terms(first, last, aggregated_results)
+
+    def aggregate_term(self, term, aggregated_results, occurrences_key='occurrences'):
+        """Ajoute score et occurrences d'un seul terme dans aggregated_results."""
+        return self.aggregate_terms(term, term + 1, aggregated_results, occurrences_key)
+
+    def aggregate_terms(self, first, last, aggregated_results, occurrences_key='occurrences'):
+        """Ajoute score et occurrences des termes [first, last) dans aggregated_results."""
+        books = self.posting_books
+        occurrences = self.posting_occurrences
+        scores = self.posting_scores
+        for position in range(self.posting_offsets[first], self.posting_offsets[last]):
+            entry = aggregated_results[books[position]]
+            entry['score'] += scores[position]
+            entry[occurrences_key] += occurrences[position]
+        return aggregated_results
+
+
+def _load_trie_snapshot(generation):
+    start = time.time()
+    snapshot = TrieSnapshot.from_database(generation)
+    logger.info(
+        f"Instantané du Trie chargé (génération {snapshot.generation}) : {snapshot.node_count} noeuds, "
+        f"{snapshot.term_count} termes, {snapshot.posting_count} postings en {time.time() - start:.2f}s"
+    )
+    return snapshot
+
+
+_snapshot_cache = GenerationCache(_load_trie_snapshot)
+
+
+def get_trie_snapshot():
+    """Renvoie l'instantané courant, rechargé si une nouvelle génération d'index a été publiée."""
+    return _snapshot_cache.get()
+
+
+def reload_trie_snapshot():
+    """Reconstruit l'instantané depuis la base et remplace l'instantané courant."""
+    return _snapshot_cache.reload()
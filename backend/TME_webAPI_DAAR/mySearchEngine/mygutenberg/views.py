@@ -3,16 +3,73 @@ import re
 from collections import defaultdict
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from django.http import Http404
-from django.db import models
-from mygutenberg.models import BookText, TrieNode, TableJaccard
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.conf import settings
+from mygutenberg.models import BookText, TrieNode
 from mygutenberg.clean_content import nettoyer_texte
-from mygutenberg.algorithms.automaton import build_dfa_from_regex
+from mygutenberg.corpus_store import get_corpus_store
+from mygutenberg.content_range import ContentRangeError, RangeNotSatisfiable, etag_matches, parse_query_range, parse_range_header
+from mygutenberg.gutenberg_client import GutenbergClient
+from mygutenberg.algorithms.automaton import TRIGRAM_ANY, DFABudgetExceeded, LazyDFA, RegexTooComplex
+from mygutenberg.algorithms.trigram import evaluate_query
+from mygutenberg.trie_snapshot import TrieSnapshot, get_trie_snapshot
+from mygutenberg.catalog import get_catalog, hydrate
+from mygutenberg.result_cache import search_cache
+from mygutenberg.regex_cache import compile_regex, fallback_regex, regex_cache
+from mygutenberg.pagination import PageRequest, PaginationError, page_info, parse_page_request, select_page
 from urllib.parse import unquote
 
 import logging
 logger = logging.getLogger(__name__)
 
+def aggregate_prefix_results(prefixes):
+    """Agrège score et occurrences par livre pour tous les mots commençant par l'un des préfixes.
+
+    Le résultat est mis en cache (mygutenberg.result_cache) par liste de préfixes normalisée.
+    """
+    prefixes = tuple(prefixes)
+    return search_cache.get_or_compute(('prefix', prefixes), lambda: _aggregate_prefix_results(prefixes))
+
+def _aggregate_prefix_results(prefixes):
+    aggregated_results = defaultdict(lambda: {'score': 0.0, 'occurrences': 0})
+    if getattr(settings, 'TRIE_SNAPSHOT_ENABLED', True):
+        snapshot = get_trie_snapshot()
+        for prefix in prefixes:
+            snapshot.aggregate_prefix(prefix, aggregated_results)
+        return dict(aggregated_results)
+
+    for prefix in prefixes:
+        for book_id, score, occurrences in TrieNode.aggregate_prefix(prefix):
+            aggregated_results[book_id]['score'] += score
+            aggregated_results[book_id]['occurrences'] += occurrences
+    return dict(aggregated_results)
+
+def rank_book_ids(aggregated_results, sort_by, page):
+    """Identifiants des livres trouvés, triés par sort_by décroissant et restreints à la page demandée.
+
+    Renvoie (identifiants, nombre total de livres trouvés).
+    """
+    catalog = get_catalog()
+    book_ids = [book_id for book_id in aggregated_results if catalog.get(book_id) is not None]
+    if sort_by in ('closeness', 'betweenness'):
+        key = lambda book_id: getattr(catalog.get(book_id), sort_by)
+    else:
+        key = lambda book_id: aggregated_results[book_id][sort_by]
+    return select_page(book_ids, key, page), len(book_ids)
+
+def rank_results(aggregated_results, sort_by, page, fields=('score', 'occurrences'), with_centralities=False):
+    """Comme rank_book_ids, mais hydrate les livres de la page : renvoie (résultats, total)."""
+    book_ids, total = rank_book_ids(aggregated_results, sort_by, page)
+    return hydrate(aggregated_results, fields, with_centralities, book_ids=book_ids), total
+
+def paginated_response(request, page, response, total):
+    """Sans pagination, la réponse garde son format historique ; sinon elle est enveloppée avec total et curseur."""
+    if page is None:
+        return Response(response)
+    if not isinstance(response, dict):
+        response = {'results': response}
+    return Response({**response, **page_info(request, page, total)})
+
 class BooksList(APIView):
     def get(self, request, format=None):
         books = BookText.objects.all()
@@ -31,8 +88,12 @@ class BookDetail(APIView):
     def get(self, request, pk, format=None):
         try:
             book = BookText.objects.get(gutenberg_id=pk)
-            text_url = f'http://gutenberg.org/ebooks/{pk}.txt.utf-8'
-            content = requests.get(text_url).text
+            try:
+                content = get_corpus_store().load(pk).cleaned()
+            except KeyError:
+                # Livre absent du stock local : téléchargement et nettoyage à la volée
+                text_url = getattr(settings, 'GUTENBERG_TEXT_URL', 'http://gutenberg.org/ebooks/{book_id}.txt.utf-8').format(book_id=pk)
+                content = nettoyer_texte(requests.get(text_url).text)
             return Response({
                 'id': book.gutenberg_id,
                 'title': book.title,
@@ -40,7 +101,7 @@ class BookDetail(APIView):
                 'language': book.language,
                 'cover_url': f'https://gutenberg.org/files/{book.gutenberg_id}/{book.gutenberg_id}-h/images/cover.jpg',
                 'word_count': book.word_count,
-                'content': nettoyer_texte(content),
+                'content': content,
                 'closeness': book.closeness_centrality,
                 'betweenness': book.betweenness_centrality
             })
@@ -49,6 +110,65 @@ class BookDetail(APIView):
         except requests.RequestException:
             return Response({'error': 'Unable to fetch content'}, status=500)
 
+class BookContent(APIView):
+    """Contenu nettoyé d'un livre en text/plain, envoyé en flux par morceaux depuis le stock local.
+
+    Une partie seulement peut être demandée par ?offset=&length= (octets), ?paragraph=&count=
+    ou l'en-tête Range (réponse 206). ETag sur le contenu : If-None-Match renvoie 304 et
+    If-Range fait ignorer Range si le contenu a changé.
+    """
+    def get(self, request, pk, format=None):
+        if not BookText.objects.filter(gutenberg_id=pk).exists():
+            raise Http404
+        store = get_corpus_store()
+        try:
+            header = store.header(pk)
+        except KeyError:
+            # Livre absent du stock local : téléchargé une fois, puis servi depuis le stock
+            try:
+                GutenbergClient(store=store).fetch_text(pk)
+            except requests.RequestException:
+                return Response({'error': 'Unable to fetch content'}, status=500)
+            header = store.header(pk)
+
+        etag = f'"{header["etag"]}"'
+        byte_start, byte_end = header['content_bytes']
+        total = byte_end - byte_start
+        if etag_matches(request.headers.get('If-None-Match'), etag):
+            response = HttpResponse(status=304)
+            response['ETag'] = etag
+            return response
+
+        status = 200
+        try:
+            content_range = parse_query_range(request.query_params, header['paragraphs'], total)
+            if content_range is None and request.headers.get('Range'):
+                if_range = request.headers.get('If-Range')
+                if not if_range or etag_matches(if_range, etag):
+                    content_range = parse_range_header(request.headers['Range'], total)
+                    status = 206 if content_range is not None else 200
+        except RangeNotSatisfiable as e:
+            response = Response({'error': str(e)}, status=416)
+            response['Content-Range'] = f'bytes */{total}'
+            return response
+        except ContentRangeError as e:
+            return Response({'error': str(e)}, status=400)
+
+        start, end = (0, total) if content_range is None else content_range[:2]
+        response = StreamingHttpResponse(store.iter_content(pk, start, end), status=status, content_type='text/plain; charset=utf-8')
+        response['Content-Length'] = str(end - start)
+        response['ETag'] = etag
+        response['Accept-Ranges'] = 'bytes'
+        response['X-Total-Length'] = str(total)
+        if status == 206:
+            response['Content-Range'] = f'bytes {start}-{end - 1}/{total}'
+        elif content_range is not None:
+            response['X-Content-Offset'] = str(start)
+        if content_range is not None and content_range.paragraphs is not None:
+            first, last, paragraph_count = content_range.paragraphs
+            response['X-Paragraphs'] = f'{first}-{last - 1}/{paragraph_count}'
+        return response
+
 class FrenchBooksList(APIView):
     def get(self, request, format=None):
         books = BookText.objects.filter(language='fr')
@@ -80,105 +200,184 @@ class SearchByKeyword(APIView):
 
         logger.info(f"Received query: {keyword}")
         logger.info(f"Recherche par mot-clé : {keywords}")
-        
+
+        try:
+            page = parse_page_request(request)
+        except PaginationError as e:
+            return Response({'error': str(e)}, status=400)
+
         if not keywords:
-            return Response([])
-
-        # Dictionnaire pour agréger les résultats par livre
-        aggregated_results = defaultdict(lambda: {'score': 0.0, 'occurrences': 0})
-        
-        # Rechercher chaque préfixe dans TrieNode
-        for kw in keywords:
-            prefix_results = TrieNode.search_by_prefix(kw)
-            for result in prefix_results:
-                word_data = result['data']  # {book_id: {occurrences, tfidf, score}}
-                for book_id, data in word_data.items():
-                    aggregated_results[book_id]['score'] += data['score']
-                    aggregated_results[book_id]['occurrences'] += data['occurrences']
+            return paginated_response(request, page, [], 0)
 
-        if not aggregated_results:
-            return Response([])  # Aucun résultat trouvé pour tous les préfixes
+        # Rechercher chaque préfixe dans le Trie et agréger les résultats par livre
+        aggregated_results = aggregate_prefix_results(keywords)
 
-        # Construire la liste des résultats
-        results = []
-        for book_id in aggregated_results:
-            try:
-                book = BookText.objects.get(gutenberg_id=book_id)
-                results.append({
-                    'id': book.gutenberg_id,
-                    'title': book.title,
-                    'authors': book.authors,
-                    'language': book.language,
-                    'cover_url': f'https://gutenberg.org/files/{book.gutenberg_id}/{book.gutenberg_id}-h/images/cover.jpg',
-                    'word_count': book.word_count,
-                    'score': aggregated_results[book_id]['score'],  # Score agrégé
-                    'occurrences': aggregated_results[book_id]['occurrences']  # Occurrences totales
-                })
-            except BookText.DoesNotExist:
-                continue  # Ignorer si le livre n'existe pas
+        if not aggregated_results:
+            return paginated_response(request, page, [], 0)  # Aucun résultat trouvé pour tous les préfixes
 
-        # Trier les résultats par score décroissant
-        results = sorted(results, key=lambda x: x['score'], reverse=True)
-        return Response(results)
+        # Construire la liste des résultats, triés par score décroissant
+        results, total = rank_results(aggregated_results, 'score', page)
+        return paginated_response(request, page, results, total)
 
 class SearchByRegex(APIView):
     def get(self, request, regex, format=None):
         try:
-            dfa = build_dfa_from_regex(regex.lower())
-            if not dfa:
-                raise Http404("Invalid regex or DFA construction failed")
+            page = parse_page_request(request)
+        except PaginationError as e:
+            return Response({'error': str(e)}, status=400)
 
-            root_nodes = TrieNode.objects.filter(parent__isnull=True).prefetch_related('children')
-
-            results = defaultdict(lambda: {'score': 0.0, 'matches': 0})
-            for root in root_nodes:
-                self._traverse_with_dfa(root, dfa, '', results)
+        try:
+            regex = regex.lower()
+            results = search_cache.get_or_compute(('regex', regex), lambda: self._match_regex(regex))
 
             if not results:
-                return Response([])
-
-            result_list = []
-            for book_id in results:
-                try:
-                    book = BookText.objects.get(gutenberg_id=book_id)
-                    result_list.append({
-                        'id': book.gutenberg_id,
-                        'title': book.title,
-                        'authors': book.authors,
-                        'language': book.language,
-                        'cover_url': f'https://gutenberg.org/files/{book.gutenberg_id}/{book.gutenberg_id}-h/images/cover.jpg',
-                        'word_count': book.word_count,
-                        'score': results[book_id]['score'],
-                        'matches': results[book_id]['matches']
-                    })
-                except BookText.DoesNotExist:
-                    continue
+                return paginated_response(request, page, [], 0)
 
-            result_list = sorted(result_list, key=lambda x: x['score'], reverse=True)
-            return Response(result_list)
+            result_list, total = rank_results(results, 'score', page, fields=('score', 'matches'))
+            return paginated_response(request, page, result_list, total)
 
+        except RegexTooComplex as e:
+            logger.warning(f"Regex refusée ({regex}) : {e}")
+            return Response({'error': str(e)}, status=400)
         except Exception as e:
             raise Http404(f"Invalid regex: {str(e)}")
 
+    @classmethod
+    def _match_regex(cls, regex):
+        """Agrège score et nombre de correspondances par livre pour les mots du Trie acceptés par la regex.
+
+        Si le DFA dépasse REGEX_MAX_DFA_STATES, la recherche est reprise avec le moteur de Glushkov,
+        qui le remplace dans le cache des automates (400 si le motif est trop long pour ce moteur).
+        """
+        try:
+            return cls._match_with(compile_regex(regex))
+        except DFABudgetExceeded as e:
+            logger.info(f"Regex {regex} : {e}, repli sur le moteur de Glushkov")
+            return cls._match_with(fallback_regex(regex))
+
+    @classmethod
+    def _match_with(cls, dfa):
+        if not dfa:
+            raise Http404("Invalid regex or DFA construction failed")
+
+        results = defaultdict(lambda: {'score': 0.0, 'matches': 0})
+        if getattr(settings, 'TRIE_SNAPSHOT_ENABLED', True):
+            trie = get_trie_snapshot()
+            for term in cls._matching_terms(trie, dfa):
+                trie.aggregate_term(term, results, occurrences_key='matches')
+        else:
+            # Seuls les sous-arbres atteignables depuis l'état initial sont chargés, en une requête récursive
+            root_chars = TrieNode.objects.filter(parent__isnull=True).values_list('char', flat=True)
+            root_chars = [char for char in root_chars if dfa.transition(dfa.start_state, char) != -1]
+            if dfa.literal_prefixes is not None:
+                root_chars = [char for char in root_chars if any(prefix[0] == char for prefix in dfa.literal_prefixes)]
+            trie = TrieSnapshot.from_rows(None, TrieNode.subtree_rows(root_chars))
+            matched_terms = cls._traverse_with_dfa(trie, dfa)
+            postings = TrieNode.postings_by_term(trie.term_node_ids[term] for term in matched_terms)
+            for term in matched_terms:
+                for book_id, occurrences, score in postings[trie.term_node_ids[term]]:
+                    results[book_id]['matches'] += occurrences
+                    results[book_id]['score'] += score
+        return dict(results)
+
+    @classmethod
+    def _matching_terms(cls, trie, dfa):
+        """Termes du Trie acceptés par l'automate.
+
+        Sans littéral en tête, les termes candidats sont d'abord pris dans l'index de trigrammes
+        (.*word.* ne vérifie alors que les mots contenant les trigrammes de word) ; le parcours
+        du Trie reste utilisé quand la requête de trigrammes ne restreint pas assez.
+        """
+        if dfa.literal_prefixes is None and dfa.trigram_query != TRIGRAM_ANY and trie.trigram_index is not None:
+            candidates = evaluate_query(dfa.trigram_query, trie.trigram_index)
+            if candidates is not None and len(candidates) < trie.term_count // 2:
+                return cls._check_candidates(trie, dfa, sorted(candidates))
+        return cls._traverse_with_dfa(trie, dfa)
+
     @staticmethod
-    def _traverse_with_dfa(node, dfa, current_word, results, state=None):
-        if state is None:
-            state = dfa.start_state
-        current_word += node.char
-        current_state = dfa.transition(state, node.char)
-
-        if dfa.is_accepting(current_state) and node.is_end_of_word:
-            word_data = node.get_word_data()
-            for book_id, data in word_data.items():
-                occurrences = data.get('occurrences', 1)
-                score = data.get('score', 0.0)
-                results[book_id]['matches'] += occurrences
-                results[book_id]['score'] += score
-
-        for child in node.children.all():
-            next_state = dfa.transition(current_state, child.char)
-            if next_state != -1:
-                SearchByRegex._traverse_with_dfa(child, dfa, current_word, results, current_state)
+    def _check_candidates(trie, dfa, candidates):
+        """Candidats dont le mot entier est accepté par l'automate."""
+        words = trie.words
+        start_state = dfa.start_state
+        matched_terms = []
+        for term in candidates:
+            state = start_state
+            for char in words[term]:
+                state = dfa.transition(state, char)
+                if state < 0:
+                    break
+            else:
+                if dfa.is_accepting(state):
+                    matched_terms.append(term)
+        return matched_terms
+
+    @staticmethod
+    def _traverse_with_dfa(trie, dfa):
+        """Termes du Trie acceptés par l'automate, en ordre préfixe.
+
+        Parcours en profondeur itératif : une branche est abandonnée dès que l'automate n'a plus de transition.
+        Avec un DFA, chaque arête coûte une lecture de la classe du caractère et une lecture de la table ;
+        avec un LazyDFA, les cases encore inconnues sont calculées au passage par expand(). Le moteur
+        bit-parallèle (GlushkovMatcher), sans table, passe par transition() et is_accepting().
+        Si la regex impose des littéraux en tête (alic(e|ia) -> alic), le parcours part directement
+        des noeuds de ces préfixes au lieu de la racine.
+        """
+        chars = trie.chars
+        subtree_end = trie.subtree_end
+        term_start = trie.term_start
+        is_accepting = dfa.is_accepting
+        matched_terms = []
+        if dfa.literal_prefixes is None:
+            stack = [(0, dfa.start_state)]
+        else:
+            stack = []
+            for prefix in dfa.literal_prefixes:
+                node = trie.find_node(prefix)
+                state = dfa.start_state
+                for char in prefix:
+                    state = dfa.transition(state, char)
+                if node < 0 or state < 0:
+                    continue
+                if is_accepting(state) and term_start[node + 1] > term_start[node]:
+                    matched_terms.append(term_start[node])
+                stack.append((node, state))
+
+        table = getattr(dfa, 'table', None)
+        if table is None:
+            transition = dfa.transition
+            while stack:
+                node, state = stack.pop()
+                child = node + 1
+                end = subtree_end[node]
+                while child < end:
+                    next_state = transition(state, chars[child])
+                    if next_state >= 0:
+                        if is_accepting(next_state) and term_start[child + 1] > term_start[child]:
+                            matched_terms.append(term_start[child])
+                        stack.append((child, next_state))
+                    child = subtree_end[child]
+            matched_terms.sort()
+            return matched_terms
+
+        class_of = dfa.class_of.get
+        accepting = dfa.accepting
+        expand = getattr(dfa, 'expand', None)
+        while stack:
+            node, state = stack.pop()
+            child = node + 1
+            end = subtree_end[node]
+            while child < end:
+                symbol_class = class_of(chars[child], 0)
+                next_state = table[state + symbol_class]
+                if next_state == LazyDFA.UNKNOWN:
+                    next_state = expand(state, symbol_class)
+                if next_state >= 0:
+                    if accepting[next_state] and term_start[child + 1] > term_start[child]:
+                        matched_terms.append(term_start[child])
+                    stack.append((child, next_state))
+                child = subtree_end[child]
+        matched_terms.sort()
+        return matched_terms
 
 
 class SearchWithRanking(APIView):
@@ -188,110 +387,54 @@ class SearchWithRanking(APIView):
         if ranking not in valid_sort_options:
             return Response({'error': f"Critère de tri invalide. Options valides : {valid_sort_options}"}, status=400)
 
-        # Rechercher tous les mots commençant par le préfixe dans TrieNode
-        prefix_results = TrieNode.search_by_prefix(keyword)
-        if not prefix_results:
-            return Response({'results': []})
-
-        # Agréger les résultats par livre
-        aggregated_results = defaultdict(lambda: {'score': 0.0, 'occurrences': 0})
-        for result in prefix_results:
-            word_data = result['data']
-            for book_id, data in word_data.items():
-                aggregated_results[book_id]['score'] += data['score']
-                aggregated_results[book_id]['occurrences'] += data['occurrences']
-
-        results = []
-        for book_id in aggregated_results:
-            try:
-                book = BookText.objects.get(gutenberg_id=book_id)
-                results.append({
-                    'id': book.gutenberg_id,
-                    'title': book.title,
-                    'authors': book.authors,
-                    'language': book.language,
-                    'cover_url': f'https://gutenberg.org/files/{book.gutenberg_id}/{book.gutenberg_id}-h/images/cover.jpg',
-                    'word_count': book.word_count,
-                    'score': aggregated_results[book_id]['score'],
-                    'occurrences': aggregated_results[book_id]['occurrences'],
-                    'closeness': book.closeness_centrality,
-                    'betweenness': book.betweenness_centrality
-                })
-            except BookText.DoesNotExist:
-                continue
-
-        if not results:
-            return Response({'results': []})
+        try:
+            page = parse_page_request(request)
+        except PaginationError as e:
+            return Response({'error': str(e)}, status=400)
 
-        # Trier selon le critère choisi
-        if ranking == 'occurrences':
-            results = sorted(results, key=lambda x: x['occurrences'], reverse=True)
-        elif ranking == 'closeness':
-            results = sorted(results, key=lambda x: x['closeness'], reverse=True)
-        elif ranking == 'betweenness':
-            results = sorted(results, key=lambda x: x['betweenness'], reverse=True)
+        # Rechercher tous les mots commençant par le préfixe et agréger les résultats par livre
+        aggregated_results = aggregate_prefix_results([keyword])
+        if not aggregated_results:
+            return paginated_response(request, page, {'results': []}, 0)
 
-        return Response({'results': results})
+        # Trier selon le critère choisi
+        results, total = rank_results(aggregated_results, ranking, page, with_centralities=True)
+        return paginated_response(request, page, {'results': results}, total)
 
 class SearchWithSuggestions(APIView):
     def get(self, request, keyword, format=None):
         keyword = keyword.lower()
-        # Rechercher tous les mots commençant par le préfixe dans TrieNode
-        prefix_results = TrieNode.search_by_prefix(keyword)
-        if not prefix_results:
-            return Response({'results': [], 'suggestions': []})
-
-        # Agréger les résultats par livre
-        aggregated_results = defaultdict(lambda: {'score': 0.0, 'occurrences': 0})
-        for result in prefix_results:
-            word_data = result['data']
-            for book_id, data in word_data.items():
-                aggregated_results[book_id]['score'] += data['score']
-                aggregated_results[book_id]['occurrences'] += data['occurrences']
-
-        results = []
-        for book_id in aggregated_results:
-            try:
-                book = BookText.objects.get(gutenberg_id=book_id)
-                results.append({
-                    'id': book.gutenberg_id,
-                    'title': book.title,
-                    'authors': book.authors,
-                    'language': book.language,
-                    'cover_url': f'https://gutenberg.org/files/{book.gutenberg_id}/{book.gutenberg_id}-h/images/cover.jpg',
-                    'word_count': book.word_count,
-                    'score': aggregated_results[book_id]['score'],
-                    'occurrences': aggregated_results[book_id]['occurrences']
-                })
-            except BookText.DoesNotExist:
-                continue
+        try:
+            page = parse_page_request(request)
+        except PaginationError as e:
+            return Response({'error': str(e)}, status=400)
+
+        # Rechercher tous les mots commençant par le préfixe et agréger les résultats par livre
+        aggregated_results = aggregate_prefix_results([keyword])
+        if not aggregated_results:
+            return paginated_response(request, page, {'results': [], 'suggestions': []}, 0)
 
         # Trier les résultats par score décroissant
-        results = sorted(results, key=lambda x: x['score'], reverse=True)
+        results, total = rank_results(aggregated_results, 'score', page)
 
-        # Sélectionner les 3 premiers livres pour les suggestions
-        top_books = [result['id'] for result in results[:min(3, len(results))]]
+        # Sélectionner les 3 premiers livres (de toute la recherche, pas de la page) pour les suggestions
+        top_books, _ = rank_book_ids(aggregated_results, 'score', PageRequest(3, 0))
         if not top_books:
-            return Response({'results': [], 'suggestions': []})
+            return paginated_response(request, page, {'results': [], 'suggestions': []}, 0)
 
-        # Récupérer les suggestions depuis TableJaccard
+        # Récupérer les suggestions depuis le graphe de Jaccard du catalogue
+        catalog = get_catalog()
         suggestions = {}
         for book_id in top_books:
-            book = BookText.objects.get(gutenberg_id=book_id)
-            neighbors = TableJaccard.objects.filter(
-                models.Q(book1=book) | models.Q(book2=book)
-            ).select_related('book1', 'book2')
-            for sim in neighbors:
-                neighbor = sim.book2 if sim.book1 == book else sim.book1
-                if neighbor.gutenberg_id not in top_books and neighbor.gutenberg_id not in suggestions:
-                    suggestions[neighbor.gutenberg_id] = {
-                        'id': neighbor.gutenberg_id,
-                        'title': neighbor.title,
-                        'authors': neighbor.authors,
-                        'language': neighbor.language,
-                        'cover_url': f'https://gutenberg.org/files/{neighbor.gutenberg_id}/{neighbor.gutenberg_id}-h/images/cover.jpg',
-                        'word_count': book.word_count,
-                    }
+            for neighbor_id in catalog.get_neighbors(book_id):
+                if neighbor_id not in top_books and neighbor_id not in suggestions:
+                    neighbor = catalog.get(neighbor_id)
+                    if neighbor is not None:
+                        suggestions[neighbor_id] = neighbor.summary()
 
         suggestion_list = list(suggestions.values())
-        return Response({'results': results, 'suggestions': suggestion_list})
\ No newline at end of file
+        return paginated_response(request, page, {'results': results, 'suggestions': suggestion_list}, total)
+
+class SearchCacheStats(APIView):
+    def get(self, request, format=None):
+        return Response({'results': search_cache.stats(), 'regex': regex_cache.stats()})